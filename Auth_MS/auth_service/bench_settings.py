@@ -0,0 +1,22 @@
+"""
+Settings for running the login benchmark offline:
+
+    python manage.py benchmark_login --settings=auth_service.bench_settings
+
+Uses a throwaway SQLite database.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('AUTH_BENCH_DB', BASE_DIR / 'bench.sqlite3'),
+    }
+}
+
+# benchmark_login deletes users, so it refuses to run unless this is set
+BENCHMARK_DATABASE = True
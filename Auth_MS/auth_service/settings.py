@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,6 +60,11 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Lets the frontend read how long to wait after a 429 from login/
+CORS_EXPOSE_HEADERS = [
+    'retry-after',
+]
+
 # JWT Configuration Settings
 from datetime import timedelta
 
@@ -73,10 +79,21 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# Log in with a username or an email: one user query and one password hash per attempt
+AUTHENTICATION_BACKENDS = [
+    "users.backends.UsernameOrEmailBackend",
+]
+
+# login/ checks passwords in a pool of LOGIN_HASH_WORKERS processes (0 = on the request thread,
+# through LoginView). Past LOGIN_HASH_QUEUE_LIMIT pending checks, logins get 429 with Retry-After.
+LOGIN_HASH_WORKERS = os.cpu_count() or 1
+LOGIN_HASH_QUEUE_LIMIT = LOGIN_HASH_WORKERS * 8
+
 
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -120,6 +137,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'auth_service.wsgi.application'
 
+ASGI_APPLICATION = 'auth_service.asgi.application'
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
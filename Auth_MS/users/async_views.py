@@ -0,0 +1,79 @@
+"""
+Async login, served by the ASGI application (auth_service/asgi.py).
+
+The password check runs in the PasswordHashPool processes, so a burst of logins neither holds
+the event loop nor the thread the sync views (register, refresh, me) run on. Past the pool's
+queue limit a login is answered 429 with Retry-After instead of waiting, and 503 if a pool
+process died (the pool is started again for the next login).
+"""
+import json
+import logging
+from concurrent.futures.process import BrokenProcessPool
+
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .backends import login_candidates, pick_login_user
+from .hashing import HashPoolFull, password_hashers
+from .serializers import LoginRequestSerializer, LoginSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _too_many_logins(retry_after):
+    return JsonResponse(
+        {"detail": "Too many logins right now, try again shortly."},
+        status=429,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def login(request):
+    """Same request and response as LoginView: username (or email) and password in, tokens and user out"""
+    if request.method != "POST":
+        return JsonResponse(
+            {"detail": f'Method "{request.method}" not allowed.'}, status=405, headers={"Allow": "POST, OPTIONS"}
+        )
+    try:
+        data = json.loads(request.body) if request.content_type == "application/json" else request.POST
+    except ValueError as exc:
+        return JsonResponse({"detail": f"JSON parse error - {exc}"}, status=400)
+    serializer = LoginRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    username = serializer.validated_data["username"]
+    password = serializer.validated_data["password"]
+
+    # Shed before the user query too, so a burst past the limit costs nothing
+    if password_hashers.pending >= password_hashers.queue_limit:
+        return _too_many_logins(password_hashers.retry_after())
+    user = pick_login_user([candidate async for candidate in login_candidates(username)], username)
+    try:
+        # Hashes once, also for an unknown user (see UsernameOrEmailBackend)
+        valid, new_encoding = await password_hashers.check_password(password, user.password if user else None)
+    except HashPoolFull as exc:
+        return _too_many_logins(exc.retry_after)
+    except BrokenProcessPool:
+        logger.exception("Password hashing process died, restarting the pool")
+        return JsonResponse(
+            {"detail": "Login is temporarily unavailable, try again."}, status=503, headers={"Retry-After": "1"}
+        )
+    if not valid or not user.is_active:
+        return JsonResponse(
+            {"detail": "Invalid credentials"}, status=401, headers={"WWW-Authenticate": 'Bearer realm="api"'}
+        )
+
+    if new_encoding:
+        # Stored hash used outdated parameters
+        user.password = new_encoding
+        await user.asave(update_fields=["password"])
+    if api_settings.UPDATE_LAST_LOGIN:
+        await User.objects.filter(pk=user.pk).aupdate(last_login=timezone.now())
+    return JsonResponse(LoginSerializer.token_response(user))
+
+
+# A token endpoint like LoginView (DRF views are CSRF exempt). Django 4.2's csrf_exempt wraps
+# async views in a sync function, so the flag CsrfViewMiddleware reads is set directly.
+login.csrf_exempt = True
@@ -0,0 +1,42 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+
+def login_candidates(username):
+    """Users whose username or email is `username`, in one query (both columns are indexed)"""
+    return User.objects.filter(Q(username=username) | Q(email=username)).order_by("id")[:10]
+
+
+def pick_login_user(candidates, username):
+    """A username match wins over another account using the same string as its email"""
+    user = None
+    for candidate in candidates:
+        if candidate.username == username:
+            return candidate
+        if user is None:
+            user = candidate
+    return user
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Logs in with either the username or the email. The user is found with one query and the
+    password is hashed exactly once, also when nobody matches, so a failed login costs the
+    same as a successful one.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = pick_login_user(login_candidates(username), username)
+        if user is None:
+            # Run the hasher once anyway so unknown logins can't be told apart by timing
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,128 @@
+import asyncio
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+class HashPoolFull(Exception):
+    """Raised by PasswordHashPool.check_password when `queue_limit` hashes are already pending"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Password hashing is saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+
+def _verify(password, encoded):
+    """
+    Runs in a pool process: (password matches, new encoding or None, seconds taken). The new
+    encoding is set when the stored hash uses outdated parameters, as check_password's setter
+    would. With no stored hash (unknown user) the password is hashed anyway, so the timing is
+    the same.
+    """
+    from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+    started = time.perf_counter()
+    if encoded is None:
+        make_password(password)
+        return False, None, time.perf_counter() - started
+    if not check_password(password, encoded):
+        return False, None, time.perf_counter() - started
+    try:
+        must_update = identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        must_update = False
+    return True, (make_password(password) if must_update else None), time.perf_counter() - started
+
+
+class PasswordHashPool:
+    """
+    Checks passwords in a pool of `workers` processes, so a login's PBKDF2 hash neither holds
+    the event loop nor a server thread, and logins hash on every core. At most `queue_limit`
+    checks are pending (running or queued) at once; past that check_password raises HashPoolFull
+    with a Retry-After estimate, so a burst is shed instead of queueing without bound.
+    The processes are started on first use, and started again after a worker dies.
+    """
+
+    def __init__(self, workers=None, queue_limit=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit or self.workers * 8
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = 0
+        self.submitted = 0
+        self.average = 0.5  # seconds per check, moving average
+        atexit.register(self.shutdown)
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # spawn: forking a server process that already runs threads is unsafe, and Windows can't fork
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "auth_service.settings"),),
+            )
+        return self.executor
+
+    def _discard(self, executor):
+        """
+        Drop a pool broken by a dead worker (e.g. killed for memory), so the next check starts a
+        new one. A broken ProcessPoolExecutor fails every later submit. Call with the lock held.
+        """
+        if self.executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def retry_after(self):
+        """Seconds until the pending hashes are likely done"""
+        return max(1, math.ceil(self.pending / self.workers * self.average))
+
+    async def check_password(self, password, encoded):
+        """(password matches, new encoding or None), see _verify. Raises BrokenProcessPool if a worker died."""
+        with self.lock:
+            if self.pending >= self.queue_limit:
+                raise HashPoolFull(self.retry_after())
+            executor = self._executor()
+            try:
+                future = executor.submit(_verify, password, encoded)
+            except BrokenProcessPool:
+                self._discard(executor)
+                raise
+            self.pending += 1
+            self.submitted += 1
+        try:
+            valid, encoding, seconds = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            with self.lock:
+                self._discard(executor)
+            raise
+        finally:
+            with self.lock:
+                self.pending -= 1
+        self.average = self.average * 0.9 + seconds * 0.1
+        return valid, encoding
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self._discard(self.executor)
+
+
+# Global instance
+password_hashers = PasswordHashPool(
+    workers=getattr(settings, "LOGIN_HASH_WORKERS", None),
+    queue_limit=getattr(settings, "LOGIN_HASH_QUEUE_LIMIT", None),
+)
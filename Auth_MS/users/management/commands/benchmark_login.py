@@ -0,0 +1,198 @@
+import asyncio
+import json
+import math
+import platform
+import time
+from collections import Counter
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+
+from users.hashing import password_hashers
+
+LOGIN_URL = "/api/auth/login/"
+REFRESH_URL = "/api/auth/refresh/"
+PASSWORD = "bench-Passw0rd"
+
+
+def _percentile(sorted_values, pct):
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return round(sorted_values[rank - 1] * 1000, 3)
+
+
+def _summarize(latencies, elapsed, hashes, expected_status, statuses):
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": _percentile(values, 50),
+        "p95_ms": _percentile(values, 95),
+        "p99_ms": _percentile(values, 99),
+        "max_ms": round(values[-1] * 1000, 3),
+        "throughput_per_sec": round(len(values) / elapsed, 1),
+        "hashes_per_login": round(hashes / len(values), 2),
+        "unexpected_status": sum(1 for status in statuses if status != expected_status),
+    }
+
+
+class HashCounter:
+    """
+    Counts runs of the default password hasher (check_password and set_password both encode)
+    in this process, plus the checks sent to the login hash pool
+    """
+
+    def __init__(self):
+        self.hasher_class = type(get_hasher())
+        self.encode = self.hasher_class.encode
+        self.local = 0
+
+    @property
+    def count(self):
+        return self.local + password_hashers.submitted - self.submitted
+
+    def __enter__(self):
+        counter = self
+        self.submitted = password_hashers.submitted
+
+        def encode(hasher, *args, **kwargs):
+            counter.local += 1
+            return counter.encode(hasher, *args, **kwargs)
+
+        self.hasher_class.encode = encode
+        return self
+
+    def __exit__(self, *exc):
+        self.hasher_class.encode = self.encode
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed users and measure POST /api/auth/login/ latency, throughput and password hashes per '
+        'login by username, by email and with bad credentials, then under a burst of concurrent logins '
+        'with token refresh latency alongside, printing the results as JSON. '
+        'Run with --settings=auth_service.bench_settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to seed')
+        parser.add_argument('--logins', type=int, default=100, help='Measured logins per case')
+        parser.add_argument(
+            '--burst', type=int, default=64,
+            help='Logins sent at once, with token refreshes timed alongside (0 to skip)'
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK_DATABASE', False):
+            raise CommandError(
+                'benchmark_login deletes users. Run it with --settings=auth_service.bench_settings.'
+            )
+        if options['users'] < 1 or options['logins'] < 1:
+            raise CommandError('--users and --logins must be at least 1')
+
+        call_command('migrate', verbosity=0, interactive=False)
+        self.stderr.write(f"Seeding {options['users']} users...")
+        User.objects.all().delete()
+        # One hash shared by every seeded user, so seeding doesn't take a hash per user
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(username=f'bench{i}', email=f'bench{i}@example.com', password=password)
+            for i in range(options['users'])
+        )
+
+        users = options['users']
+        cases = {
+            "username": (lambda i: {"username": f'bench{i % users}', "password": PASSWORD}, 200),
+            "email": (lambda i: {"username": f'bench{i % users}@example.com', "password": PASSWORD}, 200),
+            "wrong_password": (lambda i: {"username": f'bench{i % users}', "password": 'wrong'}, 401),
+            "unknown_user": (lambda i: {"username": f'nobody{i}@example.com', "password": PASSWORD}, 401),
+        }
+
+        hasher = get_hasher()
+        report = {
+            "meta": {
+                "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": settings.DATABASES['default']['ENGINE'],
+                "hasher": hasher.algorithm,
+                "hasher_iterations": getattr(hasher, 'iterations', None),
+                "users": users,
+            },
+            "cases": {},
+        }
+
+        client = Client(raise_request_exception=False)
+        for name, (body, expected_status) in cases.items():
+            self.stderr.write(f'Benchmarking {name} logins...')
+            client.post(LOGIN_URL, body(0), content_type='application/json')  # warm up
+            latencies, statuses = [], []
+            with HashCounter() as hashes:
+                started = time.perf_counter()
+                for i in range(options['logins']):
+                    t0 = time.perf_counter()
+                    response = client.post(LOGIN_URL, body(i), content_type='application/json')
+                    latencies.append(time.perf_counter() - t0)
+                    statuses.append(response.status_code)
+                elapsed = time.perf_counter() - started
+            report["cases"][name] = _summarize(latencies, elapsed, hashes.count, expected_status, statuses)
+
+        if options['burst'] > 0:
+            self.stderr.write(f"Benchmarking a burst of {options['burst']} logins...")
+            refresh = client.post(LOGIN_URL, cases["username"][0](0), content_type='application/json').json()["refresh"]
+            with HashCounter() as hashes:
+                report["cases"]["burst"] = asyncio.run(self.burst(options['burst'], cases["username"][0], refresh))
+            report["cases"]["burst"]["logins"]["hashes"] = hashes.count
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    async def burst(self, logins, body, refresh):
+        """
+        `logins` concurrent logins through the ASGI handler, as under Daphne, while a token
+        refresh is timed every 50ms until they are all answered
+        """
+        client = AsyncClient()
+
+        async def login(i):
+            t0 = time.perf_counter()
+            response = await client.post(LOGIN_URL, body(i), content_type='application/json')
+            return time.perf_counter() - t0, response.status_code
+
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(login(i)) for i in range(logins)]
+        refreshes = []
+        while not all(task.done() for task in tasks):
+            t0 = time.perf_counter()
+            await client.post(REFRESH_URL, {"refresh": refresh}, content_type='application/json')
+            refreshes.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.05)
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        answered = sorted(latency for latency, status in results if status == 200)
+        return {
+            "concurrency": logins,
+            "queue_limit": password_hashers.queue_limit,
+            "workers": password_hashers.workers,
+            "statuses": dict(Counter(str(status) for _, status in results)),
+            "logins": {
+                "p50_ms": _percentile(answered, 50) if answered else None,
+                "max_ms": round(answered[-1] * 1000, 3) if answered else None,
+                "throughput_per_sec": round(len(answered) / elapsed, 1),
+            },
+            "refresh_during_burst": {
+                "count": len(refreshes),
+                "p50_ms": _percentile(sorted(refreshes), 50) if refreshes else None,
+                "max_ms": round(max(refreshes) * 1000, 3) if refreshes else None,
+            },
+        }
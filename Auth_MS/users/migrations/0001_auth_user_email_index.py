@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+EMAIL_INDEX = models.Index(fields=["email"], name="auth_user_email_idx")
+
+
+def add_email_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model("auth", "User"), EMAIL_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model("auth", "User"), EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+    """
+    Index auth_user.email, which UsernameOrEmailBackend looks logins up by. auth.User belongs
+    to django.contrib.auth, so the index is added here rather than in its model Meta.
+    """
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
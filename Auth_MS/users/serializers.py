@@ -1,7 +1,8 @@
-from django.contrib.auth.models import User
-from rest_framework import serializers
+from django.contrib.auth.models import User, update_last_login
+from rest_framework import exceptions, serializers
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -28,46 +29,51 @@ class RegisterSerializer(serializers.ModelSerializer):
         
         return user
 
+class LoginRequestSerializer(serializers.Serializer):
+    """The fields of LoginSerializer, without authenticating; checked by the async login view"""
+    username = serializers.CharField()
+    password = serializers.CharField(write_only=True, trim_whitespace=False)
+
 class LoginSerializer(TokenObtainPairSerializer):
     username_field = "username"
 
-    def validate(self, attrs):
-        username_or_email = attrs.get("username")
-        password = attrs.get("password")
+    @classmethod
+    def get_token(cls, user):
+        # Carried into the access token, so the inventory service knows who the caller is
+        # and whether they are an admin without a header or a user lookup
+        token = super().get_token(user)
+        token["username"] = user.username
+        token["is_admin"] = user.is_staff or user.is_superuser
+        return token
 
+    def validate(self, attrs):
+        # UsernameOrEmailBackend takes either, with a single password hash
         user = authenticate(
             request=self.context.get("request"),
-            username=username_or_email,
-            password=password,
+            username=attrs.get("username"),
+            password=attrs.get("password"),
         )
-
-        # Try email login if username fails
         if not user:
-            try:
-                from django.contrib.auth.models import User
-                user_obj = User.objects.get(email=username_or_email)
-                user = authenticate(
-                    request=self.context.get("request"),
-                    username=user_obj.username,
-                    password=password,
-                )
-            except User.DoesNotExist:
-                pass
+            raise exceptions.AuthenticationFailed("Invalid credentials")
 
-        if not user:
-            raise ValueError("Invalid credentials")
-
-        data = super().validate({
-            "username": user.username,
-            "password": password,
-        })
+        # Tokens for the user just authenticated; super().validate() would authenticate again
+        data = self.token_response(user)
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        return data
 
-        # Add user information including admin status
-        data["user"] = {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "is_admin": user.is_staff or user.is_superuser,  # Check if user is admin
+    @classmethod
+    def token_response(cls, user):
+        """Login response body: the token pair plus the user, shared with the async login view"""
+        refresh = cls.get_token(user)
+        return {
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+            # Add user information including admin status
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "is_admin": user.is_staff or user.is_superuser,  # Check if user is admin
+            },
         }
-        
-        return data
\ No newline at end of file
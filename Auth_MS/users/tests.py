@@ -1,3 +1,106 @@
-from django.test import TestCase
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import MD5PasswordHasher
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from .hashing import PasswordHashPool
+
+LOGIN_URL = "/api/auth/login/"
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class UsernameOrEmailBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob", "bob@example.com", "pw12345!")
+        patcher = mock.patch.object(MD5PasswordHasher, "encode", autospec=True, side_effect=MD5PasswordHasher.encode)
+        self.encode = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, username, password="pw12345!"):
+        """authenticate() in one query and one hash"""
+        self.encode.reset_mock()
+        with self.assertNumQueries(1):
+            user = authenticate(username=username, password=password)
+        self.assertEqual(self.encode.call_count, 1)
+        return user
+
+    def test_username_login(self):
+        self.assertEqual(self.login("bob"), self.user)
+
+    def test_email_login(self):
+        self.assertEqual(self.login("bob@example.com"), self.user)
+
+    def test_wrong_password(self):
+        self.assertIsNone(self.login("bob", "wrong"))
+
+    def test_unknown_user_still_hashes_the_password(self):
+        self.assertIsNone(self.login("nobody@example.com"))
+        self.assertEqual(self.encode.call_args.args[1], "pw12345!")
+
+    def test_inactive_user_is_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(self.login("bob"))
+
+    def test_username_wins_over_another_accounts_email(self):
+        User.objects.create_user("eve", "bob", "pw12345!")
+        self.assertEqual(self.login("bob"), self.user)
+
+
+class AsyncLoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob", "bob@example.com", "pw12345!")
+        self.pool = PasswordHashPool(workers=1, queue_limit=2)
+        self.addCleanup(self.pool.shutdown)
+        patcher = mock.patch("users.async_views.password_hashers", self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def login(self, username="bob", password="pw12345!"):
+        return await self.async_client.post(
+            LOGIN_URL, {"username": username, "password": password}, content_type="application/json"
+        )
+
+    async def test_login_returns_tokens_and_user(self):
+        response = await self.login("bob@example.com")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(set(body), {"refresh", "access", "user"})
+        self.assertEqual(
+            body["user"], {"id": self.user.id, "username": "bob", "email": "bob@example.com", "is_admin": False}
+        )
+
+    async def test_wrong_password_is_rejected(self):
+        response = await self.login(password="wrong")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"detail": "Invalid credentials"})
+
+    async def test_full_pool_sheds_the_login_with_retry_after(self):
+        self.pool.pending = self.pool.queue_limit
+        self.pool.average = 1.5
+        response = await self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "3")
+        self.assertIsNone(self.pool.executor)  # shed before anything was hashed
+
+    async def test_dead_worker_answers_503_and_the_pool_is_restarted(self):
+        broken = Future()
+        broken.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        dead = mock.Mock()
+        dead.submit.return_value = broken
+        self.pool.executor = dead
+
+        with self.assertLogs("users.async_views", "ERROR"):
+            response = await self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        dead.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertIsNone(self.pool.executor)
+        self.assertEqual(self.pool.pending, 0)
+
+        response = await self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNot(self.pool.executor, dead)
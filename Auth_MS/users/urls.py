@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.urls import path
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import RegisterView, ProfileView, LoginView
+from . import async_views
 
 urlpatterns = [
     path("register/", RegisterView.as_view()),
-    path("login/", LoginView.as_view()),
+    # LOGIN_HASH_WORKERS = 0 hashes on the request thread instead of the process pool
+    path("login/", async_views.login if settings.LOGIN_HASH_WORKERS else LoginView.as_view()),
+    path("refresh/", TokenRefreshView.as_view()),
     path("me/", ProfileView.as_view()),
 ]
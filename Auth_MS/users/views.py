@@ -21,4 +21,5 @@ class ProfileView(generics.RetrieveAPIView):
         })
 
 class LoginView(TokenObtainPairView):
+    # Hashes on the request thread; login/ uses async_views.login unless LOGIN_HASH_WORKERS is 0
     serializer_class = LoginSerializer
\ No newline at end of file
@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Product, Order
+from django.db import transaction
+
+from .dashboard import dashboard_snapshots
+from .low_stock import check_low_stock, send_low_stock_alerts
+from .models import Product, Order, OrderLine
+from .stock_updates import stock_updates
 
 
 @admin.register(Product)
@@ -15,10 +20,28 @@ class ProductAdmin(admin.ModelAdmin):
     is_low_stock.boolean = True
     is_low_stock.short_description = 'Low Stock?'
 
+    def save_model(self, request, obj, form, change):
+        # Also runs for each row saved from the list_editable changelist
+        stock_changed = {'stock_quantity', 'low_stock_threshold'} & set(form.changed_data)
+        low_stock_alert = check_low_stock(obj) if stock_changed else None
+        super().save_model(request, obj, form, change)
+        if stock_changed:
+            transaction.on_commit(dashboard_snapshots.invalidate)
+            transaction.on_commit(lambda: stock_updates.record(obj))
+        if low_stock_alert:
+            transaction.on_commit(lambda: send_low_stock_alerts([low_stock_alert]))
+
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+    raw_id_fields = ['product']
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ['id', 'username', 'item_name', 'item_quantity', 'status', 'created_on']
+    list_display = ['id', 'username', 'status', 'created_on']
     list_filter = ['status', 'created_on']
-    search_fields = ['username', 'item_name']
+    search_fields = ['username', 'lines__item_name']
     ordering = ['-created_on']
+    inlines = [OrderLineInline]
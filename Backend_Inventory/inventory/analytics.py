@@ -0,0 +1,284 @@
+import math
+from datetime import timedelta
+
+from django.db.models import Sum, Count, F, Q, Window, ExpressionWrapper, DurationField
+from django.db.models.functions import Ceil, RowNumber, TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderLine, Product
+from .rows import (
+    ORDER_LIST_FIELDS, ORDER_LINE_FIELDS, STOCK_FIELDS, LOW_STOCK_FIELDS,
+    avalues_list, order_lines, group_lines, order_rows, stock_rows, stock_columns, low_stock_rows,
+)
+
+ORDER_STATUSES = ("Pending", "Processing", "Processed", "Cancelled")
+
+
+def _sales_queries():
+    # Get completed orders and their lines
+    completed_orders = Order.objects.filter(status="Processed")
+    completed_lines = OrderLine.objects.filter(order__status="Processed")
+
+    # Aggregate lines by item_name
+    sales_by_product = completed_lines.values('item_name').annotate(
+        total_quantity=Sum('item_quantity'),
+        order_count=Count('order', distinct=True)
+    ).order_by('-total_quantity')
+
+    return completed_orders, completed_lines, sales_by_product
+
+
+def _sales_result(sales_by_product, total_orders, total_items_sold):
+    sales_data = []
+    for item in sales_by_product:
+        sales_data.append({
+            "product": item['item_name'],
+            "total_quantity": item['total_quantity'] or 0,
+            "order_count": item['order_count'] or 0
+        })
+
+    return {
+        "sales_by_product": sales_data,
+        "total_orders": total_orders,
+        "total_items_sold": total_items_sold or 0
+    }
+
+
+def sales_analytics():
+    """Completed orders aggregated by product"""
+    completed_orders, completed_lines, sales_by_product = _sales_queries()
+    return _sales_result(
+        sales_by_product,
+        completed_orders.count(),
+        completed_lines.aggregate(total=Sum('item_quantity'))['total']
+    )
+
+
+async def asales_analytics():
+    """sales_analytics using the async ORM"""
+    completed_orders, completed_lines, sales_by_product = _sales_queries()
+    return _sales_result(
+        [item async for item in sales_by_product],
+        await completed_orders.acount(),
+        (await completed_lines.aaggregate(total=Sum('item_quantity')))['total']
+    )
+
+
+def _popular_query(limit, sort_by):
+    # Get the lines of completed orders
+    completed_lines = OrderLine.objects.filter(order__status="Processed")
+
+    # Aggregate by item_name
+    ordering = '-total_quantity' if sort_by == 'quantity' else '-order_count'
+    return completed_lines.values('item_name').annotate(
+        total_quantity=Sum('item_quantity'),
+        order_count=Count('order', distinct=True)
+    ).order_by(ordering)[:limit]
+
+
+def _popular_result(popular):
+    popular_products = []
+    for idx, item in enumerate(popular):
+        popular_products.append({
+            "rank": idx + 1,
+            "product": item['item_name'],
+            "total_quantity": item['total_quantity'] or 0,
+            "order_count": item['order_count'] or 0
+        })
+
+    return {"popular_products": popular_products}
+
+
+def popular_products(limit=10, sort_by='orders'):
+    """Most popular products ranked by order count or quantity"""
+    return _popular_result(_popular_query(limit, sort_by))
+
+
+async def apopular_products(limit=10, sort_by='orders'):
+    """popular_products using the async ORM"""
+    return _popular_result([item async for item in _popular_query(limit, sort_by)])
+
+
+def _stock_result(values, columnar):
+    return {"inventory": stock_columns(values) if columnar else stock_rows(values)}
+
+
+def stock_inventory(columnar=False):
+    """Full stock inventory with all product details, as rows or in columnar form"""
+    products = Product.objects.all().order_by('category', 'name')
+    return _stock_result(products.values_list(*STOCK_FIELDS), columnar)
+
+
+async def astock_inventory(columnar=False):
+    """stock_inventory using the async ORM"""
+    products = Product.objects.all().order_by('category', 'name')
+    return _stock_result(await avalues_list(products, STOCK_FIELDS), columnar)
+
+
+def demand_forecast(days=30, horizon=14):
+    """Project demand per product from the average daily quantity ordered over the last `days` days"""
+    since = timezone.now() - timedelta(days=days)
+
+    # Accepted orders (Processing or Processed) count as demand
+    demand = OrderLine.objects.filter(
+        order__created_on__gte=since,
+        product__isnull=False,
+        order__status__in=["Processing", "Processed"]
+    ).values('product_id').annotate(total_quantity=Sum('item_quantity'))
+    demand_by_product = {item['product_id']: item['total_quantity'] or 0 for item in demand}
+
+    forecast = []
+    for product in Product.objects.all().order_by('category', 'name'):
+        daily_demand = demand_by_product.get(product.id, 0) / days
+        projected_demand = daily_demand * horizon
+        days_until_stockout = None
+        if daily_demand > 0:
+            days_until_stockout = round(product.stock_quantity / daily_demand, 1)
+
+        forecast.append({
+            "id": product.id,
+            "name": product.name,
+            "category": product.category,
+            "stock_quantity": product.stock_quantity,
+            "daily_demand": round(daily_demand, 2),
+            "projected_demand": round(projected_demand, 1),
+            "days_until_stockout": days_until_stockout,
+            "reorder_recommended": projected_demand > product.stock_quantity
+        })
+
+    return {"forecast": forecast, "window_days": days, "horizon_days": horizon}
+
+
+def orders_export():
+    """Full order history in the same shape as the admin orders list"""
+    orders = Order.objects.all().order_by('-created_on')
+    lines = group_lines(order_lines(orders).values_list(*ORDER_LINE_FIELDS))
+    return {"orders": order_rows(orders.values_list(*ORDER_LIST_FIELDS), lines)}
+
+
+# stage name -> (start timestamp, end timestamp)
+LATENCY_STAGES = {
+    "pending": ("created_on", "accepted_at"),
+    "queued": ("accepted_at", "processing_started_at"),
+    "processing": ("processing_started_at", "processed_at"),
+    "end_to_end": ("created_on", "processed_at"),
+}
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def _stage_percentile_query(since, start, end):
+    """
+    Nearest-rank percentiles of one stage per (day, category), computed in the database:
+    rows are ranked by duration within each group and only the ranks at each percentile are returned.
+    Categories come from order lines, so an order counts once for each of its lines.
+    """
+    duration = ExpressionWrapper(F(f'order__{end}') - F(f'order__{start}'), output_field=DurationField())
+    group = [TruncDate('order__created_on'), F('product__category')]
+    ranks = [Ceil(F('group_size') * (p / 100)) for p in LATENCY_PERCENTILES]
+
+    return OrderLine.objects.filter(
+        order__created_on__gte=since, **{f'order__{start}__isnull': False, f'order__{end}__isnull': False}
+    ).annotate(
+        day=TruncDate('order__created_on'),
+        category=F('product__category'),
+        duration=duration,
+        position=Window(RowNumber(), partition_by=group, order_by=duration.asc()),
+        group_size=Window(Count('id'), partition_by=group),
+    ).filter(
+        Q(position=ranks[0]) | Q(position=ranks[1]) | Q(position=ranks[2])
+    ).values_list('day', 'category', 'duration', 'position', 'group_size')
+
+
+def _stage_percentiles(rows):
+    groups = {}
+    for day, category, value, position, group_size in rows:
+        entry = groups.setdefault((day, category), {
+            "day": day.isoformat(),
+            "category": category or "uncategorized",
+            "count": group_size,
+        })
+        for p in LATENCY_PERCENTILES:
+            if position == math.ceil(group_size * (p / 100)):
+                entry[f"p{p}_seconds"] = round(value.total_seconds(), 3)
+
+    return sorted(groups.values(), key=lambda entry: (entry["day"], entry["category"]))
+
+
+def latency_percentiles(days=30):
+    """p50/p90/p99 duration of each order lifecycle stage by day and category"""
+    since = timezone.now() - timedelta(days=days)
+    return {
+        "window_days": days,
+        "stages": {
+            stage: _stage_percentiles(_stage_percentile_query(since, start, end))
+            for stage, (start, end) in LATENCY_STAGES.items()
+        }
+    }
+
+
+async def alatency_percentiles(days=30):
+    """latency_percentiles using the async ORM"""
+    since = timezone.now() - timedelta(days=days)
+    stages = {}
+    for stage, (start, end) in LATENCY_STAGES.items():
+        rows = [row async for row in _stage_percentile_query(since, start, end)]
+        stages[stage] = _stage_percentiles(rows)
+    return {"window_days": days, "stages": stages}
+
+
+def _dashboard_queries(page_size, top_products):
+    # Order count and quantity per status, in one grouped query
+    status_totals = Order.objects.order_by().values('status').annotate(
+        count=Count('id', distinct=True),
+        items=Sum('lines__item_quantity')
+    )
+
+    # The newest page_size orders of every status, in one query
+    newest_first = Window(
+        RowNumber(), partition_by=[F('status')], order_by=[F('created_on').desc(), F('id').desc()]
+    )
+    first_pages = Order.objects.annotate(position=newest_first).filter(
+        position__lte=page_size
+    ).order_by('-created_on', '-id')
+
+    low_stock = Product.objects.filter(stock_quantity__lte=F('low_stock_threshold'))
+    top_sales = _sales_queries()[2][:top_products]
+    return status_totals, first_pages, low_stock, top_sales
+
+
+def _dashboard_result(status_totals, first_pages, lines, low_stock, top_sales):
+    counts = dict.fromkeys(ORDER_STATUSES, 0)
+    items = dict.fromkeys(ORDER_STATUSES, 0)
+    for row in status_totals:
+        counts[row['status']] = row['count']
+        items[row['status']] = row['items'] or 0
+
+    orders = {status: [] for status in counts}
+    for order in order_rows(first_pages, group_lines(lines)):
+        # A status outside ORDER_STATUSES (legacy rows, raw SQL) may also be missing from
+        # status_totals if it was written between the two queries
+        orders.setdefault(order['status'], []).append(order)
+
+    return {
+        "generated_at": timezone.now().isoformat(),
+        "status_counts": counts,
+        "orders": orders,
+        "low_stock_products": low_stock_rows(low_stock),
+        "sales": _sales_result(top_sales, counts["Processed"], items["Processed"]),
+    }
+
+
+async def adashboard_snapshot(page_size=50, top_products=8):
+    """
+    Admin portal snapshot: order counts per status, the newest page_size orders of each status,
+    low stock products and sales totals with the top selling products, in five queries
+    """
+    status_totals, first_pages, low_stock, top_sales = _dashboard_queries(page_size, top_products)
+    first_pages = await avalues_list(first_pages, ORDER_LIST_FIELDS)
+    return _dashboard_result(
+        [row async for row in status_totals],
+        first_pages,
+        await avalues_list(order_lines([order[0] for order in first_pages]), ORDER_LINE_FIELDS),
+        await avalues_list(low_stock, LOW_STOCK_FIELDS),
+        [item async for item in top_sales],
+    )
@@ -1,15 +1,27 @@
 # apps.py
 from django.apps import AppConfig
+import logging
 import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
 
     def ready(self):
+        # Share metrics with other worker processes when METRICS_DIR is configured
+        from .metrics import registry
+        registry.start_flusher()
+        
         # Start the order consumer when Django starts
         from .consumer import order_consumer
         
+        # Benchmarks and tooling drive the consumer themselves
+        if not getattr(settings, 'START_ORDER_CONSUMER', True):
+            return
+        
         if not hasattr(self, '_consumer_started'):
             self._consumer_started = True
             consumer_thread = threading.Thread(
@@ -17,4 +29,4 @@ class InventoryConfig(AppConfig):
                 daemon=True
             )
             consumer_thread.start()
-            print("Order consumer thread started")
\ No newline at end of file
+            logger.info("Order consumer thread started")
\ No newline at end of file
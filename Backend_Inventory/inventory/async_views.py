@@ -0,0 +1,253 @@
+"""
+Async versions of the read endpoints.
+
+Under Daphne a sync view runs in the thread-sensitive executor, so it shares one thread with
+every other sync view. These views run on the event loop. Only their queries go through the
+async ORM, while token checks, content negotiation and JSON rendering stay on the loop.
+urls.py always routes these endpoints here. Responses match the sync DRF versions in
+inventory/benchmarks/sync_views.py, which only serve as the baseline in
+inventory/benchmarks/concurrency.py.
+"""
+import functools
+import logging
+
+from django.db.models import F
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from inventory.authentication import authenticate_token
+from . import analytics
+from .dashboard import dashboard_snapshots
+from .models import Order, Product
+from .renderers import ColumnarJSONRenderer, FastJSONRenderer
+from .rows import (
+    PRODUCT_LIST_FIELDS, ORDER_LIST_FIELDS, ORDER_LINE_FIELDS, SEARCH_FIELDS, LOW_STOCK_FIELDS,
+    avalues_list, product_rows, order_lines, group_lines, order_rows, search_rows, low_stock_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+_negotiator = DefaultContentNegotiation()
+
+
+def _render(renderer, data, status_code, headers=None):
+    return HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type, headers=headers)
+
+
+def async_api_view(renderer_classes=(FastJSONRenderer,), admin=False):
+    """
+    Async counterpart of @api_view(["GET"]) with JWTAuthenticationWithoutUserDB and IsAuthenticated,
+    plus IsAdminToken when `admin`.
+    The view returns a DRF Response whose data is rendered here, on the event loop, with the
+    negotiated renderer (request.accepted_renderer). Errors come back in the same shape and with
+    the same status codes DRF uses for the sync views.
+    """
+    renderers = [renderer_class() for renderer_class in renderer_classes]
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            renderer = renderers[0]
+            try:
+                # Same order as APIView.initial: negotiate, authenticate, then check the method
+                renderer, _ = _negotiator.select_renderer(Request(request), renderers)
+                request.accepted_renderer = renderer
+                user_auth = authenticate_token(request.headers.get("Authorization"))
+                if user_auth is None:
+                    raise exceptions.NotAuthenticated()
+                request.user = user_auth[0]
+                if admin and not request.user.is_admin:
+                    raise exceptions.PermissionDenied()
+                if request.method not in ("GET", "HEAD"):
+                    raise exceptions.MethodNotAllowed(request.method)
+
+                response = await view(request, *args, **kwargs)
+                return _render(renderer, response.data, response.status_code)
+
+            except exceptions.APIException as exc:
+                # Without a WWW-Authenticate challenge DRF answers authentication failures with 403
+                status_code = exc.status_code
+                if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    status_code = status.HTTP_403_FORBIDDEN
+                headers = {"Allow": "GET, HEAD"} if isinstance(exc, exceptions.MethodNotAllowed) else None
+                return _render(renderer, {"detail": exc.detail}, status_code, headers)
+            except Http404:
+                return _render(renderer, {"detail": "Not found."}, status.HTTP_404_NOT_FOUND)
+
+        return wrapped
+
+    return decorator
+
+
+@async_api_view()
+async def searchList(request):
+    """Search for products in the inventory database"""
+    value = request.GET.get('search', '').strip()
+
+    if not value:
+        return Response(data={"message": []}, status=status.HTTP_200_OK)
+
+    # Search products by name (case-insensitive, starts with)
+    products = Product.objects.filter(
+        name__istartswith=value,
+        stock_quantity__gt=0  # Only show in-stock items
+    )[:10]  # Limit to 10 results
+
+    # Format response to match frontend expectations
+    return Response(
+        data={"message": search_rows(await avalues_list(products, SEARCH_FIELDS))},
+        status=status.HTTP_200_OK
+    )
+
+
+@async_api_view()
+async def get_all_products(request):
+    """Get all products in inventory"""
+    try:
+        products = Product.objects.all()
+        return Response(
+            data={"products": product_rows(await avalues_list(products, PRODUCT_LIST_FIELDS))},
+            status=status.HTTP_200_OK
+        )
+    except Exception:
+        logger.exception("Error fetching products")
+        return Response(
+            data={"error": "Failed to fetch products"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view()
+async def get_low_stock_products(request):
+    """Get products that are low on stock - for admin alerts"""
+    try:
+        # Get products where stock_quantity <= low_stock_threshold
+        products = Product.objects.filter(stock_quantity__lte=F('low_stock_threshold'))
+        low_stock = low_stock_rows(await avalues_list(products, LOW_STOCK_FIELDS))
+        return Response(data={"low_stock_products": low_stock}, status=status.HTTP_200_OK)
+    except Exception:
+        logger.exception("Error fetching low stock products")
+        return Response(
+            data={"error": "Failed to fetch low stock products"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(admin=True)
+async def get_low_stock_alerts(request):
+    """Products with an open low-stock alert, oldest first, read from the alert index rather than a catalog scan"""
+    try:
+        products = Product.objects.filter(low_stock_alerted_at__isnull=False).order_by('low_stock_alerted_at')
+        values = await avalues_list(products, LOW_STOCK_FIELDS + ('low_stock_alerted_at',))
+        alerts = [
+            {**row, "alerted_at": value[-1]}
+            for row, value in zip(low_stock_rows(value[:-1] for value in values), values)
+        ]
+        return Response(data={"low_stock_alerts": alerts}, status=status.HTTP_200_OK)
+    except Exception:
+        logger.exception("Error fetching low stock alerts")
+        return Response(
+            data={"error": "Failed to fetch low stock alerts"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view()
+async def get_user_orders(request):
+    """Get orders for the current user"""
+    try:
+        orders = Order.objects.filter(username=request.user.username).order_by('-created_on')
+        lines = group_lines(await avalues_list(order_lines(orders), ORDER_LINE_FIELDS))
+        return Response(
+            data={"orders": order_rows(await avalues_list(orders, ORDER_LIST_FIELDS), lines)},
+            status=status.HTTP_200_OK
+        )
+    except Exception:
+        logger.exception("Error fetching orders")
+        return Response(
+            data={"error": "Failed to fetch orders"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(admin=True)
+async def get_admin_dashboard(request):
+    """Order counts, newest orders per status, low stock and sales totals for the admin portal"""
+    try:
+        return Response(data=await dashboard_snapshots.get(), status=status.HTTP_200_OK)
+
+    except Exception:
+        logger.exception("Error fetching admin dashboard")
+        return Response(
+            data={"error": "Failed to fetch admin dashboard"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+# Analytics Views
+@async_api_view(admin=True)
+async def get_sales_analytics(request):
+    """Get sales analytics - orders by product"""
+    try:
+        return Response(data=await analytics.asales_analytics(), status=status.HTTP_200_OK)
+
+    except Exception:
+        logger.exception("Error fetching sales analytics")
+        return Response(
+            data={"error": "Failed to fetch sales analytics"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(admin=True)
+async def get_popular_products(request):
+    """Get most popular products based on order count or quantity"""
+    try:
+        limit = int(request.GET.get('limit', 10))
+        sort_by = request.GET.get('sort_by', 'orders')  # 'orders' or 'quantity'
+
+        return Response(
+            data=await analytics.apopular_products(limit=limit, sort_by=sort_by),
+            status=status.HTTP_200_OK
+        )
+
+    except Exception:
+        logger.exception("Error fetching popular products")
+        return Response(
+            data={"error": "Failed to fetch popular products"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(renderer_classes=(FastJSONRenderer, ColumnarJSONRenderer), admin=True)
+async def get_stock_inventory(request):
+    """Get full stock inventory with all product details, ?format=columnar for the compact form"""
+    try:
+        columnar = request.accepted_renderer.format == 'columnar'
+        return Response(data=await analytics.astock_inventory(columnar=columnar), status=status.HTTP_200_OK)
+
+    except Exception:
+        logger.exception("Error fetching stock inventory")
+        return Response(
+            data={"error": "Failed to fetch stock inventory"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@async_api_view(admin=True)
+async def get_latency_analytics(request):
+    """Get p50/p90/p99 order lifecycle stage durations by day and category"""
+    try:
+        days = int(request.GET.get('days', 30))
+
+        return Response(data=await analytics.alatency_percentiles(days=days), status=status.HTTP_200_OK)
+
+    except Exception:
+        logger.exception("Error fetching latency analytics")
+        return Response(
+            data={"error": "Failed to fetch latency analytics"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
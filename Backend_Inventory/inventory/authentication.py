@@ -1,30 +1,110 @@
 # orders/authentication.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
-from rest_framework import authentication, exceptions
+from rest_framework import authentication, exceptions, permissions
 from django.conf import settings
 
+from .metrics import registry
+
+jwt_cache_requests = registry.counter(
+    "inventory_jwt_cache_requests_total",
+    "Bearer tokens checked, by whether the verified-token cache had them (hit, miss or expired)",
+    ["result"],
+)
+
+
+class TokenUser:
+    """Caller identified by the JWT alone (user_id, username and is_admin claims); Auth_MS owns the user table"""
+    __slots__ = ("id", "username", "is_admin")
+    is_authenticated = True
+
+    def __init__(self, user_id, username=None, is_admin=False):
+        self.id = user_id
+        self.username = username
+        self.is_admin = is_admin
+
+
+class VerifiedTokenCache:
+    """
+    The TokenUser of each recently verified token, kept until the token's exp so a token is
+    decoded once per lifetime rather than once per request. Keyed by a digest of the token;
+    the `max_size` most recently used tokens are kept. Invalid tokens, including refresh tokens,
+    are never cached.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # token digest -> (TokenUser, exp)
+
+    def get(self, token):
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self.entries.move_to_end(key)
+                    jwt_cache_requests.inc(result="hit")
+                    return entry[0]
+                # Expired: decoding again raises "Token expired"
+                del self.entries[key]
+                jwt_cache_requests.inc(result="expired")
+            else:
+                jwt_cache_requests.inc(result="miss")
+
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        # Refresh tokens are signed with the same key and carry the same claims, but only buy new access tokens
+        if payload.get("token_type") != "access":
+            raise exceptions.AuthenticationFailed("Invalid token type")
+        user_id = payload.get("user_id")
+        username = payload.get("username")
+        # Tokens issued before the username claim was added are refused, the client logs in again
+        if not user_id or not username:
+            raise exceptions.AuthenticationFailed("Invalid token payload")
+        user = TokenUser(user_id, username, payload.get("is_admin") is True)
+
+        if "exp" in payload:
+            with self.lock:
+                self.entries[key] = (user, payload["exp"])
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        return user
+
+
+# Global instance
+verified_tokens = VerifiedTokenCache(max_size=getattr(settings, "JWT_CACHE_SIZE", 10000))
+
+
+def authenticate_token(auth_header):
+    """
+    (TokenUser, None) for a valid "Bearer <jwt>" Authorization header, None when there is no bearer token.
+    Only decodes the token (once per token, see VerifiedTokenCache), so it is safe to call from
+    async views without a thread hop.
+    """
+    if not auth_header:
+        return None
+    scheme, _, token = auth_header.partition(" ")
+    if not token or " " in token or scheme.lower() != "bearer":
+        return None
+    try:
+        return (verified_tokens.get(token), None)
+    except jwt.ExpiredSignatureError:
+        raise exceptions.AuthenticationFailed("Token expired")
+    except jwt.InvalidTokenError:
+        raise exceptions.AuthenticationFailed("Invalid token")
+
+
 class JWTAuthenticationWithoutUserDB(authentication.BaseAuthentication):
     def authenticate(self, request):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return None
-        try:
-            prefix, token = auth_header.split(" ")
-            if prefix.lower() != "bearer":
-                return None
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            if not user_id:
-                raise exceptions.AuthenticationFailed("Invalid token payload")
-
-            # dummy user object
-            class DummyUser:
-                id = user_id
-                @property
-                def is_authenticated(self):
-                    return True  # <--- Add this
-            return (DummyUser(), None)
-        except jwt.ExpiredSignatureError:
-            raise exceptions.AuthenticationFailed("Token expired")
-        except jwt.InvalidTokenError:
-            raise exceptions.AuthenticationFailed("Invalid token")
+        return authenticate_token(request.headers.get("Authorization"))
+
+
+class IsAdminToken(permissions.BasePermission):
+    """Admin routes: checks the token's is_admin claim, so no user lookup"""
+
+    def has_permission(self, request, view):
+        return getattr(request.user, "is_admin", False)
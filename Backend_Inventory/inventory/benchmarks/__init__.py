@@ -0,0 +1,5 @@
+"""
+Offline benchmark harness for the inventory service.
+
+Run with ``python manage.py run_benchmarks --settings=inventory_proj.bench_settings``.
+"""
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.conf import settings
+
+from inventory.channel_layer import UnixSocketChannelLayer
+
+from .stats import summarize
+
+GROUP = "bench_fan_out"
+
+
+async def _measure(sender, receiver, receivers, messages):
+    channels = [await receiver.new_channel() for _ in range(receivers)]
+    for channel in channels:
+        await receiver.group_add(GROUP, channel)
+
+    # Fan-out latency: one group_send at a time, until the last receiver has it
+    latencies = []
+    for i in range(messages):
+        sent = time.perf_counter()
+        await sender.group_send(GROUP, {"type": "bench.message", "seq": i})
+        await asyncio.gather(*(receiver.receive(channel) for channel in channels))
+        latencies.append(time.perf_counter() - sent)
+    summary = summarize(latencies, receivers=receivers)
+
+    # Throughput: every group_send back to back while the receivers drain their channels
+    async def drain(channel):
+        for _ in range(messages):
+            await receiver.receive(channel)
+
+    started = time.perf_counter()
+    drains = asyncio.gather(*(drain(channel) for channel in channels))
+    for i in range(messages):
+        await sender.group_send(GROUP, {"type": "bench.message", "seq": i})
+    await asyncio.wait_for(drains, timeout=60)
+    elapsed = time.perf_counter() - started
+    summary["group_sends_per_sec"] = round(messages / elapsed, 1)
+    summary["messages_delivered_per_sec"] = round(messages * receivers / elapsed, 1)
+
+    for channel in channels:
+        await receiver.group_discard(GROUP, channel)
+    return summary
+
+
+def _start_router(path):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get("PYTHONPATH")])),
+    }
+    router = subprocess.Popen(
+        [sys.executable, "-m", "django", "run_channel_router", "--socket", path],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return router
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            probe.close()
+    router.kill()
+    raise RuntimeError("Channel router did not start")
+
+
+def benchmark_channel_layers(receivers, messages, log=None):
+    """
+    group_send throughput and fan-out latency to `receivers` channels on InMemoryChannelLayer and
+    on UnixSocketChannelLayer. For "unix_socket" the sender and receivers are separate layer
+    instances, each with its own router connection, so every message goes through the router
+    process as it does between Daphne processes; "unix_socket_local" has them in one instance.
+    """
+    # Room for a whole throughput run per channel, so nothing is dropped for capacity
+    capacity = messages + 1
+    results = {}
+
+    if log:
+        log("  channel layer in_memory")
+    layer = InMemoryChannelLayer(capacity=capacity)
+    results["in_memory"] = async_to_sync(_measure)(layer, layer, receivers, messages)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "channels.sock")
+        router = _start_router(path)
+        try:
+            sender = UnixSocketChannelLayer(path, capacity=capacity)
+            receiver = UnixSocketChannelLayer(path, capacity=capacity)
+            if log:
+                log("  channel layer unix_socket")
+            results["unix_socket"] = async_to_sync(_measure)(sender, receiver, receivers, messages)
+            if log:
+                log("  channel layer unix_socket_local")
+            results["unix_socket_local"] = async_to_sync(_measure)(receiver, receiver, receivers, messages)
+        finally:
+            router.terminate()
+            router.wait()
+    return results
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from .routes import mint_token
+from .stats import summarize
+
+# Read routes served by inventory/async_views.py that answer in milliseconds. The full-table
+# routes (get_all_products, get_stock_inventory, get_latency_analytics) spend their time
+# rendering or in SQL either way, and hundreds of concurrent copies would only measure that.
+CONCURRENCY_ROUTES = {
+    'search_products': lambda: reverse('search_products') + '?search=Load',
+    'get_user_orders': lambda: reverse('get_user_orders'),
+    'get_low_stock_products': lambda: reverse('get_low_stock_products'),
+    'get_popular_products': lambda: reverse('get_popular_products'),
+    'get_sales_analytics': lambda: reverse('get_sales_analytics'),
+}
+
+SYNC_URLCONF = 'inventory.benchmarks.sync_urls'
+
+
+async def _load(path, clients, requests_per_client, headers):
+    # One in-process ASGI handler, as under Daphne; each client sends its requests back to back
+    client = AsyncClient()
+    await client.get(path, headers=headers)
+
+    latencies, statuses = [], set()
+
+    async def run_client():
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses.add(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed=elapsed, status_codes=sorted(statuses))
+
+
+def benchmark_concurrency(clients, requests_per_client, log=None):
+    """
+    Requests/sec with `clients` concurrent connections per read route, served by the sync DRF
+    views (inventory/benchmarks/sync_urls.py) and by the async views
+    """
+    headers = {"Authorization": f"Bearer {mint_token()}"}
+    results = []
+    for name, build in CONCURRENCY_ROUTES.items():
+        if log:
+            log(f"  concurrency {name}")
+        path = build()
+        with override_settings(ROOT_URLCONF=SYNC_URLCONF):
+            sync = async_to_sync(_load)(path, clients, requests_per_client, headers)
+        async_ = async_to_sync(_load)(path, clients, requests_per_client, headers)
+        results.append({
+            "route": name,
+            "clients": clients,
+            "sync": sync,
+            "async": async_,
+            "speedup": round(async_["throughput_per_sec"] / sync["throughput_per_sec"], 2),
+        })
+    return results
@@ -0,0 +1,34 @@
+import time
+
+from channels.layers import get_channel_layer
+
+from inventory.consumer import ConsumeOrders
+from inventory.models import Order
+
+from .routes import BENCH_USER_ID, BENCH_USERNAME
+from .stats import summarize
+
+
+def benchmark_consumer(order_count):
+    """Orders/sec through ConsumeOrders.process_order with the simulated processing sleep removed"""
+    # The consumer only reads the order header, so the orders need no lines
+    orders = Order.objects.bulk_create([
+        Order(user_id=BENCH_USER_ID, username=BENCH_USERNAME, status="Processing")
+        for _ in range(order_count)
+    ])
+    order_ids = [order.id for order in orders]
+
+    consumer = ConsumeOrders()
+    consumer.thread_sleep_time = 0
+    channel_layer = get_channel_layer()
+
+    latencies = []
+    started = time.perf_counter()
+    for order_id in order_ids:
+        order_started = time.perf_counter()
+        consumer.process_order(order_id, channel_layer)
+        latencies.append(time.perf_counter() - order_started)
+    elapsed = time.perf_counter() - started
+
+    processed = Order.objects.filter(id__in=order_ids, status="Processed").count()
+    return summarize(latencies, elapsed=elapsed, orders=order_count, processed=processed)
@@ -0,0 +1,160 @@
+import json
+import time
+
+import jwt
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory import urls as inventory_urls
+from inventory.models import Order, OrderLine, Product
+from inventory.order_queue import order_queue
+from inventory.report_jobs import report_jobs
+
+from .stats import summarize
+
+BENCH_USER_ID = 1
+BENCH_USERNAME = 'loaduser1'
+
+
+def mint_token(user_id=BENCH_USER_ID, username=BENCH_USERNAME, is_admin=True, lifetime=3600):
+    """Access token signed the same way Auth_MS signs them, with its username and is_admin claims"""
+    now = int(time.time())
+    payload = {
+        "token_type": "access", "user_id": user_id, "username": username, "is_admin": is_admin,
+        "iat": now, "exp": now + lifetime,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
+
+
+class RouteContext:
+    """Shared fixtures the route specs draw on: an authenticated client and a well-stocked product"""
+
+    def __init__(self):
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {mint_token()}")
+        self.product = Product.objects.order_by('id').first()
+        if self.product is None:
+            raise RuntimeError("Seed products before benchmarking routes")
+        # Accepting orders must never fail for lack of stock
+        Product.objects.filter(id=self.product.id).update(stock_quantity=10 ** 9)
+        self.report_job_id = report_jobs.submit('sales')[0]['job_id']
+
+    def pending_order(self):
+        order = Order.objects.create(user_id=BENCH_USER_ID, username=BENCH_USERNAME)
+        OrderLine.objects.create(
+            order=order,
+            item_id=self.product.id,
+            item_name=self.product.name,
+            item_quantity=1,
+            product=self.product,
+        )
+        return order.id
+
+    def order_line(self):
+        return [{"item_id": self.product.id, "item_name": self.product.name, "item_quantity": 1}]
+
+
+# url name -> (method, function building (path, body) from the context, heavy)
+# Heavy routes scan whole tables and run a tenth of the iterations.
+ROUTE_SPECS = {
+    'order-list': ('post', lambda ctx: (reverse('order-list'), ctx.order_line()), False),
+    'get_user_orders': ('get', lambda ctx: (reverse('get_user_orders'), None), False),
+    'get_admin_dashboard': ('get', lambda ctx: (reverse('get_admin_dashboard'), None), False),
+    'get_low_stock_alerts': ('get', lambda ctx: (reverse('get_low_stock_alerts'), None), False),
+    'get_all_orders_admin': ('get', lambda ctx: (reverse('get_all_orders_admin'), None), True),
+    'accept_order': (
+        'post', lambda ctx: (reverse('accept_order', kwargs={'order_id': ctx.pending_order()}), {}), False
+    ),
+    'cancel_order': (
+        'post', lambda ctx: (reverse('cancel_order', kwargs={'order_id': ctx.pending_order()}), {}), False
+    ),
+    'search_products': ('get', lambda ctx: (reverse('search_products') + '?search=Load', None), False),
+    'get_all_products': ('get', lambda ctx: (reverse('get_all_products'), None), False),
+    'get_low_stock_products': ('get', lambda ctx: (reverse('get_low_stock_products'), None), False),
+    'update_stock': (
+        'post',
+        lambda ctx: (reverse('update_stock', kwargs={'product_id': ctx.product.id}), {"stock_quantity": 10 ** 9}),
+        False,
+    ),
+    'get_sales_analytics': ('get', lambda ctx: (reverse('get_sales_analytics'), None), True),
+    'get_popular_products': ('get', lambda ctx: (reverse('get_popular_products'), None), True),
+    'get_latency_analytics': ('get', lambda ctx: (reverse('get_latency_analytics'), None), True),
+    'get_stock_inventory': ('get', lambda ctx: (reverse('get_stock_inventory'), None), False),
+    'export_orders_csv': ('get', lambda ctx: (reverse('export_orders_csv'), None), True),
+    'export_orders_ndjson': ('get', lambda ctx: (reverse('export_orders_ndjson'), None), True),
+    'export_inventory_csv': ('get', lambda ctx: (reverse('export_inventory_csv'), None), False),
+    'export_inventory_ndjson': ('get', lambda ctx: (reverse('export_inventory_ndjson'), None), False),
+    'create_report_job': ('post', lambda ctx: (reverse('create_report_job'), {"report": "sales"}), False),
+    'get_report_job': (
+        'get', lambda ctx: (reverse('get_report_job', kwargs={'job_id': ctx.report_job_id}), None), False
+    ),
+    'get_query_metrics': ('get', lambda ctx: (reverse('get_query_metrics'), None), False),
+    'get_profiles': ('get', lambda ctx: (reverse('get_profiles'), None), False),
+}
+
+
+def _request(client, method, path, body):
+    if method == 'post':
+        response = client.post(path, data=json.dumps(body), content_type='application/json')
+    else:
+        response = client.get(path)
+    # Streaming responses only do their work while being consumed
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+def benchmark_route(ctx, name, iterations, warmup=2):
+    method, build, heavy = ROUTE_SPECS[name]
+    if heavy:
+        iterations = max(1, iterations // 10)
+
+    for _ in range(warmup):
+        _request(ctx.client, method, *build(ctx))
+
+    latencies, query_counts, statuses, sizes = [], [], set(), []
+    elapsed = 0.0
+    for _ in range(iterations):
+        path, body = build(ctx)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            status_code, size = _request(ctx.client, method, path, body)
+            duration = time.perf_counter() - started
+        elapsed += duration
+        latencies.append(duration)
+        query_counts.append(len(queries.captured_queries))
+        statuses.add(status_code)
+        sizes.append(size)
+
+    return summarize(
+        latencies,
+        elapsed=elapsed,
+        route=name,
+        method=method.upper(),
+        status_codes=sorted(statuses),
+        queries_per_request=round(sum(query_counts) / len(query_counts), 2),
+        response_bytes=round(sum(sizes) / len(sizes)),
+    )
+
+
+def benchmark_routes(iterations, warmup=2, log=None):
+    """Benchmark every named route in inventory/urls.py, flagging routes without a spec"""
+    ctx = RouteContext()
+    results = []
+    for pattern in inventory_urls.urlpatterns:
+        name = pattern.name
+        if name not in ROUTE_SPECS:
+            results.append({"route": name, "skipped": "no benchmark spec"})
+            continue
+        if log:
+            log(f"  route {name}")
+        results.append(benchmark_route(ctx, name, iterations, warmup))
+
+    # Accepted orders were queued for a consumer that is not running
+    while not order_queue.empty():
+        order_queue.get_nowait()
+    return results
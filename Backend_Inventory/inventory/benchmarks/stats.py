@@ -0,0 +1,31 @@
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed=None, **extra):
+    """Latency percentiles in milliseconds plus throughput for a list of per-operation durations (seconds)"""
+    values = sorted(latencies)
+    count = len(values)
+    total = elapsed if elapsed is not None else sum(values)
+    summary = {
+        "count": count,
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+        "max_ms": _ms(values[-1] if values else None),
+        "mean_ms": _ms(sum(values) / count if count else None),
+        "throughput_per_sec": round(count / total, 1) if total else None,
+    }
+    summary.update(extra)
+    return summary
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
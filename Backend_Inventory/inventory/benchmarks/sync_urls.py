@@ -0,0 +1,27 @@
+"""The inventory URLs with the read endpoints served by the sync DRF views, as a benchmark baseline"""
+from django.urls import include, path
+
+from inventory import urls
+
+from . import sync_views
+
+SYNC_READ_VIEWS = {
+    'get_user_orders': sync_views.get_user_orders,
+    'search_products': sync_views.searchList,
+    'get_all_products': sync_views.get_all_products,
+    'get_low_stock_products': sync_views.get_low_stock_products,
+    'get_sales_analytics': sync_views.get_sales_analytics,
+    'get_popular_products': sync_views.get_popular_products,
+    'get_latency_analytics': sync_views.get_latency_analytics,
+    'get_stock_inventory': sync_views.get_stock_inventory,
+}
+
+inventory_patterns = [
+    path(str(pattern.pattern), SYNC_READ_VIEWS[pattern.name], pattern.default_args, name=pattern.name)
+    if pattern.name in SYNC_READ_VIEWS else pattern
+    for pattern in urls.urlpatterns
+]
+
+urlpatterns = [
+    path('api/', include(inventory_patterns)),
+]
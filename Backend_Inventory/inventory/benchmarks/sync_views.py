@@ -0,0 +1,172 @@
+"""
+Sync DRF versions of the read endpoints that urls.py serves with inventory/async_views.py.
+Only the benchmark baseline uses them (sync_urls.py), to compare sync and async views
+under concurrency; responses match the async views.
+"""
+import logging
+
+from django.db.models import F
+from rest_framework import status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from inventory import analytics
+from inventory.authentication import IsAdminToken, JWTAuthenticationWithoutUserDB
+from inventory.models import Order, Product
+from inventory.renderers import COLUMNAR_RENDERER_CLASSES, FAST_RENDERER_CLASSES
+from inventory.rows import (
+    PRODUCT_LIST_FIELDS, ORDER_LIST_FIELDS, ORDER_LINE_FIELDS, SEARCH_FIELDS, LOW_STOCK_FIELDS,
+    product_rows, order_lines, group_lines, order_rows, search_rows, low_stock_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated])
+@renderer_classes(FAST_RENDERER_CLASSES)
+def searchList(request):
+    """Search for products in the inventory database"""
+    value = request.GET.get('search', '').strip()
+    
+    if not value:
+        return Response(data={"message": []}, status=status.HTTP_200_OK)
+    
+    # Search products by name (case-insensitive, starts with)
+    products = Product.objects.filter(
+        name__istartswith=value,
+        stock_quantity__gt=0  # Only show in-stock items
+    )[:10]  # Limit to 10 results
+    
+    # Format response to match frontend expectations
+    return Response(data={"message": search_rows(products.values_list(*SEARCH_FIELDS))}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated])
+@renderer_classes(FAST_RENDERER_CLASSES)
+def get_all_products(request):
+    """Get all products in inventory"""
+    try:
+        products = Product.objects.all()
+        return Response(data={"products": product_rows(products.values_list(*PRODUCT_LIST_FIELDS))}, status=status.HTTP_200_OK)
+    except Exception:
+        logger.exception("Error fetching products")
+        return Response(
+            data={"error": "Failed to fetch products"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated])
+@renderer_classes(FAST_RENDERER_CLASSES)
+def get_low_stock_products(request):
+    """Get products that are low on stock - for admin alerts"""
+    try:
+        # Get products where stock_quantity <= low_stock_threshold
+        products = Product.objects.filter(stock_quantity__lte=F('low_stock_threshold'))
+        low_stock = low_stock_rows(products.values_list(*LOW_STOCK_FIELDS))
+        return Response(data={"low_stock_products": low_stock}, status=status.HTTP_200_OK)
+    except Exception:
+        logger.exception("Error fetching low stock products")
+        return Response(
+            data={"error": "Failed to fetch low stock products"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated])
+@renderer_classes(FAST_RENDERER_CLASSES)
+def get_user_orders(request):
+    """Get orders for the current user"""
+    try:
+        orders = Order.objects.filter(username=request.user.username).order_by('-created_on')
+        lines = group_lines(order_lines(orders).values_list(*ORDER_LINE_FIELDS))
+        return Response(data={"orders": order_rows(orders.values_list(*ORDER_LIST_FIELDS), lines)}, status=status.HTTP_200_OK)
+    except Exception:
+        logger.exception("Error fetching orders")
+        return Response(
+            data={"error": "Failed to fetch orders"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+def get_sales_analytics(request):
+    """Get sales analytics - orders by product"""
+    try:
+        return Response(data=analytics.sales_analytics(), status=status.HTTP_200_OK)
+        
+    except Exception:
+        logger.exception("Error fetching sales analytics")
+        return Response(
+            data={"error": "Failed to fetch sales analytics"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+def get_popular_products(request):
+    """Get most popular products based on order count or quantity"""
+    try:
+        limit = int(request.GET.get('limit', 10))
+        sort_by = request.GET.get('sort_by', 'orders')  # 'orders' or 'quantity'
+        
+        return Response(
+            data=analytics.popular_products(limit=limit, sort_by=sort_by),
+            status=status.HTTP_200_OK
+        )
+        
+    except Exception:
+        logger.exception("Error fetching popular products")
+        return Response(
+            data={"error": "Failed to fetch popular products"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+@renderer_classes(COLUMNAR_RENDERER_CLASSES)
+def get_stock_inventory(request):
+    """Get full stock inventory with all product details, ?format=columnar for the compact form"""
+    try:
+        columnar = request.accepted_renderer.format == 'columnar'
+        return Response(data=analytics.stock_inventory(columnar=columnar), status=status.HTTP_200_OK)
+        
+    except Exception:
+        logger.exception("Error fetching stock inventory")
+        return Response(
+            data={"error": "Failed to fetch stock inventory"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+def get_latency_analytics(request):
+    """Get p50/p90/p99 order lifecycle stage durations by day and category"""
+    try:
+        days = int(request.GET.get('days', 30))
+        
+        return Response(data=analytics.latency_percentiles(days=days), status=status.HTTP_200_OK)
+        
+    except Exception:
+        logger.exception("Error fetching latency analytics")
+        return Response(
+            data={"error": "Failed to fetch latency analytics"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
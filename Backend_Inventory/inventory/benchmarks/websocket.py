@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from .routes import mint_token
+from .stats import summarize
+
+
+def _events(frame):
+    data = json.loads(frame)
+    return len(data["events"]) if data.get("type") == "batch" else 1
+
+
+async def _connect(application, token, ack=False):
+    path = f"/ws/stream/?token={token}&topics=admin_orders" + ("&ack=1" if ack else "")
+    communicator = WebsocketCommunicator(application, path)
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError("ws/stream/ refused the benchmark connection")
+    await communicator.receive_json_from()  # subscribed
+    return communicator
+
+
+async def _fan_out(application, clients, messages, slow_clients=0):
+    channel_layer = get_channel_layer()
+    token = mint_token()
+    communicators = [await _connect(application, token) for _ in range(clients)]
+    # Slow clients ask to ack frames and never do, like a browser that stopped reading
+    slow = [await _connect(application, token, ack=True) for _ in range(slow_clients)]
+
+    latencies = []
+    try:
+        started = time.perf_counter()
+        for i in range(messages):
+            sent = time.perf_counter()
+            await channel_layer.group_send(
+                "admin_orders",
+                {
+                    "type": "order_update",
+                    "message": {"order_id": i, "action": "benchmark", "status": "Pending"}
+                }
+            )
+            # Fan-out latency is the time until the slowest healthy client has the frame
+            await asyncio.gather(*(communicator.receive_from(timeout=5) for communicator in communicators))
+            latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - started
+
+        # What the slow clients got: the ack window's worth of frames, then (once they ack)
+        # the outbox's high-water mark of events, with the oldest dropped or coalesced
+        slow_frames = slow_events = 0
+        for communicator in slow:
+            while not communicator.output_queue.empty():
+                slow_frames += 1
+                slow_events += _events((await communicator.receive_output())["text"])
+            await communicator.send_json_to({"action": "ack", "frames": slow_frames + 1})  # + subscribed
+            caught_up = await communicator.receive_from(timeout=5)
+            slow_frames += 1
+            slow_events += _events(caught_up)
+    finally:
+        for communicator in communicators + slow:
+            await communicator.disconnect()
+
+    summary = summarize(latencies, elapsed=elapsed, clients=clients)
+    summary["frames_delivered_per_sec"] = round(clients * messages / elapsed, 1) if elapsed else None
+    if slow_clients:
+        summary.update(slow_clients=slow_clients, slow_client_frames=slow_frames, slow_client_events=slow_events)
+    return summary
+
+
+def benchmark_websocket_fan_out(clients, messages):
+    """
+    group_send to admin_orders and time delivery to every ws/stream/ socket subscribed to it, then
+    again with one client that stops acknowledging frames: latency to the healthy clients should
+    not change.
+    """
+    from inventory_proj.asgi import application
+    return {
+        "healthy": async_to_sync(_fan_out)(application, clients, messages),
+        "one_slow_client": async_to_sync(_fan_out)(application, clients, messages, slow_clients=1),
+    }
@@ -0,0 +1,552 @@
+"""
+Channel layer for running several Daphne processes on one host without Redis.
+
+Each process connects to a router (`python manage.py run_channel_router`) over a Unix domain
+socket. The router holds group membership. A group_send reaches it once, and it writes one
+frame to each other process with members in the group, which puts the message on each of its
+local channels. Messages for this process's own channels never leave it.
+
+Channel buffers hold at most `capacity` messages, messages nobody reads expire after `expiry`
+seconds (and take their channel out of its groups) and memberships expire after
+`group_expiry` seconds, as in channels' InMemoryChannelLayer. If the router restarts, every
+process reconnects and re-adds its memberships.
+
+Only process-specific channels (the ones new_channel() returns, which is what consumers use)
+cross processes; send() to a plain channel name is delivered in this process.
+
+Without a socket path the layer serves this process only. Unlike InMemoryChannelLayer it can
+still be sent to from other threads: the order consumer and stock update threads send through
+async_to_sync on their own event loops, and InMemoryChannelLayer wakes a receiver on the
+server's loop from the wrong thread, so those messages wait for some unrelated wakeup.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import queue
+import random
+import socket
+import string
+import struct
+import threading
+import time
+import uuid
+from collections import deque
+
+import msgpack
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+channel_messages_dropped = registry.counter(
+    "inventory_channel_layer_dropped_total",
+    "Channel layer messages dropped: channel full, expired unread, router unreachable or process too slow",
+    ["reason"],
+)
+
+_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+def _pack(message):
+    return msgpack.packb(message, use_bin_type=True)
+
+
+def _unpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+
+def _frame(*fields):
+    """Length-prefixed msgpack array, the unit both ends of the socket read and write"""
+    payload = _pack(fields)
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _owner(channel):
+    """Client id of the process holding a process-specific channel, None for plain channel names"""
+    bang = channel.find("!")
+    if bang < 0:
+        return None
+    return channel[channel.rfind(".", 0, bang) + 1:bang]
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _wake_threadsafe(loop, future):
+    try:
+        if asyncio.get_running_loop() is loop:
+            _wake(future)
+            return
+    except RuntimeError:
+        pass
+    try:
+        loop.call_soon_threadsafe(_wake, future)
+    except RuntimeError:
+        pass  # The waiting loop has closed
+
+
+class _Buffer:
+    __slots__ = ("messages", "waiter")
+
+    def __init__(self):
+        self.messages = deque()  # (expires, message)
+        self.waiter = None  # (loop, future) of the receive() waiting for a message
+
+
+class UnixSocketChannelLayer(BaseChannelLayer):
+    """
+    Channel layer shared by the processes connected to one router socket. It is safe to use
+    from any thread and event loop, including async_to_sync in the order consumer thread.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path=None, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 timeout=5.0, outbox_size=10000, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.path = path
+        self.group_expiry = group_expiry
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.outbox = queue.Queue(maxsize=outbox_size)  # Encoded frames for the writer thread
+        self.pid = None
+        self.closed = False
+        self._reset()
+
+    def _reset(self):
+        self.client_id = uuid.uuid4().hex[:12]
+        self.channels = {}  # channel -> _Buffer
+        self.groups = {}  # group -> {channel: time added}, for this process's channels
+        self.pending = {}  # request id -> (loop, future) waiting for the router's ack
+        self.request_ids = itertools.count()
+        self.sock = None
+        self.next_sweep = 0.0
+
+    def _ensure_started(self):
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            if self.pid is not None:
+                # A forked child must not answer for the parent's channels
+                self._reset()
+                self.outbox = queue.Queue(maxsize=self.outbox.maxsize)
+            self.pid = os.getpid()
+        if self.path is None:
+            return
+        # Connect now so the first group_add is acknowledged rather than replayed later
+        sock = self._connect()
+        threading.Thread(target=self._read_loop, args=(sock,), daemon=True, name="channel-layer-reader").start()
+        threading.Thread(target=self._write_loop, daemon=True, name="channel-layer-writer").start()
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        """Send a message onto a channel, raising ChannelFull if a local channel is at capacity"""
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        self._ensure_started()
+
+        # Round-tripped locally too, so a message that cannot cross processes fails in development
+        data = _pack(message)
+        owner = _owner(channel)
+        if owner is None or owner == self.client_id:
+            if not self._put(channel, _unpack(data)):
+                raise ChannelFull(channel)
+        else:
+            self._send_frame(_frame("send", channel, data))
+
+    async def receive(self, channel):
+        """Receive the first message that arrives on the channel"""
+        assert self.valid_channel_name(channel)
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self.lock:
+                buffer = self.channels.get(channel)
+                if buffer is None:
+                    buffer = self.channels[channel] = _Buffer()
+                now = time.time()
+                while buffer.messages:
+                    expires, message = buffer.messages.popleft()
+                    if expires >= now:
+                        if not buffer.messages:
+                            del self.channels[channel]
+                        return message
+                    channel_messages_dropped.inc(reason="expired")
+                future = loop.create_future()
+                buffer.waiter = (loop, future)
+
+            try:
+                await future
+            finally:
+                with self.lock:
+                    if buffer.waiter is not None and buffer.waiter[1] is future:
+                        buffer.waiter = None
+                    if not buffer.messages and buffer.waiter is None and self.channels.get(channel) is buffer:
+                        del self.channels[channel]
+
+    async def new_channel(self, prefix="specific."):
+        """A process-specific channel name; the router delivers to it through this process"""
+        self._ensure_started()
+        return "%s.%s!%s" % (prefix, self.client_id, "".join(random.choices(string.ascii_letters, k=12)))
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        self._ensure_started()
+        if _owner(channel) == self.client_id:
+            with self.lock:
+                self.groups.setdefault(group, {})[channel] = time.time()
+
+        # Wait for the router so a group_send from another process right after this sees the member
+        future = self._request("add", group, channel)
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Channel router did not acknowledge group_add", extra={"group": group})
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), "Invalid channel name"
+        assert self.valid_group_name(group), "Invalid group name"
+        self._ensure_started()
+        with self.lock:
+            members = self.groups.get(group)
+            if members is not None:
+                members.pop(channel, None)
+                if not members:
+                    del self.groups[group]
+        self._send_frame(_frame("discard", group, channel))
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Invalid group name"
+        self._ensure_started()
+
+        data = _pack(message)
+        cutoff = time.time() - self.group_expiry
+        with self.lock:
+            members = self.groups.get(group, {})
+            local = [channel for channel, added in members.items() if added >= cutoff]
+        for channel in local:
+            if not self._put(channel, _unpack(data)):
+                channel_messages_dropped.inc(reason="full")
+        # The router skips this process's members, which were just delivered above
+        self._send_frame(_frame("group_send", group, data))
+
+    # Flush extension
+
+    async def flush(self):
+        self._ensure_started()
+        with self.lock:
+            self.channels = {}
+            self.groups = {}
+        future = self._request("flush")
+        if future is not None:
+            await asyncio.wait_for(future, self.timeout)
+
+    async def close(self):
+        """Disconnect from the router and stop this layer's threads"""
+        self.closed = True
+        sock = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        try:
+            self.outbox.put_nowait(None)
+        except queue.Full:
+            pass
+
+    # Local delivery
+
+    def _put(self, channel, message):
+        """Buffer a message for a channel in this process; False if the channel is full"""
+        now = time.time()
+        with self.lock:
+            if now >= self.next_sweep:
+                self._clean_expired(now)
+            buffer = self.channels.get(channel)
+            if buffer is None:
+                buffer = self.channels[channel] = _Buffer()
+            if len(buffer.messages) >= self.get_capacity(channel):
+                return False
+            buffer.messages.append((now + self.expiry, message))
+            waiter, buffer.waiter = buffer.waiter, None
+
+        if waiter is not None:
+            _wake_threadsafe(*waiter)
+        return True
+
+    def _clean_expired(self, now):
+        """
+        Drops expired messages and memberships. A channel with an expired message has nobody
+        reading it, so it also leaves its groups. Called with the lock held, at most once a second.
+        """
+        self.next_sweep = now + 1.0
+        dead = set()
+        for channel, buffer in list(self.channels.items()):
+            expired = 0
+            while buffer.messages and buffer.messages[0][0] < now:
+                buffer.messages.popleft()
+                expired += 1
+            if expired:
+                dead.add(channel)
+                channel_messages_dropped.inc(expired, reason="expired")
+            if not buffer.messages and buffer.waiter is None:
+                del self.channels[channel]
+
+        cutoff = now - self.group_expiry
+        for group, members in list(self.groups.items()):
+            for channel, added in list(members.items()):
+                if channel in dead:
+                    del members[channel]
+                    self._send_frame(_frame("discard", group, channel))
+                elif added < cutoff:
+                    del members[channel]
+            if not members:
+                del self.groups[group]
+
+    # Router connection
+
+    def _request(self, op, *args):
+        """Send a frame the router acknowledges; None when not connected (memberships are replayed on reconnect)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            if self.sock is None:
+                return None
+            request = next(self.request_ids)
+            self.pending[request] = (loop, future)
+        self._send_frame(_frame(op, request, *args))
+        return future
+
+    def _send_frame(self, data):
+        if self.path is None:
+            return
+        if self.sock is None:
+            channel_messages_dropped.inc(reason="disconnected")
+            return
+        try:
+            self.outbox.put_nowait(data)
+        except queue.Full:
+            channel_messages_dropped.inc(reason="outbox_full")
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            with self.lock:
+                # Announce this process and restore its memberships before anything else is written
+                adds = [
+                    _frame("add", None, group, channel)
+                    for group, members in self.groups.items() for channel in members
+                ]
+                sock.sendall(_frame("hello", self.client_id) + b"".join(adds))
+                self.sock = sock
+        except OSError as e:
+            sock.close()
+            logger.warning("Channel router unavailable", extra={"path": self.path, "error": str(e)})
+            return None
+        logger.info("Connected to channel router", extra={"path": self.path})
+        return sock
+
+    def _disconnected(self, sock):
+        with self.lock:
+            if self.sock is sock:
+                self.sock = None
+            pending, self.pending = self.pending, {}
+        sock.close()
+        for waiter in pending.values():
+            _wake_threadsafe(*waiter)
+
+    def _read_loop(self, sock):
+        delay = 0.1
+        while not self.closed:
+            if sock is None:
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                sock = self._connect()
+                continue
+            delay = 0.1
+            try:
+                self._read_frames(sock)
+            except (OSError, ValueError) as e:
+                logger.warning("Channel router connection failed", extra={"error": str(e)})
+            self._disconnected(sock)
+            sock = None
+
+    def _read_frames(self, sock):
+        reader = sock.makefile("rb")
+        while True:
+            header = reader.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            (size,) = _HEADER.unpack(header)
+            if size > MAX_FRAME_SIZE:
+                raise ValueError(f"Frame of {size} bytes from channel router")
+            frame = _unpack(reader.read(size))
+
+            if frame[0] == "deliver":
+                _, channels, data = frame
+                for channel in channels:
+                    if not self._put(channel, _unpack(data)):
+                        channel_messages_dropped.inc(reason="full")
+            elif frame[0] == "ack":
+                with self.lock:
+                    waiter = self.pending.pop(frame[1], None)
+                if waiter is not None:
+                    _wake_threadsafe(*waiter)
+
+    def _write_loop(self):
+        outbox = self.outbox
+        while True:
+            # Everything queued while the last write ran goes out in one sendall
+            frames = [outbox.get()]
+            while len(frames) < 512:
+                try:
+                    frames.append(outbox.get_nowait())
+                except queue.Empty:
+                    break
+            if None in frames:
+                return  # close()
+            sock = self.sock
+            if sock is None:
+                channel_messages_dropped.inc(len(frames), reason="disconnected")
+                continue
+            try:
+                sock.sendall(b"".join(frames))
+            except OSError:
+                channel_messages_dropped.inc(len(frames), reason="disconnected")
+                self._disconnected(sock)
+
+
+class ChannelRouter:
+    """
+    Routes send() and group_send() between the processes connected to one Unix socket, and
+    holds the group memberships of all of them. Messages are forwarded as the sender encoded them.
+    """
+
+    def __init__(self, path, group_expiry=86400, max_buffer=4 * 1024 * 1024):
+        self.path = path
+        self.group_expiry = group_expiry
+        self.max_buffer = max_buffer  # Bytes queued for one process before its frames are dropped
+        self.clients = {}  # client id -> StreamWriter
+        self.groups = {}  # group -> {channel: time added}
+
+    async def start(self):
+        # The caller has checked that no router is listening, so a leftover socket file is stale
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        return server
+
+    async def serve(self):
+        server = await self.start()
+        logger.info("Channel router listening", extra={"path": self.path})
+        async with server:
+            while True:
+                await asyncio.sleep(60)
+                self._expire_groups()
+
+    def close(self):
+        """Disconnect every process; call on the router's event loop after closing the server"""
+        for writer in list(self.clients.values()):
+            writer.close()
+
+    async def _handle(self, reader, writer):
+        client = None
+        try:
+            while True:
+                (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                if size > MAX_FRAME_SIZE:
+                    raise ValueError(f"Frame of {size} bytes from client {client}")
+                frame = _unpack(await reader.readexactly(size))
+                op = frame[0]
+
+                if op == "group_send":
+                    self._group_send(client, frame[1], frame[2])
+                elif op == "send":
+                    self._deliver(_owner(frame[1]), [frame[1]], frame[2])
+                elif op == "add":
+                    _, request, group, channel = frame
+                    self.groups.setdefault(group, {})[channel] = time.time()
+                    if request is not None:
+                        self._write(writer, _frame("ack", request))
+                elif op == "discard":
+                    members = self.groups.get(frame[1])
+                    if members is not None:
+                        members.pop(frame[2], None)
+                        if not members:
+                            del self.groups[frame[1]]
+                elif op == "hello":
+                    client = frame[1]
+                    self.clients[client] = writer
+                elif op == "flush":
+                    self.groups.clear()
+                    self._write(writer, _frame("ack", frame[1]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.warning("Dropping channel router client", extra={"client": client, "error": str(e)})
+        finally:
+            # A reconnected process may already have replaced this connection
+            if client is not None and self.clients.get(client) is writer:
+                del self.clients[client]
+                self._remove_client(client)
+            writer.close()
+
+    def _group_send(self, sender, group, data):
+        members = self.groups.get(group)
+        if not members:
+            return
+        cutoff = time.time() - self.group_expiry
+        targets = {}
+        for channel, added in members.items():
+            owner = _owner(channel)
+            if owner is not None and owner != sender and added >= cutoff:
+                targets.setdefault(owner, []).append(channel)
+        for owner, channels in targets.items():
+            self._deliver(owner, channels, data)
+
+    def _deliver(self, owner, channels, data):
+        writer = self.clients.get(owner)
+        if writer is not None:
+            self._write(writer, _frame("deliver", channels, data))
+
+    def _write(self, writer, data):
+        # A process that stops reading loses frames instead of growing the router's memory
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            channel_messages_dropped.inc(reason="process_too_slow")
+            return
+        writer.write(data)
+
+    def _remove_client(self, client):
+        for group, members in list(self.groups.items()):
+            for channel in [channel for channel in members if _owner(channel) == client]:
+                del members[channel]
+            if not members:
+                del self.groups[group]
+
+    def _expire_groups(self):
+        cutoff = time.time() - self.group_expiry
+        for group, members in list(self.groups.items()):
+            for channel in [channel for channel, added in members.items() if added < cutoff]:
+                del members[channel]
+            if not members:
+                del self.groups[group]
@@ -1,8 +1,15 @@
+import logging
 import time
+from django.utils import timezone
 from .order_queue import order_queue
 from .models import Order
+from .metrics import orders_processed, order_processing_duration
+from .notifications import send_group_event, send_order_status
+from .profiling import sampler
+from .structured_logging import bind
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+
+logger = logging.getLogger(__name__)
 
 class ConsumeOrders:
     def __init__(self):
@@ -13,69 +20,70 @@ class ConsumeOrders:
         self.running = True
         channel_layer = get_channel_layer()
         
-        print("Order consumer started...")
+        logger.info("Order consumer started")
         
         while self.running:
             try:
                 if not order_queue.empty():
                     order_id = order_queue.get()
-                    print(f"Processing order {order_id}...")
-                    
-                    try:
-                        order = Order.objects.get(id=order_id)
-                        
-                        # Verify order is in Processing state (should be set by admin acceptance)
-                        if order.status != "Processing":
-                            print(f"Order {order_id} is not in Processing state. Current status: {order.status}")
-                            continue
-                        
-                        # Simulate processing time
-                        print(f"Processing order {order_id} for {self.thread_sleep_time} seconds...")
-                        time.sleep(self.thread_sleep_time)
-                        
-                        # Mark as processed
-                        order.status = "Processed"
-                        order.save()
-                        
-                        # Send completion update to user
-                        if channel_layer:
-                            async_to_sync(channel_layer.group_send)(
-                                f"user_{order.username}",
-                                {
-                                    "type": "order_status",
-                                    "message": {
-                                        "order_id": order.id,
-                                        "status": "Processed",
-                                        "item_name": order.item_name
-                                    }
-                                }
-                            )
-                            
-                            # Notify admin portal
-                            async_to_sync(channel_layer.group_send)(
-                                "admin_orders",
-                                {
-                                    "type": "order_update",
-                                    "message": {
-                                        "order_id": order.id,
-                                        "action": "completed",
-                                        "status": "Processed"
-                                    }
-                                }
-                            )
-                        
-                        print(f"Order {order_id} processed successfully")
-                        
-                    except Order.DoesNotExist:
-                        print(f"Order {order_id} not found!")
+                    sampler.maybe_profile("consumer.process_order", self.process_order, order_id, channel_layer)
                 else:
                     # Sleep briefly if queue is empty
                     time.sleep(0.5)
                     
-            except Exception as e:
-                print(f"Error processing order: {e}")
+            except Exception:
+                logger.exception("Error processing order")
                 time.sleep(1)
 
+    def process_order(self, order_id, channel_layer):
+        """Process a single accepted order and notify the user and admin portal"""
+        started = time.perf_counter()
+        with bind(order_id=order_id, started=started):
+            outcome = self._process(order_id, channel_layer)
+        
+        orders_processed.inc(outcome=outcome)
+        order_processing_duration.observe(time.perf_counter() - started)
+
+    def _process(self, order_id, channel_layer):
+        logger.debug("Processing order %s", order_id)
+        
+        try:
+            order = Order.objects.get(id=order_id)
+            
+            # Verify order is in Processing state (should be set by admin acceptance)
+            if order.status != "Processing":
+                logger.warning(
+                    "Order %s is not in Processing state. Current status: %s", order_id, order.status,
+                    extra={"username": order.username}
+                )
+                return "skipped"
+            
+            # Simulate processing time
+            order.processing_started_at = timezone.now()
+            time.sleep(self.thread_sleep_time)
+            
+            # Mark as processed
+            order.status = "Processed"
+            order.processed_at = timezone.now()
+            order.save(update_fields=['status', 'processing_started_at', 'processed_at'])
+            
+            # Send completion update to user
+            send_order_status(order, "Processed", channel_layer)
+            
+            # Notify admin portal
+            send_group_event("admin_orders", "order_update", {
+                "order_id": order.id,
+                "action": "completed",
+                "status": "Processed"
+            }, channel_layer)
+            
+            logger.info("Order %s processed", order_id, extra={"username": order.username})
+            return "processed"
+            
+        except Order.DoesNotExist:
+            logger.warning("Order %s not found", order_id)
+            return "not_found"
+
     def stop(self):
         self.running = False
 
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from . import analytics
+from .metrics import registry
+
+dashboard_requests = registry.counter(
+    "inventory_dashboard_requests_total",
+    "Admin dashboard requests by how they were served (hit, build or wait for a build)",
+    ["result"],
+)
+
+
+class DashboardSnapshots:
+    """
+    Serves the admin dashboard snapshot from memory for `ttl` seconds. On a miss one request
+    builds it and concurrent requests, on any thread or event loop, wait for that build, so
+    any number of admins cost the database one snapshot per interval. invalidate() bumps a
+    generation; a build that started before it still answers its waiters but isn't kept.
+    """
+
+    def __init__(self, ttl=5.0, page_size=50):
+        self.ttl = ttl
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.expires = 0.0
+        self.building = None  # Future of the build in progress
+        self.generation = 0  # Bumped by invalidate()
+        self.tasks = set()  # Keeps running builds referenced until they finish
+
+    async def get(self):
+        with self.lock:
+            if self.snapshot is not None and time.monotonic() < self.expires:
+                dashboard_requests.inc(result="hit")
+                return self.snapshot
+            building = self.building
+            if building is None:
+                building = self.building = Future()
+                task = asyncio.ensure_future(self._build(building, self.generation))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+                result = "build"
+            else:
+                result = "wait"
+
+        dashboard_requests.inc(result=result)
+        # Shielded so a client disconnecting doesn't cancel the build the others are waiting for
+        return await asyncio.shield(asyncio.wrap_future(building))
+
+    async def _build(self, future, generation):
+        try:
+            snapshot = await analytics.adashboard_snapshot(self.page_size)
+        except Exception as e:
+            with self.lock:
+                self._finish(future)
+            future.set_exception(e)
+        except BaseException:
+            with self.lock:
+                self._finish(future)
+            future.cancel()
+            raise
+        else:
+            with self.lock:
+                # Invalidated while building: the snapshot may predate the change, so don't keep it
+                if generation == self.generation:
+                    self.snapshot = snapshot
+                    self.expires = time.monotonic() + self.ttl
+                self._finish(future)
+            future.set_result(snapshot)
+
+    def _finish(self, future):
+        # An invalidate() may have detached this build and a newer one may be running
+        if self.building is future:
+            self.building = None
+
+    def invalidate(self):
+        """Rebuild on the next request, after an admin action changed what the snapshot shows"""
+        with self.lock:
+            self.generation += 1
+            self.expires = 0.0
+            # Later requests start a fresh build instead of waiting for one that may miss the change
+            self.building = None
+
+
+# Global instance
+dashboard_snapshots = DashboardSnapshots(
+    ttl=getattr(settings, "DASHBOARD_SNAPSHOT_TTL", 5.0),
+    page_size=getattr(settings, "DASHBOARD_PAGE_SIZE", 50),
+)
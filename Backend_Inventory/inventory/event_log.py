@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from .metrics import registry
+from .models import StreamEvent, StreamSequence
+
+event_log_replays = registry.counter(
+    "inventory_event_log_replays_total",
+    "ws/stream/ subscriptions resumed from a last_seq, by outcome (replayed or snapshot)",
+    ["result"],
+)
+
+
+class EventLog:
+    """
+    Sequence numbers and the last `size` events of each group, kept in this process in a ring
+    buffer per group (the `max_groups` most recently used groups are kept).
+
+    A group's sequence starts from the current time in milliseconds when its buffer is created,
+    so numbers keep increasing across a restart or an eviction, and a client still holding one
+    from before is sent a snapshot signal rather than events from a different buffer.
+    """
+
+    def __init__(self, size=1000, max_groups=10000):
+        self.size = size
+        self.max_groups = max_groups
+        self.lock = threading.Lock()
+        self.groups = OrderedDict()  # group -> [last seq, deque of (seq, event type, message)]
+
+    def append(self, group, event_type, message):
+        """Record an event and return its sequence number"""
+        with self.lock:
+            entry = self.groups.get(group)
+            if entry is None:
+                entry = self.groups[group] = [int(time.time() * 1000), deque(maxlen=self.size)]
+                if len(self.groups) > self.max_groups:
+                    self.groups.popitem(last=False)
+            else:
+                self.groups.move_to_end(group)
+            entry[0] += 1
+            entry[1].append((entry[0], event_type, message))
+            return entry[0]
+
+    def replay(self, group, last_seq=None):
+        """
+        (latest seq, events after last_seq as (seq, event type, message)). Events is None when
+        some of them are no longer held, and the client should fetch a snapshot instead.
+        Latest is None for a group with no events yet.
+        """
+        with self.lock:
+            entry = self.groups.get(group)
+            if entry is None:
+                return None, (None if last_seq is not None else [])
+            latest, events = entry
+            if last_seq is None:
+                return latest, []
+            missed = latest - last_seq
+            if missed < 0 or missed > len(events):
+                return latest, None
+            return latest, list(islice(events, len(events) - missed, None))
+
+
+class DatabaseEventLog:
+    """
+    EventLog kept in the database, for several processes behind the channel router: every
+    process then numbers a group's events from the same sequence, and the log survives restarts.
+    Each append takes the group's sequence row lock, so events of one group are serialised.
+    """
+
+    # Events that fell out of the window are deleted once every this many appends per group
+    PRUNE_EVERY = 100
+
+    def __init__(self, size=1000):
+        self.size = size
+
+    def append(self, group, event_type, message):
+        with transaction.atomic():
+            sequence, _ = StreamSequence.objects.select_for_update().get_or_create(group=group)
+            sequence.seq += 1
+            sequence.save(update_fields=["seq"])
+            StreamEvent.objects.create(group=group, seq=sequence.seq, event_type=event_type, message=message)
+        if sequence.seq % self.PRUNE_EVERY == 0:
+            StreamEvent.objects.filter(group=group, seq__lte=sequence.seq - self.size).delete()
+        return sequence.seq
+
+    def replay(self, group, last_seq=None):
+        latest = StreamSequence.objects.filter(group=group).values_list("seq", flat=True).first()
+        if last_seq is None:
+            return latest, []
+        if latest is None:
+            return None, None
+        missed = latest - last_seq
+        if missed < 0 or missed > self.size:
+            return latest, None
+        events = (
+            StreamEvent.objects.filter(group=group, seq__gt=last_seq, seq__lte=latest)
+            .order_by("seq")
+            .values_list("seq", "event_type", "message")
+        )
+        return latest, list(events)
+
+
+# Global instance
+if getattr(settings, "EVENT_LOG_PERSIST", False):
+    event_log = DatabaseEventLog(size=getattr(settings, "EVENT_LOG_SIZE", 1000))
+else:
+    event_log = EventLog(size=getattr(settings, "EVENT_LOG_SIZE", 1000))
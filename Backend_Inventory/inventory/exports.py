@@ -0,0 +1,158 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.utils import timezone
+
+from .models import Order, OrderLine, Product
+
+# One row per order line: export column -> lookup from OrderLine (the first must be its primary key)
+ORDER_EXPORT_COLUMNS = {
+    'line_id': 'id',
+    'order_id': 'order_id',
+    'user_id': 'order__user_id',
+    'username': 'order__username',
+    'item_id': 'item_id',
+    'item_name': 'item_name',
+    'item_quantity': 'item_quantity',
+    'status': 'order__status',
+    'created_on': 'order__created_on',
+    'accepted_at': 'order__accepted_at',
+    'processing_started_at': 'order__processing_started_at',
+    'processed_at': 'order__processed_at',
+    'cancelled_at': 'order__cancelled_at',
+    'product_id': 'product_id',
+}
+ORDER_EXPORT_FIELDS = list(ORDER_EXPORT_COLUMNS)
+INVENTORY_EXPORT_FIELDS = [
+    'id', 'name', 'description', 'category', 'price', 'stock_quantity', 'low_stock_threshold', 'updated_at'
+]
+
+EXPORT_CHUNK_SIZE = 2000  # rows fetched from the database per round trip
+ROWS_PER_WRITE = 500  # rows joined into a single chunk of the response body
+
+
+class Echo:
+    """File-like object that returns what is written, so csv.writer can build lines for streaming"""
+    def write(self, value):
+        return value
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def filter_orders(params):
+    """Orders matching the export filters: start/end dates (inclusive) and a comma-separated status list"""
+    orders = Order.objects.all()
+    tz = timezone.get_current_timezone()
+
+    # Compare against datetime bounds rather than created_on__date so the column index can be used
+    if params.get('start'):
+        start = _parse_date(params['start'], 'start')
+        orders = orders.filter(created_on__gte=timezone.make_aware(datetime.combine(start, time.min), tz))
+    if params.get('end'):
+        end = _parse_date(params['end'], 'end') + timedelta(days=1)
+        orders = orders.filter(created_on__lt=timezone.make_aware(datetime.combine(end, time.min), tz))
+    if params.get('status'):
+        statuses = [s.strip() for s in params['status'].split(',') if s.strip()]
+        orders = orders.filter(status__in=statuses)
+
+    return orders
+
+
+def iter_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield value tuples in primary key order without materialising the queryset"""
+    queryset = queryset.order_by('pk')
+
+    if connection.vendor != 'mysql':
+        # Server-side cursors (PostgreSQL) or chunked fetches (SQLite) keep memory flat
+        yield from queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+        return
+
+    # MySQL drivers buffer the whole result set even for .iterator(), so page by primary key instead
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page.values_list(*fields)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last_pk = rows[-1][0]
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream_csv(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    yield from _batched(
+        writer.writerow([_format_value(value) for value in row]) for row in rows
+    )
+
+
+def stream_ndjson(fields, rows):
+    yield from _batched(
+        json.dumps(dict(zip(fields, row)), default=str) + '\n'
+        for row in ([_format_value(value) for value in row] for row in rows)
+    )
+
+
+async def aiter_body(chunks):
+    """
+    The export body as an async iterator, for StreamingHttpResponse under Daphne: given a sync
+    iterator Django 4.2 collects the whole body with sync_to_async(list) before sending a byte.
+    Each chunk is produced in the thread-sensitive executor, so every database fetch of one
+    export runs on the same thread and connection, and only one chunk is held at a time.
+    """
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+
+def orders_export_stream(params, export_format):
+    """Return (body iterator, content type) for an order history export, one row per order line"""
+    stream, content_type = EXPORT_FORMATS[export_format]
+    lines = OrderLine.objects.filter(order__in=filter_orders(params))
+    rows = iter_rows(lines, list(ORDER_EXPORT_COLUMNS.values()))
+    return stream(ORDER_EXPORT_FIELDS, rows), content_type
+
+
+def inventory_export_stream(params, export_format):
+    """Return (body iterator, content type) for an inventory export, optionally filtered by category"""
+    stream, content_type = EXPORT_FORMATS[export_format]
+    products = Product.objects.all()
+    if params.get('category'):
+        products = products.filter(category=params['category'])
+    rows = iter_rows(products, INVENTORY_EXPORT_FIELDS)
+    return stream(INVENTORY_EXPORT_FIELDS, rows), content_type
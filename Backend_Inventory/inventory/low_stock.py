@@ -0,0 +1,38 @@
+from django.conf import settings
+
+from .metrics import registry
+from .notifications import LOW_STOCK_ALERTS_GROUP, send_group_event
+
+# Once fired, a product's alert re-arms only when restocked above low_stock_threshold + this
+LOW_STOCK_REARM_MARGIN = getattr(settings, "LOW_STOCK_REARM_MARGIN", 5)
+
+low_stock_alert_events = registry.counter(
+    "inventory_low_stock_alerts_total",
+    "Low-stock alerts fired, and alerts re-armed after a restock",
+    ["event"],
+)
+
+
+def check_low_stock(product):
+    """
+    Apply a stock change to the product's alert state (see Product.update_low_stock_alert) before
+    it is saved. Returns the alert when it fires, otherwise None.
+    """
+    alerted = product.low_stock_alerted_at is not None
+    if product.update_low_stock_alert(LOW_STOCK_REARM_MARGIN):
+        low_stock_alert_events.inc(event="fired")
+        return {
+            "product_id": product.id,
+            "product_name": product.name,
+            "remaining_stock": product.stock_quantity,
+            "threshold": product.low_stock_threshold,
+        }
+    if alerted and product.low_stock_alerted_at is None:
+        low_stock_alert_events.inc(event="rearmed")
+    return None
+
+
+def send_low_stock_alerts(alerts):
+    """Alerts fired together (e.g. by one accepted order) go out as one low_stock_alert event"""
+    if alerts:
+        send_group_event(LOW_STOCK_ALERTS_GROUP, "low_stock_alert", {"alerts": alerts})
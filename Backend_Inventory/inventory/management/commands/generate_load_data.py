@@ -0,0 +1,207 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from inventory.models import Order, OrderLine, Product
+
+LOAD_PRODUCT_PREFIX = 'Load'
+
+# Generated timestamps count back from this date (midnight UTC), so a seed always yields the same rows
+DEFAULT_ANCHOR = '2025-01-01'
+
+# Share of orders per hour of day, peaking during working hours
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 14, 16, 16, 14, 10, 14, 16, 15, 12, 8, 5, 3, 2, 2, 1, 1]
+QUANTITY_CHOICES = [1, 2, 3, 4, 5, 10, 20]
+QUANTITY_WEIGHTS = [45, 20, 10, 8, 7, 7, 3]
+# Lines per order (cart size)
+LINE_COUNT_CHOICES = [1, 2, 3, 4, 5]
+LINE_COUNT_WEIGHTS = [50, 25, 12, 8, 5]
+
+# Orders from the last few hours are still moving through the workflow, older ones are settled
+RECENT_WINDOW = timedelta(hours=6)
+RECENT_STATUSES = (['Pending', 'Processing', 'Processed', 'Cancelled'], [50, 20, 20, 10])
+SETTLED_STATUSES = (['Processed', 'Cancelled'], [88, 12])
+
+# Mean seconds spent in each lifecycle stage (exponentially distributed)
+MEAN_PENDING_SECONDS = 600
+MEAN_QUEUED_SECONDS = 3
+PROCESSING_SECONDS = 5
+
+
+@contextmanager
+def preserve_created_on():
+    """Let bulk_create keep the generated created_on instead of auto_now_add overwriting it"""
+    field = Order._meta.get_field('created_on')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, deterministic set of products and multi-line orders for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Number of products to create')
+        parser.add_argument('--users', type=int, default=1000, help='Number of distinct ordering users')
+        parser.add_argument('--orders-per-user', type=int, default=20, help='Average orders per user')
+        parser.add_argument('--days', type=int, default=90, help='Spread created_on over this many days')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent for product popularity')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+        parser.add_argument(
+            '--anchor', default=DEFAULT_ANCHOR, help='Date (YYYY-MM-DD) the generated orders lead up to'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--clear', action='store_true', help='Delete all orders and generated products first')
+
+    def handle(self, *args, **options):
+        for name in ('products', 'users', 'orders_per_user', 'days', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        try:
+            anchor = parse_date(options['anchor'])
+        except ValueError:
+            anchor = None
+        if anchor is None:
+            raise CommandError('--anchor must be a date in YYYY-MM-DD format')
+        options['anchor'] = datetime(anchor.year, anchor.month, anchor.day, tzinfo=dt_timezone.utc)
+
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+
+        if options['clear']:
+            OrderLine.objects.all().delete()
+            Order.objects.all().delete()
+            Product.objects.filter(name__startswith=f'{LOAD_PRODUCT_PREFIX} ').delete()
+
+        products = self.create_products(rng, options['products'], options['batch_size'])
+        self.stdout.write(f'{len(products)} load products ready ({time.monotonic() - started:.1f}s)')
+
+        order_count = self.create_orders(rng, products, options)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated {len(products)} products and {order_count} orders in {elapsed:.1f}s '
+                f'({order_count / elapsed:.0f} orders/sec)'
+            )
+        )
+
+    def create_products(self, rng, count, batch_size):
+        categories = [value for value, _ in Product.CATEGORY_CHOICES]
+        new_products = []
+        for i in range(count):
+            category = categories[i % len(categories)]
+            threshold = rng.randint(2, 20)
+            new_products.append(Product(
+                name=f'{LOAD_PRODUCT_PREFIX} {category} {i:07d}',
+                description=f'Generated {category} item for load testing',
+                category=category,
+                price=Decimal(rng.randint(100, 50000)) / 100,
+                stock_quantity=rng.randint(0, threshold * 20),
+                low_stock_threshold=threshold,
+            ))
+
+        # Existing names are kept, so re-running with the same seed is idempotent for products
+        with transaction.atomic():
+            Product.objects.bulk_create(new_products, batch_size=batch_size, ignore_conflicts=True)
+
+        names = [p.name for p in new_products]
+        existing = dict(
+            Product.objects.filter(name__startswith=f'{LOAD_PRODUCT_PREFIX} ').values_list('name', 'id')
+        )
+        return [(existing[name], name) for name in names if name in existing]
+
+    def create_orders(self, rng, products, options):
+        # Popularity ranks are shuffled so the hottest products are spread across categories
+        ranked = products[:]
+        rng.shuffle(ranked)
+        cum_popularity = list(accumulate(1 / (rank ** options['zipf']) for rank in range(1, len(ranked) + 1)))
+        cum_hours = list(accumulate(HOUR_WEIGHTS))
+
+        now = options['anchor']
+        total_orders = options['users'] * options['orders_per_user']
+        batch_size = options['batch_size']
+        created = 0
+
+        with preserve_created_on():
+            while created < total_orders:
+                size = min(batch_size, total_orders - created)
+                line_counts = rng.choices(LINE_COUNT_CHOICES, weights=LINE_COUNT_WEIGHTS, k=size)
+                hours = rng.choices(range(24), cum_weights=cum_hours, k=size)
+
+                orders = []
+                for hour in hours:
+                    user = rng.randint(1, options['users'])
+                    created_on = (now - timedelta(days=rng.randrange(options['days']))).replace(
+                        hour=hour, minute=rng.randrange(60), second=rng.randrange(60)
+                    )
+                    if created_on > now:
+                        created_on -= timedelta(days=1)
+                    statuses, weights = RECENT_STATUSES if now - created_on < RECENT_WINDOW else SETTLED_STATUSES
+                    status = rng.choices(statuses, weights=weights)[0]
+                    orders.append(Order(
+                        user_id=user,
+                        username=f'loaduser{user}',
+                        status=status,
+                        created_on=created_on,
+                        **self.lifecycle(rng, status, created_on, now),
+                    ))
+
+                with transaction.atomic():
+                    self.insert_orders(orders, batch_size)
+                    lines = []
+                    for order, line_count in zip(orders, line_counts):
+                        picks = rng.choices(ranked, cum_weights=cum_popularity, k=line_count)
+                        quantities = rng.choices(QUANTITY_CHOICES, weights=QUANTITY_WEIGHTS, k=line_count)
+                        for (product_id, name), quantity in zip(picks, quantities):
+                            lines.append(OrderLine(
+                                order_id=order.id,
+                                item_id=product_id,
+                                item_name=name,
+                                item_quantity=quantity,
+                                product_id=product_id,
+                            ))
+                    OrderLine.objects.bulk_create(lines, batch_size=batch_size)
+                created += size
+
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{created}/{total_orders} orders...')
+
+        return created
+
+    def insert_orders(self, orders, batch_size):
+        """bulk_create orders with their ids set, so their lines can point at them"""
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # MySQL doesn't return the new ids, so number the orders explicitly
+            next_id = (Order.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            for offset, order in enumerate(orders):
+                order.id = next_id + offset
+        Order.objects.bulk_create(orders, batch_size=batch_size)
+
+    def lifecycle(self, rng, status, created_on, now):
+        """Stage timestamps consistent with the order's status, never later than now"""
+        if status == 'Pending':
+            return {}
+        if status == 'Cancelled':
+            return {'cancelled_at': min(created_on + timedelta(seconds=rng.expovariate(1 / MEAN_PENDING_SECONDS)), now)}
+
+        accepted_at = created_on + timedelta(seconds=rng.expovariate(1 / MEAN_PENDING_SECONDS))
+        started_at = accepted_at + timedelta(seconds=rng.expovariate(1 / MEAN_QUEUED_SECONDS))
+        if status == 'Processing':
+            return {'accepted_at': min(accepted_at, now), 'processing_started_at': min(started_at, now)}
+
+        processed_at = started_at + timedelta(seconds=PROCESSING_SECONDS + rng.expovariate(2))
+        return {
+            'accepted_at': min(accepted_at, now),
+            'processing_started_at': min(started_at, now),
+            'processed_at': min(processed_at, now),
+        }
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.product_import import PRODUCT_FIELDS, clean_product_row, row_columns, upsert_products
+
+
+class Command(BaseCommand):
+    help = 'Bulk import (upsert by name) products from a CSV or JSON Lines file, or stdin with "-"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or "-" to read from stdin')
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help='Input format (default: guessed from the file extension, csv for stdin)'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per upsert transaction')
+        parser.add_argument('--strict', action='store_true', help='Abort on the first invalid row')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        else:
+            try:
+                stream = open(path, encoding='utf-8', newline='')
+            except OSError as e:
+                raise CommandError(f'Cannot open {path}: {e}')
+
+        started = time.monotonic()
+        imported = invalid = 0
+        with stream:
+            rows = self.read_rows(stream, input_format)
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+
+                # Consecutive rows with the same columns are upserted together, updating only
+                # those columns, so a JSON row without "price" keeps the product's price
+                runs = []
+                for line_number, row, columns in chunk:
+                    try:
+                        if row is None:
+                            raise ValueError('not a valid JSON object')
+                        cleaned = clean_product_row(row)
+                    except ValueError as e:
+                        if options['strict']:
+                            raise CommandError(f'Line {line_number}: {e}')
+                        invalid += 1
+                        if invalid <= 20:
+                            self.stderr.write(f'Skipping line {line_number}: {e}')
+                        continue
+                    if runs and runs[-1][0] == columns:
+                        runs[-1][1].append(cleaned)
+                    else:
+                        runs.append((columns, [cleaned]))
+
+                for columns, cleaned in runs:
+                    imported += upsert_products(cleaned, update_fields=columns, batch_size=batch_size)
+
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{imported} rows imported...')
+
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {imported} products ({invalid} invalid rows skipped) '
+                f'in {elapsed:.2f}s, {rate:.0f} rows/sec'
+            )
+        )
+
+    def read_rows(self, stream, input_format):
+        """Iterator of (line number, row dict or None if unparseable, columns the row provides)"""
+        if input_format == 'csv':
+            reader = csv.DictReader(stream)
+            columns = [f for f in PRODUCT_FIELDS if f in (reader.fieldnames or [])]
+            return ((reader.line_num, row, columns) for row in reader)
+
+        def parse(line_number, line):
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            if not isinstance(row, dict):
+                return line_number, None, None
+            return line_number, row, row_columns(row)
+
+        return (parse(line_number, line) for line_number, line in enumerate(stream, start=1) if line.strip())
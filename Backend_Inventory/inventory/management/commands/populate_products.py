@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from inventory.models import Product
+from inventory.product_import import clean_product_row, upsert_products
 
 
 class Command(BaseCommand):
@@ -68,18 +69,9 @@ class Command(BaseCommand):
             {"name": "Spill Kit", "description": "Chemical spill cleanup kit", "category": "safety", "price": 65.00, "stock_quantity": 6, "low_stock_threshold": 2},
         ]
 
-        created_count = 0
-        updated_count = 0
-
-        for product_data in products:
-            product, created = Product.objects.update_or_create(
-                name=product_data['name'],
-                defaults=product_data
-            )
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        rows = [clean_product_row(product_data) for product_data in products]
+        updated_count = Product.objects.filter(name__in=[row['name'] for row in rows]).count()
+        created_count = upsert_products(rows) - updated_count
 
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,134 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.benchmarks.channel_layer import benchmark_channel_layers
+from inventory.benchmarks.concurrency import benchmark_concurrency
+from inventory.benchmarks.consumer import benchmark_consumer
+from inventory.benchmarks.routes import benchmark_routes
+from inventory.benchmarks.websocket import benchmark_websocket_fan_out
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every inventory route, sync vs async read views under concurrency, the order consumer, '
+        'WebSocket fan-out and the channel layers against seeded data and print the results as JSON. '
+        'Run with --settings=inventory_proj.bench_settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,100000',
+            help='Comma-separated order counts to seed and benchmark at'
+        )
+        parser.add_argument('--products', type=int, default=1000, help='Products to seed')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per route')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per route')
+        parser.add_argument(
+            '--concurrency', type=int, default=500,
+            help='Concurrent clients for the sync vs async read view comparison (0 to skip)'
+        )
+        parser.add_argument(
+            '--concurrency-requests', type=int, default=4, help='Requests each concurrent client sends per route'
+        )
+        parser.add_argument('--consumer-orders', type=int, default=500, help='Orders pushed through the consumer')
+        parser.add_argument('--ws-clients', type=int, default=50, help='Connected admin WebSockets')
+        parser.add_argument('--ws-messages', type=int, default=200, help='Events fanned out to the admin group')
+        parser.add_argument(
+            '--channel-receivers', type=int, default=50,
+            help='Channels in the group for the in-memory vs Unix socket channel layer comparison (0 to skip)'
+        )
+        parser.add_argument('--channel-messages', type=int, default=500, help='group_sends per channel layer run')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK_DATABASE', False):
+            raise CommandError(
+                'run_benchmarks deletes orders and products. '
+                'Run it with --settings=inventory_proj.bench_settings.'
+            )
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+
+        call_command('migrate', verbosity=0, interactive=False)
+
+        report = {
+            "meta": {
+                "revision": _git_revision(),
+                "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": settings.DATABASES['default']['ENGINE'],
+                "iterations": options['iterations'],
+            },
+            "datasets": [],
+        }
+
+        # Anchor the data at today so the analytics routes' last-N-days windows cover it; the seed
+        # still fixes every row, only shifted by whole days
+        anchor = time.strftime('%Y-%m-%d', time.gmtime())
+        for size in sizes:
+            self.stderr.write(f'Seeding {size} orders...')
+            users = max(1, size // 20)
+            call_command(
+                'generate_load_data',
+                products=options['products'],
+                users=users,
+                orders_per_user=max(1, size // users),
+                seed=options['seed'],
+                anchor=anchor,
+                clear=True,
+                verbosity=0,
+            )
+            self.stderr.write(f'Benchmarking routes at {size} orders...')
+            routes = benchmark_routes(options['iterations'], options['warmup'], log=self.stderr.write)
+            concurrency = None
+            if options['concurrency'] > 0:
+                self.stderr.write(f'Benchmarking {options["concurrency"]} concurrent clients...')
+                concurrency = benchmark_concurrency(
+                    options['concurrency'], options['concurrency_requests'], log=self.stderr.write
+                )
+            self.stderr.write('Benchmarking order consumer...')
+            consumer = benchmark_consumer(options['consumer_orders'])
+            report["datasets"].append({
+                "orders": size,
+                "products": options['products'],
+                "routes": routes,
+                "concurrency": concurrency,
+                "consumer": consumer,
+            })
+
+        self.stderr.write('Benchmarking WebSocket fan-out...')
+        report["websocket_fan_out"] = benchmark_websocket_fan_out(options['ws_clients'], options['ws_messages'])
+
+        if options['channel_receivers'] > 0:
+            self.stderr.write('Benchmarking channel layers...')
+            report["channel_layers"] = benchmark_channel_layers(
+                options['channel_receivers'], options['channel_messages'], log=self.stderr.write
+            )
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Benchmark report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,44 @@
+import asyncio
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.channel_layer import ChannelRouter
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the router that connects the UnixSocketChannelLayer of every Daphne process on this host. '
+        'Start it before the Daphne processes; they reconnect if it restarts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket', default=getattr(settings, 'CHANNEL_SOCKET', None),
+            help='Unix socket path (default: CHANNEL_SOCKET, set from INVENTORY_CHANNEL_SOCKET)'
+        )
+        parser.add_argument(
+            '--group-expiry', type=int, default=86400, help='Seconds a group membership lasts unless renewed'
+        )
+
+    def handle(self, *args, **options):
+        path = options['socket']
+        if not path:
+            raise CommandError('Pass --socket or set INVENTORY_CHANNEL_SOCKET')
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            pass
+        else:
+            raise CommandError(f'A channel router is already listening on {path}')
+        finally:
+            probe.close()
+
+        self.stderr.write(f'Channel router listening on {path}')
+        try:
+            asyncio.run(ChannelRouter(path, group_expiry=options['group_expiry']).serve())
+        except KeyboardInterrupt:
+            pass
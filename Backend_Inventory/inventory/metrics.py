@@ -0,0 +1,302 @@
+"""
+In-process metrics exported in the Prometheus text format from /metrics.
+
+Counters, gauges and fixed-bucket histograms are plain dicts behind a lock,
+so recording a value costs a dict update. When METRICS_DIR is set, every
+process periodically writes its values to METRICS_DIR/<pid>.json and the
+/metrics view merges all files, so the numbers stay correct when several
+Daphne workers serve the same site. Counters and histograms are summed
+across processes; gauges are summed over processes that are still alive.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def samples(self):
+        """List of (sample name, labels dict, value)"""
+        with self.lock:
+            return [
+                (self.name, dict(zip(self.labelnames, key)), value)
+                for key, value in self.values.items()
+            ]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function  # Read the current value at collection time (unlabelled gauges)
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, {}, self.function())]
+        return super().samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, +Inf last, then sum
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self.lock:
+            items = [(key, list(state)) for key, state in self.values.items()]
+
+        samples = []
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_bound(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, state[-1]))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Collector:
+    """Metric whose samples are produced by a callback, for state kept elsewhere"""
+
+    def __init__(self, name, documentation, type, function):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.function = function
+
+    def samples(self):
+        return self.function()
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.metrics = []
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.flusher = None
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def collector(self, *args, **kwargs):
+        return self.register(Collector(*args, **kwargs))
+
+    def collect(self):
+        """This process's metrics as {name: {type, help, samples}}"""
+        return {
+            metric.name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "samples": metric.samples(),
+            }
+            for metric in self.metrics
+        }
+
+    # Multi-process support
+
+    def start_flusher(self):
+        """Periodically write this process's metrics to the shared directory"""
+        if not self.directory or self.flusher is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True, name="metrics-flush")
+        self.flusher.start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Error writing metrics: %s", e)
+
+    def flush(self):
+        if not self.directory:
+            return
+        pid = os.getpid()
+        path = os.path.join(self.directory, f"{pid}.json")
+        tmp_path = f"{path}.tmp"
+        with self.lock:
+            with open(tmp_path, "w") as f:
+                json.dump({"pid": pid, "metrics": self.collect()}, f)
+            os.replace(tmp_path, path)
+
+    def _gather(self):
+        if not self.directory:
+            return [self.collect()]
+
+        self.flush()
+        collected = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            metrics = data["metrics"]
+            if not _pid_alive(data["pid"]):
+                # A dead process keeps contributing its counts, but not its gauges
+                metrics = {name: m for name, m in metrics.items() if m["type"] != "gauge"}
+            collected.append(metrics)
+        return collected
+
+    def render(self):
+        """All processes' metrics merged into the Prometheus text exposition format"""
+        merged = {}
+        for metrics in self._gather():
+            for name, metric in metrics.items():
+                entry = merged.setdefault(name, {"type": metric["type"], "help": metric["help"], "samples": {}})
+                for sample_name, labels, value in metric["samples"]:
+                    key = (sample_name, tuple(sorted(labels.items())))
+                    entry["samples"][key] = entry["samples"].get(key, 0) + value
+
+        lines = []
+        for name in sorted(merged):
+            entry = merged[name]
+            lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            for (sample_name, labels), value in entry["samples"].items():
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{sample_name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics the inventory service records
+registry = Registry(
+    directory=getattr(settings, "METRICS_DIR", None),
+    flush_interval=getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0),
+)
+
+http_request_duration = registry.histogram(
+    "inventory_http_request_duration_seconds", "HTTP request latency by view", ["view", "method"]
+)
+http_requests = registry.counter(
+    "inventory_http_requests_total", "HTTP requests by view and status code", ["view", "method", "status"]
+)
+order_queue_wait = registry.histogram(
+    "inventory_order_queue_wait_seconds", "Time accepted orders wait in order_queue before the consumer picks them up",
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+orders_processed = registry.counter(
+    "inventory_orders_processed_total", "Orders handled by the order consumer by outcome", ["outcome"]
+)
+order_processing_duration = registry.histogram(
+    "inventory_order_processing_seconds", "Time the order consumer spends on one order",
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0),
+)
+group_send_duration = registry.histogram(
+    "inventory_group_send_seconds", "Channel layer group_send latency by event type", ["event"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0),
+)
+websocket_connections = registry.gauge(
+    "inventory_websocket_connections", "Open WebSocket connections by consumer", ["consumer"]
+)
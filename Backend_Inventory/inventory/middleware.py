@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from .metrics import registry, http_request_duration, http_requests
+from .structured_logging import bind
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook that counts and times every query of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            # SQL is parameterised, so the same statement in a loop has identical text
+            self.statements[sql] += 1
+
+
+_current_recorder = ContextVar("query_recorder", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    # sync_to_async copies the context into the thread the async ORM runs in, so this also
+    # finds the recorder of an async request, whose queries use that thread's connection
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install_recorder(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_recorder)
+
+
+class ViewQueryStats:
+    """Per-view aggregates of request, query and timing counts, safe to read from a metrics endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, queries, db_time, app_time, repeated):
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_seconds": 0.0,
+                    "app_seconds": 0.0,
+                    "repeated_sql_requests": 0,
+                }
+            stats["requests"] += 1
+            stats["queries"] += queries
+            stats["max_queries"] = max(stats["max_queries"], queries)
+            stats["db_seconds"] += db_time
+            stats["app_seconds"] += app_time
+            if repeated:
+                stats["repeated_sql_requests"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {view: dict(stats) for view, stats in self.views.items()}
+
+
+# Global instance
+view_query_stats = ViewQueryStats()
+
+
+def _view_samples(metric_name, key):
+    return [
+        (metric_name, {"view": view}, stats[key]) for view, stats in view_query_stats.snapshot().items()
+    ]
+
+
+registry.collector(
+    "inventory_db_queries_total", "SQL queries executed by view", "counter",
+    lambda: _view_samples("inventory_db_queries_total", "queries"),
+)
+registry.collector(
+    "inventory_db_query_seconds_total", "Time spent in SQL queries by view", "counter",
+    lambda: _view_samples("inventory_db_query_seconds_total", "db_seconds"),
+)
+registry.collector(
+    "inventory_repeated_sql_requests_total", "Requests that repeated one SQL statement (likely N+1) by view",
+    "counter", lambda: _view_samples("inventory_repeated_sql_requests_total", "repeated_sql_requests"),
+)
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that works in both stacks: sync under WSGI, async under Daphne, where a
+    sync-only middleware would push every request (async views included) through a worker thread.
+    Subclasses implement __call__ for the sync stack and __acall__ for the async one.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+
+class LogContextMiddleware(HybridMiddleware):
+    """Adds the path, username, view and elapsed time to every inventory log record of a request"""
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with bind(request=request, started=time.perf_counter()):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with bind(request=request, started=time.perf_counter()):
+            return await self.get_response(request)
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else "unresolved"
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """Records per-view request latency and status codes for /metrics"""
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, duration):
+        view = _view_name(request)
+        http_request_duration.observe(duration, view=view, method=request.method)
+        http_requests.inc(view=view, method=request.method, status=response.status_code)
+
+
+class QueryTimingMiddleware(HybridMiddleware):
+    """
+    Counts queries and database time per request without needing DEBUG=True,
+    adds a Server-Timing header and logs statements repeated often enough to look like N+1 queries.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.repeat_threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        # Covers a connection opened before the middleware was loaded
+        _install_recorder(connection)
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # Connections are per thread and the async ORM's is opened in its worker thread,
+        # where connection_created installs _record_query
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    def finish(self, request, response, recorder, total):
+        app_time = max(total - recorder.duration, 0.0)
+
+        view = _view_name(request)
+        repeated = {sql: n for sql, n in recorder.statements.items() if n >= self.repeat_threshold}
+        if repeated:
+            logger.warning(
+                "Repeated SQL in %s: %d statements executed %d+ times",
+                view, len(repeated), self.repeat_threshold,
+                extra={
+                    "view": view,
+                    "path": request.path,
+                    "query_count": recorder.count,
+                    "repeated_sql": [{"sql": sql, "count": n} for sql, n in repeated.items()],
+                },
+            )
+
+        view_query_stats.record(view, recorder.count, recorder.duration, app_time, bool(repeated))
+        response["Server-Timing"] = (
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+            f'app;dur={app_time * 1000:.1f}'
+        )
+        return response
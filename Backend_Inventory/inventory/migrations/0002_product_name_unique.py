@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_products(apps, schema_editor):
+    """Suffix duplicate product names with their id so the unique constraint can be added"""
+    Product = apps.get_model('inventory', 'Product')
+    duplicates = (
+        Product.objects.values('name').annotate(name_count=Count('id')).filter(name_count__gt=1)
+    )
+    for duplicate in duplicates:
+        products = Product.objects.filter(name=duplicate['name']).order_by('id')
+        for product in products[1:]:
+            suffix = f" #{product.id}"
+            product.name = product.name[:100 - len(suffix)] + suffix
+            product.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_products, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_items_to_lines(apps, schema_editor):
+    """Every existing order held one item, so it becomes an order with a single line"""
+    Order = apps.get_model('inventory', 'Order')
+    OrderLine = apps.get_model('inventory', 'OrderLine')
+    quote = schema_editor.quote_name
+    columns = ', '.join(quote(column) for column in ('item_id', 'item_name', 'item_quantity', 'product_id'))
+    # One INSERT ... SELECT, so large order tables never pass through Python
+    schema_editor.execute(
+        f"INSERT INTO {quote(OrderLine._meta.db_table)} ({quote('order_id')}, {columns}) "
+        f"SELECT {quote('id')}, {columns} FROM {quote(Order._meta.db_table)}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_order_lifecycle_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.IntegerField()),
+                ('item_name', models.CharField(max_length=100)),
+                ('item_quantity', models.IntegerField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.order')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventory.product')),
+            ],
+            options={
+                'db_table': 'inventory_order_line',
+            },
+        ),
+        # Irreversible: an order with several lines has no single-item form to go back to
+        migrations.RunPython(copy_items_to_lines),
+        migrations.RemoveField(
+            model_name='order',
+            name='item_id',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='item_name',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='item_quantity',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='product',
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_order_lines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(max_length=100)),
+                ('seq', models.BigIntegerField()),
+                ('event_type', models.CharField(max_length=50)),
+                ('message', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'inventory_stream_event',
+            },
+        ),
+        migrations.CreateModel(
+            name='StreamSequence',
+            fields=[
+                ('group', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('seq', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'inventory_stream_sequence',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='streamevent',
+            constraint=models.UniqueConstraint(fields=('group', 'seq'), name='stream_event_group_seq_uniq'),
+        ),
+    ]
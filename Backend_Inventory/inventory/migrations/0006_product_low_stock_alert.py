@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-19 18:59
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_low_stock_alerted(apps, schema_editor):
+    """Products already at or under their threshold count as alerted, so they don't all fire on the next accept"""
+    Product = apps.get_model('inventory', 'Product')
+    Product.objects.filter(stock_quantity__lte=F('low_stock_threshold')).update(low_stock_alerted_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stream_event_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='low_stock_alerted_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_low_stock_alerted, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-19 19:20
+
+from django.db import migrations, models
+import rest_framework.utils.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_product_low_stock_alert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('job_id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('report', models.CharField(max_length=50)),
+                ('params', models.JSONField(default=dict)),
+                ('key', models.CharField(db_index=True, max_length=255)),
+                ('status', models.CharField(default='queued', max_length=20)),
+                ('result', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder, null=True)),
+                ('error', models.TextField(null=True)),
+                ('created_at', models.FloatField()),
+                ('finished_at', models.FloatField(db_index=True, null=True)),
+            ],
+            options={
+                'db_table': 'inventory_report_job',
+            },
+        ),
+    ]
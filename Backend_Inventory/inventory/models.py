@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 
 # Product Model - Stores laboratory inventory items
 class Product(models.Model):
@@ -11,12 +13,14 @@ class Product(models.Model):
         ('safety', 'Safety'),
     ]
     
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)  # Natural key for imports/upserts
     description = models.TextField(blank=True, null=True)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='consumables')
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     stock_quantity = models.IntegerField(default=0)
     low_stock_threshold = models.IntegerField(default=10)  # Alert when stock falls below this
+    # When the current low-stock alert fired; null while armed. Indexed so open alerts are read without a scan
+    low_stock_alerted_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -37,21 +41,101 @@ class Product(models.Model):
         """Returns True if stock is zero"""
         return self.stock_quantity <= 0
 
+    def update_low_stock_alert(self, rearm_margin=0):
+        """
+        Low-stock alert hysteresis; call before saving a stock change. Returns True when stock has
+        just fallen to the threshold (the alert fires once), and re-arms the alert only once stock
+        is back above threshold + rearm_margin.
+        """
+        if self.low_stock_alerted_at is None:
+            if self.is_low_stock:
+                self.low_stock_alerted_at = timezone.now()
+                return True
+        elif self.stock_quantity > self.low_stock_threshold + rearm_margin:
+            self.low_stock_alerted_at = None
+        return False
 
-# Order Model - Stores customer orders
+
+# Order Model - One checkout: the header shared by all of its lines
 class Order(models.Model):
     user_id = models.IntegerField(default=0)
     username = models.CharField(max_length=150, null=True)
+    status = models.CharField(max_length=50, default="Pending")
+    created_on = models.DateTimeField(auto_now_add=True)
+    # Lifecycle timestamps, used for SLA latency analytics
+    accepted_at = models.DateTimeField(null=True, blank=True)  # Admin accepted (Pending -> Processing)
+    processing_started_at = models.DateTimeField(null=True, blank=True)  # Consumer took it off order_queue
+    processed_at = models.DateTimeField(null=True, blank=True)  # Consumer finished (Processed)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'inventory_order'
+        indexes = [
+            models.Index(fields=['created_on'], name='order_created_on_idx'),
+            models.Index(fields=['status', 'created_on'], name='order_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.id} (User {self.user_id})"
+
+
+# Order Line Model - One cart item of an order
+class OrderLine(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
     item_id = models.IntegerField()
     item_name = models.CharField(max_length=100)
     item_quantity = models.IntegerField()
-    status = models.CharField(max_length=50, default="Pending")
-    created_on = models.DateTimeField(auto_now_add=True)
     # Link to Product for stock tracking
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
 
     class Meta:
-        db_table = 'inventory_order'
+        db_table = 'inventory_order_line'
+
+    def __str__(self):
+        return f"{self.item_name} x{self.item_quantity} (Order {self.order_id})"
+
+
+# Stream Event Models - The persisted event log (EVENT_LOG_PERSIST), replayed to reconnecting ws/stream/ clients
+class StreamSequence(models.Model):
+    group = models.CharField(max_length=100, primary_key=True)
+    seq = models.BigIntegerField(default=0)  # Sequence number of the group's last event
+
+    class Meta:
+        db_table = 'inventory_stream_sequence'
+
+
+class StreamEvent(models.Model):
+    group = models.CharField(max_length=100)
+    seq = models.BigIntegerField()
+    event_type = models.CharField(max_length=50)
+    message = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_stream_event'
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'seq'], name='stream_event_group_seq_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.group} #{self.seq} {self.event_type}"
+
+
+# Report Job Model - A background report (report_jobs.py), kept here so any process can poll it
+class ReportJob(models.Model):
+    job_id = models.CharField(max_length=32, primary_key=True)
+    report = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    # Report and params, so identical requests share the job while it is queued or running
+    key = models.CharField(max_length=255, db_index=True)
+    status = models.CharField(max_length=20, default='queued')
+    result = models.JSONField(null=True, encoder=JSONEncoder)
+    error = models.TextField(null=True)
+    created_at = models.FloatField()  # Unix time, as returned by the API
+    finished_at = models.FloatField(null=True, db_index=True)
+
+    class Meta:
+        db_table = 'inventory_report_job'
 
     def __str__(self):
-        return f"{self.item_name} (User {self.user_id})"
+        return f"{self.report} {self.job_id} ({self.status})"
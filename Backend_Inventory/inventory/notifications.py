@@ -0,0 +1,44 @@
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from .event_log import event_log
+from .metrics import group_send_duration
+
+# Low-stock alerts have their own group, joined by ws/stream/ "low_stock" subscribers
+LOW_STOCK_ALERTS_GROUP = "low_stock_alerts"
+
+
+def user_orders_group(user_id):
+    """Group of the ws/stream/ sockets subscribed to a user's orders, keyed by the user id in their token"""
+    return f"orders_user_{user_id}"
+
+
+def is_logged_group(group):
+    """Groups whose events are numbered and kept in the event log, so ws/stream/ clients can resume them"""
+    return group in ("admin_orders", LOW_STOCK_ALERTS_GROUP) or group.startswith("orders_user_")
+
+
+def send_group_event(group, event_type, message, channel_layer=None):
+    """Send an event to a channel layer group from sync code, recording group_send latency"""
+    channel_layer = channel_layer or get_channel_layer()
+    if not channel_layer:
+        return
+
+    event = {
+        "type": event_type,
+        "message": message
+    }
+    if is_logged_group(group):
+        event["seq"] = event_log.append(group, event_type, message)
+
+    started = time.perf_counter()
+    async_to_sync(channel_layer.group_send)(group, event)
+    group_send_duration.observe(time.perf_counter() - started, event=event_type)
+
+
+def send_order_status(order, status, channel_layer=None):
+    """order_status event to the order's owner, on ws/stream/"""
+    message = {"order_id": order.id, "status": status}
+    send_group_event(user_orders_group(order.user_id), "order_status", message, channel_layer)
@@ -1,3 +1,23 @@
+import time
 from queue import Queue
 
-order_queue = Queue()
\ No newline at end of file
+from .metrics import registry, order_queue_wait
+
+
+class OrderQueue(Queue):
+    """Queue of accepted order ids that records how long each order waits for the consumer"""
+
+    def _put(self, item):
+        super()._put((item, time.monotonic()))
+
+    def _get(self):
+        item, enqueued_at = super()._get()
+        order_queue_wait.observe(time.monotonic() - enqueued_at)
+        return item
+
+
+order_queue = OrderQueue()
+
+registry.gauge(
+    "inventory_order_queue_size", "Accepted orders waiting in order_queue", function=order_queue.qsize
+)
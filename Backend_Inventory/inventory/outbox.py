@@ -0,0 +1,149 @@
+import asyncio
+import json
+from collections import deque
+
+from .metrics import registry
+
+POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Close code for a socket disconnected by the "disconnect" policy ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+outbox_events = registry.counter(
+    "inventory_websocket_outbox_events_total",
+    "Events queued for WebSockets, and those dropped, coalesced or disconnected past the high-water mark",
+    ["outcome"],
+)
+frame_events = registry.histogram(
+    "inventory_websocket_frame_events", "Events sent per WebSocket frame",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+)
+
+
+def encode_frames(frames):
+    """One frame as is, several as a single {"type": "batch", "events": [...]} frame"""
+    frame_events.observe(len(frames))
+    if len(frames) == 1:
+        return json.dumps(frames[0])
+    return json.dumps({"type": "batch", "events": frames})
+
+
+def _coalesce_key(frame):
+    data = frame.get("data")
+    if isinstance(data, dict) and "order_id" in data:
+        return frame.get("topic"), frame["type"], data["order_id"]
+    return None
+
+
+class Outbox:
+    """
+    Outbound queue of one WebSocket. Event handlers put() frames and return at once, so a slow
+    browser never holds up the consumer reading its channel; a writer task sends whatever is
+    queued as one frame per `interval` seconds.
+
+    Daphne's send() never waits for the client: it hands the frame to Twisted, which buffers
+    without bound. So the queue only backs up when the client says how far it has read: with a
+    `window`, the client acks the number of frames it has processed ({"action": "ack", "frames": n})
+    and the writer holds frames back while `window` sent frames are unacknowledged. Without a
+    window (clients that don't ack), frames are only held back while send() itself waits.
+
+    Past `high_water` queued frames the policy applies: "drop_oldest" drops the oldest frames,
+    "coalesce" first keeps only the newest frame per order_id (then drops the oldest if that is
+    not enough) and "disconnect" closes the socket. When frames of a ws/stream/ topic are dropped
+    the client is sent {"type": "snapshot_required", "topic"} ahead of the next batch.
+    """
+
+    def __init__(self, send, close, high_water=100, policy="coalesce", interval=0.02, window=0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown outbox policy {policy!r}, expected one of {POLICIES}")
+        self.send = send
+        self.close = close
+        self.high_water = high_water
+        self.policy = policy
+        self.interval = interval
+        self.window = window
+        self.sent = 0  # frames sent on the socket, including send_now() replies
+        self.acked = 0  # frames the client has acknowledged
+        self.window_open = asyncio.Event()
+        self.frames = deque()
+        self.lagged = []  # ws/stream/ topics that lost frames since the last batch
+        self.ready = asyncio.Event()
+        self.task = None
+        self.closed = False
+
+    async def put(self, frame):
+        if self.closed:
+            return
+        self.frames.append(frame)
+        outbox_events.inc(outcome="queued")
+        if len(self.frames) > self.high_water:
+            if self.policy == "disconnect":
+                outbox_events.inc(outcome="disconnected")
+                self.stop()
+                await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+                return
+            if self.policy == "coalesce":
+                self._coalesce()
+            while len(self.frames) > self.high_water:
+                self._lost(self.frames.popleft())
+                outbox_events.inc(outcome="dropped")
+
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+        self.ready.set()
+
+    def _coalesce(self):
+        newest = set()
+        kept = deque()
+        coalesced = 0
+        for frame in reversed(self.frames):
+            key = _coalesce_key(frame)
+            if key is not None:
+                if key in newest:
+                    coalesced += 1
+                    continue
+                newest.add(key)
+            kept.appendleft(frame)
+        self.frames = kept
+        if coalesced:
+            outbox_events.inc(coalesced, outcome="coalesced")
+
+    def _lost(self, frame):
+        topic = frame.get("topic")
+        if topic is not None and topic not in self.lagged:
+            self.lagged.append(topic)
+
+    async def send_now(self, text):
+        """Send a frame at once, ahead of queued events; it still counts towards the window"""
+        self.sent += 1
+        await self.send(text_data=text)
+
+    def ack(self, frames):
+        """The client has processed its first `frames` frames"""
+        if isinstance(frames, int) and self.acked < frames <= self.sent:
+            self.acked = frames
+            self.window_open.set()
+
+    async def _run(self):
+        while not self.closed:
+            await self.ready.wait()
+            # Events queued during the tick go out in the same frame
+            if self.interval:
+                await asyncio.sleep(self.interval)
+            # A client that stopped acking leaves frames queued, where the policy applies
+            while self.window and self.sent - self.acked >= self.window:
+                self.window_open.clear()
+                await self.window_open.wait()
+            self.ready.clear()
+            frames = [{"type": "snapshot_required", "topic": topic} for topic in self.lagged]
+            frames.extend(self.frames)
+            self.frames.clear()
+            self.lagged.clear()
+            if frames:
+                await self.send_now(encode_frames(frames))
+
+    def stop(self):
+        self.closed = True
+        self.frames.clear()
+        if self.task is not None:
+            self.task.cancel()
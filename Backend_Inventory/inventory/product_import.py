@@ -0,0 +1,117 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Product
+
+# Columns an import row may provide; name is the natural key
+PRODUCT_FIELDS = ['name', 'description', 'category', 'price', 'stock_quantity', 'low_stock_threshold']
+CATEGORIES = {value for value, _ in Product.CATEGORY_CHOICES}
+CATEGORY_LABELS = {label.lower(): value for value, label in Product.CATEGORY_CHOICES}
+NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+PRICE_LIMIT = Decimal('100000000')  # max_digits=10, decimal_places=2
+
+
+def _clean_str(row, field, default=''):
+    value = row.get(field)
+    if value is None:
+        return default
+    # JSON rows can hold numbers, lists or objects where a string belongs
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value.strip() or default
+
+
+def _clean_int(row, field, default):
+    value = row.get(field)
+    if value in (None, ''):
+        return default
+    # int() would truncate 3.7 (and accept True); only whole numbers are taken
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{field} must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an integer")
+    if value < 0:
+        raise ValueError(f"{field} cannot be negative")
+    return value
+
+
+def _clean_price(row):
+    # A row without the column leaves an existing product's price alone (see row_columns), and
+    # only then is the model default used; a blank price would overwrite it with 0.00
+    if 'price' not in row:
+        return Decimal('0.00')
+    value = row['price']
+    if value is None or (isinstance(value, str) and not value.strip()):
+        raise ValueError("price is required")
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError("price must be a number")
+    # NaN and Infinity parse, but compare with a signalling InvalidOperation rather than ValueError
+    if not price.is_finite():
+        raise ValueError("price must be a number")
+    price = price.quantize(Decimal('0.01'))
+    if price < 0 or price >= PRICE_LIMIT:
+        raise ValueError("price is out of range")
+    return price
+
+
+def row_columns(row):
+    """The import columns a row provides, which are the ones it updates on an existing product"""
+    return [field for field in PRODUCT_FIELDS if field in row]
+
+
+def clean_product_row(row):
+    """Validate one import row and return the field values for a Product, raising ValueError"""
+    name = _clean_str(row, 'name')
+    if not name:
+        raise ValueError("name is required")
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValueError(f"name is longer than {NAME_MAX_LENGTH} characters")
+
+    category = _clean_str(row, 'category', 'consumables').lower()
+    category = CATEGORY_LABELS.get(category, category)
+    if category not in CATEGORIES:
+        raise ValueError(f"unknown category '{row.get('category')}'")
+
+    return {
+        'name': name,
+        'description': _clean_str(row, 'description'),
+        'category': category,
+        'price': _clean_price(row),
+        'stock_quantity': _clean_int(row, 'stock_quantity', 0),
+        'low_stock_threshold': _clean_int(row, 'low_stock_threshold', 10),
+    }
+
+
+def upsert_products(rows, update_fields=None, batch_size=1000):
+    """
+    Insert or update cleaned product rows by name in a single transaction
+    using one INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE per batch.
+    Only `update_fields` are overwritten on existing products (all import columns by default).
+    """
+    # Later rows win when the same name appears twice in one chunk
+    by_name = {row['name']: row for row in rows}
+    now = timezone.now()
+    products = [Product(created_at=now, updated_at=now, **row) for row in by_name.values()]
+
+    if update_fields is None:
+        update_fields = PRODUCT_FIELDS
+    update_fields = [f for f in update_fields if f != 'name'] + ['updated_at']
+
+    # MySQL upserts on any unique key and rejects an explicit conflict target
+    unique_fields = ['name'] if connection.features.supports_update_conflicts_with_target else None
+
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+    return len(products)
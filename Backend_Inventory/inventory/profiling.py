@@ -0,0 +1,170 @@
+import cProfile
+import hmac
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import HybridMiddleware
+
+
+class RouteProfiles:
+    """Aggregated cProfile stats per route, periodically written to a rotating directory"""
+
+    def __init__(self, directory=None, dump_every=20, max_files=10):
+        self.directory = directory
+        self.dump_every = dump_every
+        self.max_files = max_files
+        self.lock = threading.Lock()
+        self.stats = {}  # route -> pstats.Stats
+        self.samples = {}  # route -> number of profiles aggregated
+
+    def add(self, route, profile):
+        with self.lock:
+            if route in self.stats:
+                self.stats[route].add(profile)
+            else:
+                self.stats[route] = pstats.Stats(profile)
+            self.samples[route] = self.samples.get(route, 0) + 1
+            if self.directory and self.samples[route] % self.dump_every == 0:
+                self._dump(route)
+
+    def _dump(self, route):
+        # Caller holds the lock
+        route_dir = os.path.join(self.directory, re.sub(r'[^\w.-]', '_', route))
+        os.makedirs(route_dir, exist_ok=True)
+        self.stats[route].dump_stats(os.path.join(route_dir, f"{time.time():.0f}-{os.getpid()}.prof"))
+
+        # Keep only the newest files
+        files = sorted(f for f in os.listdir(route_dir) if f.endswith('.prof'))
+        for filename in files[:-self.max_files]:
+            os.remove(os.path.join(route_dir, filename))
+
+    def summary(self, route=None, sort='cumtime', limit=20):
+        """Top functions per route by cumulative or total time"""
+        sort_index = 3 if sort == 'cumtime' else 2
+        with self.lock:
+            routes = [route] if route else sorted(self.stats)
+            result = {}
+            for name in routes:
+                if name not in self.stats:
+                    continue
+                entries = sorted(
+                    self.stats[name].stats.items(), key=lambda item: item[1][sort_index], reverse=True
+                )[:limit]
+                result[name] = {
+                    "samples": self.samples[name],
+                    "functions": [
+                        {
+                            "function": f"{filename}:{line}({function})",
+                            "calls": calls,
+                            "tottime": round(tottime, 6),
+                            "cumtime": round(cumtime, 6),
+                        }
+                        for (filename, line, function), (_, calls, tottime, cumtime, _) in entries
+                    ],
+                }
+            return result
+
+
+class Sampler:
+    """Profiles 1 in `rate` calls; a rate of 0 turns sampling off"""
+
+    def __init__(self, rate, profiles):
+        self.rate = rate
+        self.profiles = profiles
+        self.counter = itertools.count(1)
+
+    def sampled(self):
+        return self.rate > 0 and next(self.counter) % self.rate == 0
+
+    def profile(self, route, func, *args, **kwargs):
+        """Call func, profiling it and aggregating the result under `route`"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.profiles.add(route, profile)
+
+    def maybe_profile(self, route, func, *args, **kwargs):
+        if self.sampled():
+            return self.profile(route, func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+
+# Global instances
+route_profiles = RouteProfiles(
+    directory=getattr(settings, 'PROFILING_DIR', None),
+    dump_every=getattr(settings, 'PROFILING_DUMP_EVERY', 20),
+    max_files=getattr(settings, 'PROFILING_MAX_FILES', 10),
+)
+sampler = Sampler(getattr(settings, 'PROFILING_SAMPLE_RATE', 0), route_profiles)
+
+
+class SamplingProfilerMiddleware(HybridMiddleware):
+    """
+    Profiles 1 in PROFILING_SAMPLE_RATE requests, plus any request whose X-Profile-Request header
+    matches PROFILING_HEADER_TOKEN. Removes itself from the stack when neither is configured.
+    cProfile only sees the thread it was enabled on: for async views that is the event loop
+    (including other requests' work while this one was awaiting), not the ORM's worker thread.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.token = getattr(settings, 'PROFILING_HEADER_TOKEN', None)
+        if sampler.rate <= 0 and not self.token:
+            raise MiddlewareNotUsed()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not (sampler.sampled() or self._requested(request)):
+            return self.get_response(request)
+
+        profile = self._start()
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(request, profile)
+
+    async def __acall__(self, request):
+        if not (sampler.sampled() or self._requested(request)):
+            return await self.get_response(request)
+
+        profile = self._start()
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(request, profile)
+
+    def _start(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another request is already being profiled on this thread
+            return None
+        return profile
+
+    def _finish(self, request, profile):
+        if profile is None:
+            return
+        profile.disable()
+        match = request.resolver_match
+        route_profiles.add(match.view_name if match else "unresolved", profile)
+
+    def _requested(self, request):
+        header = request.headers.get("X-Profile-Request")
+        # Compared as bytes: compare_digest raises TypeError for non-ASCII strings
+        return bool(self.token and header and hmac.compare_digest(header.encode(), self.token.encode()))
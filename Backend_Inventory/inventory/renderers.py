@@ -0,0 +1,69 @@
+import json
+
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+from .rows import to_columnar
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib C encoder is used instead
+    orjson = None
+
+# Same options JSONRenderer passes to json.dumps with the default COMPACT/UNICODE/STRICT settings
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer for views that return plain dicts, lists, strings and numbers (see rows.py).
+    Output is byte-identical to JSONRenderer; data it cannot encode directly, and indented
+    responses, fall back to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (self.get_indent(accepted_media_type, renderer_context or {}) is not None
+                or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON and api_settings.STRICT_JSON)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            if orjson is not None:
+                return _escape_line_separators(orjson.dumps(data))
+            content = _encoder.encode(data)
+        except (TypeError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer: U+2028/U+2029 are valid JSON but not valid JavaScript
+        return content.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def _escape_line_separators(content):
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    Columnar variant selected with ?format=columnar or Accept: application/vnd.inventory.columnar+json.
+    Views can build tables directly (see rows.py); any top-level list of row dicts left in the
+    response is converted with to_columnar, and everything else is rendered unchanged.
+    """
+    media_type = 'application/vnd.inventory.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = {
+                key: to_columnar(value) if _is_row_list(value) else value
+                for key, value in data.items()
+            }
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _is_row_list(value):
+    return isinstance(value, list) and (not value or isinstance(value[0], dict))
+
+
+FAST_RENDERER_CLASSES = [FastJSONRenderer, BrowsableAPIRenderer]
+COLUMNAR_RENDERER_CLASSES = [FastJSONRenderer, ColumnarJSONRenderer, BrowsableAPIRenderer]
@@ -0,0 +1,176 @@
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from . import analytics
+from .models import ReportJob
+from .notifications import send_group_event
+
+logger = logging.getLogger(__name__)
+
+
+def _positive_int(params, name, default):
+    value = params.get(name, default)
+    # The params are a JSON body: null, lists and fractions must be a 400, not a TypeError or a truncation
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{name} must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if value < 1:
+        raise ValueError(f"{name} must be positive")
+    return value
+
+
+def _popular_params(params):
+    limit = _positive_int(params, 'limit', 10)
+    sort_by = params.get('sort_by', 'orders')
+    if sort_by not in ('orders', 'quantity'):
+        raise ValueError("sort_by must be 'orders' or 'quantity'")
+    return {"limit": limit, "sort_by": sort_by}
+
+
+def _forecast_params(params):
+    return {"days": _positive_int(params, 'days', 30), "horizon": _positive_int(params, 'horizon', 14)}
+
+
+def _latency_params(params):
+    return {"days": _positive_int(params, 'days', 30)}
+
+
+def _no_params(params):
+    return {}
+
+
+INFLIGHT = ("queued", "running")
+LOST_AFTER = 3600  # seconds after which a job still in flight is taken as lost
+
+# report name -> (parameter cleaner, builder)
+REPORTS = {
+    "sales": (_no_params, lambda params: analytics.sales_analytics()),
+    "popular": (_popular_params, lambda params: analytics.popular_products(**params)),
+    "forecast": (_forecast_params, lambda params: analytics.demand_forecast(**params)),
+    "latency": (_latency_params, lambda params: analytics.latency_percentiles(**params)),
+    "inventory_export": (_no_params, lambda params: analytics.stock_inventory()),
+    "orders_export": (_no_params, lambda params: analytics.orders_export()),
+}
+
+
+class ReportJobs:
+    """
+    Runs analytics reports on a background thread pool. Jobs are kept in the database (ReportJob)
+    for `result_ttl` seconds after they finish, so with several Daphne processes any of them can
+    answer a poll, whichever process runs the job.
+    """
+
+    def __init__(self, max_workers=2, result_ttl=600):
+        # Reports are database bound, so threads are enough to keep them off the request thread
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self.result_ttl = result_ttl
+
+    def submit(self, report, params=None):
+        """Queue a report, returning (job, created). Identical in-flight requests share one job."""
+        if report not in REPORTS:
+            raise ValueError(f"Unknown report '{report}'")
+        clean_params, build = REPORTS[report]
+        params = clean_params(params or {})
+        key = f"{report}:{json.dumps(params, sort_keys=True)}"
+
+        self._expire()
+        with transaction.atomic():
+            # Locks the in-flight job, if any, so it can't finish between the check and the reply
+            job = ReportJob.objects.select_for_update().filter(key=key, status__in=INFLIGHT).first()
+            if job is not None:
+                return self._public(job), False
+            job = ReportJob.objects.create(
+                job_id=uuid.uuid4().hex, report=report, params=params, key=key, created_at=time.time(),
+            )
+
+        future = self.executor.submit(self._run, job.job_id, build)
+        future.add_done_callback(self._log_failure)
+        return self._public(job), True
+
+    def get(self, job_id):
+        # Read only, so polling never writes: expired rows are skipped here and deleted by the next submit
+        job = ReportJob.objects.filter(job_id=job_id).first()
+        if job is None or self._expired(job, time.time()):
+            return None
+        return self._public(job)
+
+    def _run(self, job_id, build):
+        close_old_connections()
+        try:
+            job = ReportJob.objects.get(job_id=job_id)
+            ReportJob.objects.filter(job_id=job_id).update(status="running")
+            try:
+                job.result = build(job.params)
+                job.status = "completed"
+            except Exception as e:
+                logger.exception("Error running report %s", job_id, extra={"report": job.report})
+                job.result, job.error, job.status = None, str(e), "failed"
+            job.finished_at = time.time()
+            job.save(update_fields=["result", "error", "status", "finished_at"])
+        finally:
+            connection.close()
+
+        self._notify(job)
+
+    @staticmethod
+    def _log_failure(future):
+        # Anything _run raises (storing the result, the notification) would otherwise vanish with the future
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Report job failed", exc_info=exc)
+
+    def _notify(self, job):
+        try:
+            send_group_event("admin_orders", "report_ready", {
+                "job_id": job.job_id,
+                "report": job.report,
+                "status": job.status
+            })
+        except Exception:
+            logger.exception("Error sending report_ready for %s", job.job_id)
+        finally:
+            # send_group_event numbers the event in the event log, possibly in the database
+            connection.close()
+
+    def _expired(self, job, now):
+        if job.status in INFLIGHT:
+            return job.created_at < now - LOST_AFTER
+        return job.finished_at < now - self.result_ttl
+
+    def _expire(self):
+        now = time.time()
+        cutoff = now - self.result_ttl
+        ReportJob.objects.filter(finished_at__lt=cutoff).delete()
+        # A job still queued or running this long was lost with the process that ran it
+        ReportJob.objects.filter(status__in=INFLIGHT, created_at__lt=now - LOST_AFTER).delete()
+
+    def _public(self, job):
+        data = {
+            "job_id": job.job_id,
+            "report": job.report,
+            "params": job.params,
+            "status": job.status,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+            "error": job.error,
+        }
+        if job.status == "completed":
+            data["result"] = job.result
+            data["expires_at"] = job.finished_at + self.result_ttl
+        return data
+
+
+# Global instance
+report_jobs = ReportJobs(
+    max_workers=getattr(settings, "REPORT_JOB_WORKERS", 2),
+    result_ttl=getattr(settings, "REPORT_RESULT_TTL", 600),
+)
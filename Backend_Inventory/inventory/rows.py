@@ -0,0 +1,205 @@
+"""
+Row builders for the large list endpoints.
+
+Each builder takes the tuples of queryset.values_list(*<NAME>_FIELDS), fetched by a sync view
+or with avalues_list() by an async one, and turns them into plain dicts directly, skipping model
+instantiation and per-field serializer calls. Each builder produces exactly what the
+serializer or hand-built loop it replaces produced, so responses stay byte-for-byte the same.
+Orders take a second query for their lines (order_lines), grouped by order with group_lines.
+
+The *_columns builders produce the same data in columnar form (?format=columnar): one array
+per column, with low-cardinality columns dictionary-encoded, so key names and repeated
+category/status strings are sent once instead of on every row.
+"""
+from operator import itemgetter, le
+
+from django.utils import timezone
+
+from .models import OrderLine
+
+PRODUCT_LIST_FIELDS = ('id', 'name', 'price', 'stock_quantity', 'category')
+ORDER_LIST_FIELDS = ('id', 'created_on', 'status', 'username')
+ORDER_LINE_FIELDS = ('order_id', 'item_id', 'item_name', 'item_quantity')
+STOCK_FIELDS = ('id', 'name', 'description', 'category', 'price', 'stock_quantity', 'low_stock_threshold')
+ORDER_COLUMNS = ('id', 'lines', 'created_on', 'status', 'username')
+STOCK_COLUMNS = STOCK_FIELDS + ('is_low_stock', 'is_out_of_stock')
+SEARCH_FIELDS = ('id', 'name', 'price', 'stock_quantity', 'category')
+LOW_STOCK_FIELDS = ('id', 'name', 'category', 'stock_quantity', 'low_stock_threshold')
+
+
+async def avalues_list(queryset, fields):
+    """queryset.values_list(*fields) fetched with the async ORM"""
+    return [row async for row in queryset.values_list(*fields)]
+
+
+def order_lines(orders):
+    """Lines of `orders` (an Order queryset, as a subquery, or a list of ids) in checkout order"""
+    return OrderLine.objects.filter(order__in=orders).order_by('id')
+
+
+def format_price(value):
+    """Same as the serializer DecimalField for Product.price (2 decimal places, as a string)"""
+    return None if value is None else f"{value:.2f}"
+
+
+def datetime_formatter():
+    """Same as the serializer DateTimeField: current timezone, ISO 8601 with 'Z' for UTC"""
+    tz = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_datetime
+
+
+def product_rows(values):
+    """ProductSearchSerializer shape"""
+    return [
+        {
+            "id": id,
+            "name": name,
+            "price": format_price(price),
+            "stock_quantity": stock_quantity,
+            "category": category,
+        }
+        for id, name, price, stock_quantity, category in values
+    ]
+
+
+def group_lines(values):
+    """order id -> that order's lines, from values_list(*ORDER_LINE_FIELDS) tuples"""
+    lines = {}
+    for order_id, item_id, item_name, item_quantity in values:
+        line = {"item_id": item_id, "item_name": item_name, "item_quantity": item_quantity}
+        lines.setdefault(order_id, []).append(line)
+    return lines
+
+
+def order_rows(values, lines):
+    """OrderItemSerializer shape, with each order's lines taken from group_lines()"""
+    format_datetime = datetime_formatter()
+    return [
+        {
+            "id": id,
+            "lines": lines.get(id, []),
+            "created_on": format_datetime(created_on),
+            "status": status,
+            "username": username,
+        }
+        for id, created_on, status, username in values
+    ]
+
+
+def stock_rows(values):
+    """Stock inventory shape, with is_low_stock/is_out_of_stock computed as on the model"""
+    return [
+        {
+            "id": id,
+            "name": name,
+            "description": description,
+            "category": category,
+            "price": float(price),
+            "stock_quantity": stock_quantity,
+            "low_stock_threshold": low_stock_threshold,
+            "is_low_stock": stock_quantity <= low_stock_threshold,
+            "is_out_of_stock": stock_quantity <= 0,
+        }
+        for id, name, description, category, price, stock_quantity, low_stock_threshold
+        in values
+    ]
+
+
+def search_rows(values):
+    """Product search shape expected by the frontend"""
+    return [
+        {
+            "id": id,
+            "name": name,
+            "price": float(price),
+            "stock": stock_quantity,
+            "category": category,
+        }
+        for id, name, price, stock_quantity, category in values
+    ]
+
+
+def low_stock_rows(values):
+    """Low stock alert shape; values are already filtered to stock_quantity <= low_stock_threshold"""
+    return [
+        {
+            "id": id,
+            "name": name,
+            "category": category,
+            "stock_quantity": stock_quantity,
+            "low_stock_threshold": low_stock_threshold,
+            "is_out_of_stock": stock_quantity <= 0,
+        }
+        for id, name, category, stock_quantity, low_stock_threshold in values
+    ]
+
+
+# Columnar form
+
+COLUMNAR_DICTIONARY_FIELDS = ('category', 'status')
+
+
+def columnar(columns, data, dictionary_fields=COLUMNAR_DICTIONARY_FIELDS):
+    """
+    {"columns", "dictionaries", "data"}: data[i] holds every value of columns[i], and the values of
+    dictionary_fields are replaced by their index into dictionaries[field]
+    """
+    data = list(data)
+    dictionaries = {}
+    for index, column in enumerate(columns):
+        if column in dictionary_fields:
+            codes = {value: code for code, value in enumerate(dict.fromkeys(data[index]))}
+            dictionaries[column] = list(codes)
+            data[index] = list(map(codes.__getitem__, data[index]))
+    return {"columns": list(columns), "dictionaries": dictionaries, "data": data}
+
+
+def to_columnar(rows, dictionary_fields=COLUMNAR_DICTIONARY_FIELDS):
+    """Columnar form of a list of same-shaped row dicts"""
+    columns = list(rows[0]) if rows else []
+    return columnar(columns, [list(map(itemgetter(column), rows)) for column in columns], dictionary_fields)
+
+
+def from_columnar(table):
+    """Back to a list of row dicts"""
+    columns = table["columns"]
+    data = [
+        [table["dictionaries"][column][code] for code in values] if column in table["dictionaries"] else values
+        for column, values in zip(columns, table["data"])
+    ]
+    return [dict(zip(columns, row)) for row in zip(*data)]
+
+
+def _transpose(values, fields):
+    """values_list() rows as one tuple per field, without building a dict per row"""
+    return list(zip(*values)) or [()] * len(fields)
+
+
+def order_columns(values, lines):
+    """order_rows in columnar form"""
+    ids, created_on, statuses, usernames = _transpose(values, ORDER_LIST_FIELDS)
+    return columnar(
+        ORDER_COLUMNS,
+        [ids, [lines.get(id, []) for id in ids], list(map(datetime_formatter(), created_on)), statuses, usernames],
+    )
+
+
+def stock_columns(values):
+    """stock_rows in columnar form"""
+    ids, names, descriptions, categories, prices, stock, thresholds = _transpose(values, STOCK_FIELDS)
+    return columnar(
+        STOCK_COLUMNS,
+        [
+            ids, names, descriptions, categories, list(map(float, prices)), stock, thresholds,
+            list(map(le, stock, thresholds)), [quantity <= 0 for quantity in stock],
+        ],
+    )
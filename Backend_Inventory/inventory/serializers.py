@@ -1,5 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Order, Product
+from .models import Order, OrderLine, Product
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -30,47 +31,61 @@ class LowStockProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'category', 'stock_quantity', 'low_stock_threshold']
 
 
-class OrderItemSerializer(serializers.Serializer):
-    id = serializers.IntegerField()
+class OrderLineItemSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
     item_name = serializers.CharField(max_length=100)
     item_quantity = serializers.IntegerField()
+
+
+class OrderItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    lines = OrderLineItemSerializer(many=True)
     created_on = serializers.DateTimeField() 
     status = serializers.CharField(max_length=100)
     username = serializers.CharField(max_length=150, required=False)
      
     class Meta:
         model = Order
-        fields = ['id', 'user_id', 'username', 'item_id', 'item_name', 'item_quantity', 'status', 'created_on']
+        fields = ['id', 'lines', 'created_on', 'status', 'username']
 
 
-class OrderSerializer(serializers.ModelSerializer):
-    item_id = serializers.IntegerField()
-    item_quantity = serializers.IntegerField()
-    
-    class Meta:
-        model = Order
-        fields = ['item_id', 'item_name', 'item_quantity']
+class CartSerializer(serializers.ListSerializer):
+    """Saves a checked-out cart as one Order with a line per item"""
+
+    def __init__(self, *args, **kwargs):
+        # An empty cart is not an order
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(*args, **kwargs)
 
     def create(self, validated_data):
         user_id = self.context.get('user_id')
         username = self.context.get('username')
         if not user_id or not username:
             raise serializers.ValidationError("User info missing")
-        
-        # Try to link to Product model
-        product = None
-        try:
-            product = Product.objects.get(id=validated_data.get('item_id'))
-        except Product.DoesNotExist:
-            # Try to find by name
-            try:
-                product = Product.objects.get(name__iexact=validated_data.get('item_name'))
-            except Product.DoesNotExist:
-                pass
-        
-        return Order.objects.create(
-            user_id=user_id,
-            username=username,
-            product=product,
-            **validated_data
-        )
+
+        # Link lines to products by id, falling back to the name
+        products = Product.objects.in_bulk({line['item_id'] for line in validated_data})
+        lines = []
+        for line in validated_data:
+            product = products.get(line['item_id'])
+            if product is None:
+                product = Product.objects.filter(name__iexact=line['item_name']).first()
+            lines.append(OrderLine(product=product, **line))
+
+        with transaction.atomic():
+            order = Order.objects.create(user_id=user_id, username=username)
+            for line in lines:
+                line.order = order
+            OrderLine.objects.bulk_create(lines)
+        return order
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    """One cart item; use with many=True to check out a whole cart as a single order"""
+    item_id = serializers.IntegerField()
+    item_quantity = serializers.IntegerField()
+    
+    class Meta:
+        model = OrderLine
+        fields = ['item_id', 'item_name', 'item_quantity']
+        list_serializer_class = CartSerializer
@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import registry
+from .notifications import send_group_event
+from .rows import columnar
+
+logger = logging.getLogger(__name__)
+
+STOCK_UPDATES_GROUP = "stock_updates"
+STOCK_UPDATE_COLUMNS = ("id", "stock_quantity", "low_stock_threshold")
+
+stock_update_events = registry.counter(
+    "inventory_stock_update_events_total",
+    "Product stock changes recorded and the stock_update batches they were coalesced into",
+    ["kind"],
+)
+
+
+class StockUpdates:
+    """
+    Coalesces stock changes per product and sends them to the stock_updates group as one
+    `stock_update` event per `window` seconds, holding each changed product's latest stock in
+    columnar form. A burst of accepts becomes a handful of frames rather than one per change.
+    """
+
+    def __init__(self, window=0.25):
+        self.window = window
+        self.lock = threading.Lock()
+        self.pending = {}  # product id -> (stock_quantity, low_stock_threshold)
+        self.changed = threading.Event()
+        self.pid = None
+
+    def record(self, product):
+        """Queue a product's current stock; call after the change is committed"""
+        with self.lock:
+            self.pending[product.id] = (product.stock_quantity, product.low_stock_threshold)
+        stock_update_events.inc(kind="change")
+        self._ensure_thread()
+        self.changed.set()
+
+    def _ensure_thread(self):
+        # Started on first use, so worker processes forked after start-up get their own
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self._run, daemon=True, name="stock-updates").start()
+
+    def _run(self):
+        while True:
+            self.changed.wait()
+            # Changes recorded while this sleeps join the same batch
+            time.sleep(self.window)
+            self.changed.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error sending stock update")
+
+    def flush(self):
+        """Send everything recorded so far as one stock_update event"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        stocks, thresholds = zip(*pending.values())
+        send_group_event(
+            STOCK_UPDATES_GROUP,
+            "stock_update",
+            columnar(STOCK_UPDATE_COLUMNS, [list(pending), list(stocks), list(thresholds)], ()),
+        )
+        stock_update_events.inc(kind="batch")
+
+
+# Global instance
+stock_updates = StockUpdates(window=getattr(settings, "STOCK_UPDATE_WINDOW", 0.25))
@@ -0,0 +1,209 @@
+"""
+Structured, non-blocking logging for the inventory service.
+
+Loggers under `inventory` hand records to QueueLogHandler, which only puts them on a
+bounded in-memory queue; a QueueListener thread formats them as JSON lines and does
+the actual I/O, so a slow or blocked stdout never stalls a request or the order consumer.
+Context bound with `bind()` (request, order_id, start time) is copied onto every
+record, and RateLimitFilter keeps a burst of identical errors from flooding the output.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .metrics import registry
+
+log_records_dropped = registry.counter(
+    "inventory_log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+log_records_suppressed = registry.counter(
+    "inventory_log_records_suppressed_total", "Repeated log records suppressed by rate limiting"
+)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_context = ContextVar("log_context", default=None)
+
+
+@contextmanager
+def bind(**fields):
+    """
+    Attach fields to every record logged in this context. `started` adds duration_ms, and
+    `request` adds its path, the username in its access token and resolved view name.
+    """
+    current = _context.get() or {}
+    token = _context.set({**current, **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def _token_username(request):
+    # Imported here: this module is loaded while logging is configured, before the apps are ready
+    from rest_framework.exceptions import AuthenticationFailed
+    from .authentication import authenticate_token
+
+    # Verified tokens are cached, so the view's own check does not decode it again
+    try:
+        user_auth = authenticate_token(request.headers.get("Authorization"))
+    except AuthenticationFailed:
+        return None
+    return user_auth[0].username if user_auth else None
+
+
+def _request_fields(request):
+    match = request.resolver_match
+    return {
+        "path": request.path,
+        "username": _token_username(request),
+        "view": match.view_name if match else None,
+    }
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound context onto records; runs in the calling thread, not the listener"""
+
+    def filter(self, record):
+        context = _context.get()
+        if not context:
+            return True
+        for key, value in context.items():
+            if key == "started":
+                fields = {"duration_ms": round((time.perf_counter() - value) * 1000, 1)}
+            elif key == "request":
+                fields = _request_fields(value)
+            else:
+                fields = {key: value}
+            for name, field in fields.items():
+                if not hasattr(record, name):
+                    setattr(record, name, field)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` records per `period` seconds for each (logger, message, exception type)
+    at WARNING or above. The first record after a quiet period reports how many were suppressed.
+    """
+
+    def __init__(self, burst=5, period=60.0, max_keys=1000):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.windows = {}  # key -> [window start, records emitted, records suppressed]
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        key = (record.name, record.msg, exc_type)
+        now = time.monotonic()
+
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                if window is None and len(self.windows) >= self.max_keys:
+                    self.windows.clear()
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+
+        log_records_suppressed.inc()
+        return False
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context fields and any extra"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Enqueues records without blocking and drops them (counting the drop) when the queue is full.
+    The listener thread that writes them to `stream` is started on first use, so it also
+    exists in worker processes forked after logging was configured.
+    """
+
+    def __init__(self, queue_size=10000, stream=None):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        target = logging.StreamHandler(stream or sys.stdout)
+        target.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, target, respect_handler_level=False)
+        self.listener_pid = None
+        self.start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        pid = self.listener_pid
+        if pid is not None and pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.listener_pid == os.getpid():
+                return
+            # A forked child inherits the attribute but not the thread
+            self.listener._thread = None
+            self.listener.start()
+            if self.listener_pid is None:
+                atexit.register(self.close)
+            self.listener_pid = os.getpid()
+
+    def prepare(self, record):
+        # Only resolve the message and traceback here; JSON formatting happens on the listener thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def close(self):
+        if self.listener_pid is not None and self.listener._thread is not None:
+            # Flushes everything already queued before returning
+            self.listener.stop()
+        super().close()
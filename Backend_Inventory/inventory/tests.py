@@ -1,3 +1,1160 @@
-from django.test import TestCase
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.exceptions import ChannelFull
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management import call_command
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+
+from . import analytics, renderers, structured_logging
+from .authentication import VerifiedTokenCache
+from .channel_layer import ChannelRouter, UnixSocketChannelLayer
+from .dashboard import DashboardSnapshots
+from .event_log import EventLog
+from .metrics import Registry
+from .middleware import QueryTimingMiddleware, _current_recorder, view_query_stats
+from .models import Order, OrderLine, Product, ReportJob
+from .notifications import send_order_status
+from .profiling import RouteProfiles, SamplingProfilerMiddleware
+from .outbox import Outbox
+from .renderers import ColumnarJSONRenderer, FastJSONRenderer
+from .report_jobs import REPORTS, ReportJobs
+from .rows import (
+    PRODUCT_LIST_FIELDS, SEARCH_FIELDS, STOCK_FIELDS, from_columnar, product_rows, search_rows, stock_rows,
+    to_columnar,
+)
+from .serializers import ProductSearchSerializer
+from .stock_updates import StockUpdates, stock_updates
+from .structured_logging import ContextFilter, QueueLogHandler, RateLimitFilter, bind, log_records_dropped
+
+
+def auth_headers(is_admin=True):
+    now = int(time.time())
+    claims = {
+        "token_type": "access", "user_id": 1, "username": "alice", "is_admin": is_admin, "iat": now, "exp": now + 300,
+    }
+    return {"HTTP_AUTHORIZATION": f"Bearer {jwt.encode(claims, settings.SECRET_KEY, algorithm='HS256')}"}
+
+
+class VerifiedTokenCacheTests(SimpleTestCase):
+    def token(self, exp, token_type="access"):
+        claims = {"token_type": token_type, "user_id": 1, "username": "alice", "is_admin": True, "exp": exp}
+        return jwt.encode(claims, settings.SECRET_KEY, algorithm="HS256")
+
+    def test_token_is_decoded_once_until_it_expires(self):
+        cache = VerifiedTokenCache(max_size=2)
+        exp = int(time.time()) + 1
+        token = self.token(exp)
+        with mock.patch("inventory.authentication.jwt.decode", wraps=jwt.decode) as decode:
+            users = [cache.get(token) for _ in range(3)]
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual({user.id for user in users}, {1})
+
+        # Past exp the cached entry is not served, and decoding again rejects the token
+        time.sleep(exp + 0.1 - time.time())
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            cache.get(token)
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_refresh_token_is_rejected_and_not_cached(self):
+        cache = VerifiedTokenCache()
+        for _ in range(2):
+            with self.assertRaisesMessage(AuthenticationFailed, "Invalid token type"):
+                cache.get(self.token(int(time.time()) + 300, token_type="refresh"))
+        self.assertEqual(len(cache.entries), 0)
+
+
+class ColumnarFormatTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        beaker = Product.objects.create(
+            name="Beaker 250ml", description="Borosilicate", category="glassware",
+            price="4.50", stock_quantity=3, low_stock_threshold=5,
+        )
+        ethanol = Product.objects.create(
+            name="Ethanol   1L", category="chemicals", price="12.00", stock_quantity=0,
+        )
+        Product.objects.create(name="Goggles", category="safety", price="7.25", stock_quantity=40)
+        for products, status in [([beaker], "Pending"), ([ethanol, beaker], "Processed"), ([beaker], "Processed")]:
+            order = Order.objects.create(user_id=1, username="alice", status=status)
+            for product in products:
+                OrderLine.objects.create(
+                    order=order, item_id=product.id, item_name=product.name, item_quantity=2, product=product,
+                )
+        order = Order.objects.create(user_id=2, username=None)
+        OrderLine.objects.create(order=order, item_id=0, item_name="Unlinked", item_quantity=1)
+
+    def assert_parity(self, url_name, key):
+        url = reverse(url_name)
+        rows = self.client.get(url, **auth_headers()).json()[key]
+
+        response = self.client.get(url, {"format": "columnar"}, **auth_headers())
+        self.assertEqual(response["Content-Type"], ColumnarJSONRenderer.media_type)
+        table = response.json()[key]
+        self.assertEqual(from_columnar(table), rows)
+
+        # Negotiated through Accept as well as ?format=
+        negotiated = self.client.get(url, HTTP_ACCEPT=ColumnarJSONRenderer.media_type, **auth_headers())
+        self.assertEqual(negotiated.content, response.content)
+        return table
+
+    def test_stock_inventory_parity(self):
+        table = self.assert_parity("get_stock_inventory", "inventory")
+        self.assertEqual(len(table["data"][0]), 3)
+        self.assertEqual(table["dictionaries"]["category"], ["chemicals", "glassware", "safety"])
+
+    def test_admin_orders_parity(self):
+        table = self.assert_parity("get_all_orders_admin", "orders")
+        self.assertEqual(len(table["data"][0]), 4)
+        self.assertEqual(sum(len(lines) for lines in table["data"][1]), 5)
+        self.assertEqual(sorted(table["dictionaries"]["status"]), ["Pending", "Processed"])
+
+    def test_columnar_is_smaller(self):
+        url = reverse("get_all_orders_admin")
+        rows = self.client.get(url, **auth_headers()).content
+        columnar = self.client.get(url, {"format": "columnar"}, **auth_headers()).content
+        self.assertLess(len(columnar), len(rows))
+
+    def test_generic_conversion(self):
+        rows = self.client.get(reverse("get_all_orders_admin"), **auth_headers()).json()["orders"]
+        self.assertEqual(from_columnar(to_columnar(rows)), rows)
+        self.assertEqual(from_columnar(to_columnar([])), [])
+        rendered = ColumnarJSONRenderer().render({"error": "Failed to fetch orders"})
+        self.assertEqual(json.loads(rendered), {"error": "Failed to fetch orders"})
+
+
+class CartOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.beaker = Product.objects.create(
+            name="Beaker 250ml", category="glassware", stock_quantity=10, low_stock_threshold=2,
+        )
+        cls.gloves = Product.objects.create(
+            name="Nitrile Gloves", category="safety", stock_quantity=3, low_stock_threshold=2,
+        )
+
+    def checkout(self, *lines):
+        cart = [
+            {"item_id": product.id, "item_name": product.name, "item_quantity": quantity}
+            for product, quantity in lines
+        ]
+        return self.client.post(
+            reverse("order-list"), json.dumps(cart), content_type="application/json", **auth_headers()
+        )
+
+    def test_cart_is_one_order(self):
+        response = self.checkout((self.beaker, 2), (self.gloves, 1))
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(id=response.json()["order_id"])
+        self.assertEqual(order.status, "Pending")
+        self.assertEqual(
+            list(order.lines.values_list("product_id", "item_quantity")),
+            [(self.beaker.id, 2), (self.gloves.id, 1)],
+        )
+
+        orders = self.client.get(reverse("get_user_orders"), **auth_headers()).json()["orders"]
+        self.assertEqual(len(orders), 1)
+        self.assertEqual([line["item_name"] for line in orders[0]["lines"]], ["Beaker 250ml", "Nitrile Gloves"])
+
+    def test_orders_belong_to_the_token_username(self):
+        cart = [{"item_id": self.beaker.id, "item_name": self.beaker.name, "item_quantity": 1}]
+        response = self.client.post(
+            reverse("order-list"), json.dumps(cart), content_type="application/json",
+            HTTP_X_USERNAME="mallory", **auth_headers(),
+        )
+        self.assertEqual(Order.objects.get(id=response.json()["order_id"]).username, "alice")
+
+    def test_admin_routes_need_the_admin_claim(self):
+        user = auth_headers(is_admin=False)
+        self.assertEqual(self.client.get(reverse("get_all_orders_admin"), **user).status_code, 403)
+        self.assertEqual(self.client.get(reverse("get_admin_dashboard"), **user).status_code, 403)
+        self.assertEqual(self.client.get(reverse("get_user_orders"), **user).status_code, 200)
+
+    def test_empty_cart_is_rejected(self):
+        self.assertEqual(self.checkout().status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def accept(self, order_id):
+        # Keep the order away from the consumer thread
+        with mock.patch("inventory.views.order_queue") as queue:
+            response = self.client.post(reverse("accept_order", kwargs={"order_id": order_id}), **auth_headers())
+        return response, queue
+
+    def test_accept_reserves_every_line(self):
+        order_id = self.checkout((self.beaker, 2), (self.gloves, 1), (self.beaker, 1)).json()["order_id"]
+        response, queue = self.accept(order_id)
+
+        self.assertEqual(response.status_code, 200)
+        queue.put.assert_called_once_with(order_id)
+        self.assertEqual([alert["product_id"] for alert in response.json()["low_stock_alerts"]], [self.gloves.id])
+        self.beaker.refresh_from_db()
+        self.gloves.refresh_from_db()
+        self.assertEqual((self.beaker.stock_quantity, self.gloves.stock_quantity), (7, 2))
+        self.assertEqual(Order.objects.get(id=order_id).status, "Processing")
+
+    def test_accept_reserves_nothing_when_a_line_is_short(self):
+        order_id = self.checkout((self.beaker, 2), (self.gloves, 5)).json()["order_id"]
+        response, queue = self.accept(order_id)
+
+        self.assertEqual(response.status_code, 400)
+        queue.put.assert_not_called()
+        self.beaker.refresh_from_db()
+        self.assertEqual(self.beaker.stock_quantity, 10)
+        self.assertEqual(Order.objects.get(id=order_id).status, "Pending")
+
+    def test_low_stock_alert_fires_once_until_restocked(self):
+        def accept_gloves(quantity):
+            order_id = self.checkout((self.gloves, quantity)).json()["order_id"]
+            return self.accept(order_id)[0].json().get("low_stock_alerts")
+
+        def restock(quantity):
+            self.client.post(
+                reverse("update_stock", kwargs={"product_id": self.gloves.id}),
+                {"stock_quantity": quantity}, **auth_headers(),
+            )
+            alerts = self.client.get(reverse("get_low_stock_alerts"), **auth_headers()).json()["low_stock_alerts"]
+            return [alert["id"] for alert in alerts]
+
+        self.assertEqual(len(accept_gloves(1)), 1)  # 3 -> 2, crosses the threshold
+        self.assertIsNone(accept_gloves(1))  # 2 -> 1, already alerted
+        self.assertEqual(restock(5), [self.gloves.id])  # within the re-arm margin
+        self.assertEqual(restock(8), [])  # above threshold + margin, re-armed
+        self.assertEqual(len(accept_gloves(6)), 1)
+
+
+class DashboardResultTests(TestCase):
+    def test_unknown_status_gets_its_own_list(self):
+        legacy = Order.objects.create(username="alice", status="On Hold")
+        Order.objects.create(username="bob", status="Pending")
+        snapshot = async_to_sync(analytics.adashboard_snapshot)()
+        self.assertEqual(snapshot["status_counts"]["On Hold"], 1)
+        self.assertEqual([order["id"] for order in snapshot["orders"]["On Hold"]], [legacy.id])
+        self.assertEqual(len(snapshot["orders"]["Pending"]), 1)
+
+        # Written after the status totals were counted
+        result = analytics._dashboard_result([], [(legacy.id, legacy.created_on, "Archived", "alice")], [], [], [])
+        self.assertEqual(result["status_counts"]["Pending"], 0)
+        self.assertEqual([order["id"] for order in result["orders"]["Archived"]], [legacy.id])
+
+
+class DashboardSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.builds = []
+        self.release = asyncio.Event()
+
+        async def build(page_size):
+            self.builds.append(page_size)
+            number = len(self.builds)
+            if number == 1:
+                await self.release.wait()
+            return {"build": number}
+
+        patcher = mock.patch("inventory.dashboard.analytics.adashboard_snapshot", build)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.snapshots = DashboardSnapshots(ttl=60)
+
+    async def start_first_build(self):
+        first = asyncio.ensure_future(self.snapshots.get())
+        while not self.builds:
+            await asyncio.sleep(0)
+        return first
+
+    async def test_snapshot_built_before_an_invalidate_is_not_kept(self):
+        first = await self.start_first_build()
+        self.snapshots.invalidate()
+        self.release.set()
+        self.assertEqual(await first, {"build": 1})
+        self.assertEqual(await self.snapshots.get(), {"build": 2})
+        self.assertEqual(await self.snapshots.get(), {"build": 2})
+        self.assertEqual(len(self.builds), 2)
+
+    async def test_request_after_an_invalidate_does_not_wait_for_the_stale_build(self):
+        first = await self.start_first_build()
+        self.snapshots.invalidate()
+        self.assertEqual(await asyncio.wait_for(self.snapshots.get(), 5), {"build": 2})
+        self.release.set()
+        self.assertEqual(await first, {"build": 1})
+        # The first build finished last but is older, so the second stays cached
+        self.assertEqual(await self.snapshots.get(), {"build": 2})
+
+
+class LatencyAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        beaker = Product.objects.create(name="Beaker 250ml", category="glassware")
+        gloves = Product.objects.create(name="Nitrile Gloves", category="safety")
+        cls.created = timezone.now() - timedelta(minutes=5)
+
+        def order(created, pending_seconds, product, queued_seconds=2):
+            accepted = created + timedelta(seconds=pending_seconds)
+            order = Order.objects.create(status="Processing")
+            # created_on is auto_now_add, so it is set afterwards
+            Order.objects.filter(pk=order.pk).update(
+                created_on=created, accepted_at=accepted,
+                processing_started_at=accepted + timedelta(seconds=queued_seconds),
+            )
+            OrderLine.objects.create(
+                order=order, item_id=product.id, item_name=product.name, item_quantity=1, product=product,
+            )
+
+        # Pending 1s..10s for glassware, so the nearest ranks are 5, 9 and 10
+        for seconds in range(1, 11):
+            order(cls.created, seconds, beaker)
+        order(cls.created, 3, gloves, queued_seconds=7)
+        # Outside the default 30 day window
+        order(cls.created - timedelta(days=40), 100, beaker)
+
+    def test_nearest_rank_percentiles_per_stage_and_category(self):
+        response = self.client.get(reverse("get_latency_analytics"), **auth_headers())
+        self.assertEqual(response.status_code, 200)
+        stages = response.json()["stages"]
+        day = self.created.astimezone(timezone.get_current_timezone()).date().isoformat()
+
+        self.assertEqual(stages["pending"], [
+            {"day": day, "category": "glassware", "count": 10,
+             "p50_seconds": 5.0, "p90_seconds": 9.0, "p99_seconds": 10.0},
+            {"day": day, "category": "safety", "count": 1,
+             "p50_seconds": 3.0, "p90_seconds": 3.0, "p99_seconds": 3.0},
+        ])
+        self.assertEqual(
+            [(entry["category"], entry["p50_seconds"], entry["p99_seconds"]) for entry in stages["queued"]],
+            [("glassware", 2.0, 2.0), ("safety", 7.0, 7.0)],
+        )
+        # Nothing has been processed yet
+        self.assertEqual((stages["processing"], stages["end_to_end"]), ([], []))
+
+    def test_days_widens_the_window(self):
+        pending = analytics.latency_percentiles(days=60)["stages"]["pending"]
+        self.assertEqual([(entry["category"], entry["count"]) for entry in pending][-2:], [
+            ("glassware", 10), ("safety", 1),
+        ])
+        old = pending[0]
+        self.assertEqual((old["count"], old["p50_seconds"], old["p99_seconds"]), (1, 100.0, 100.0))
+        self.assertEqual(len(pending), 3)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def registry(self, directory=None):
+        registry = Registry(directory=directory)
+        registry.counter("jobs_total", "Jobs by outcome", ["outcome"])
+        registry.histogram("job_seconds", "Job duration", buckets=(0.1, 1.0))
+        registry.gauge("connections", "Open connections")
+        return registry
+
+    def record(self, registry, outcome, duration, connections):
+        jobs, seconds, gauge = registry.metrics
+        jobs.inc(outcome=outcome)
+        seconds.observe(duration)
+        gauge.set(connections)
+
+    def write_process_file(self, registry, pid):
+        with open(os.path.join(self.directory, f"{pid}.json"), "w") as f:
+            json.dump({"pid": pid, "metrics": registry.collect()}, f)
+
+    def test_exposition_format(self):
+        registry = self.registry()
+        jobs, seconds, connections = registry.metrics
+        jobs.inc(outcome='say "hi"\n')
+        jobs.inc(2, outcome="ok")
+        seconds.observe(0.05)
+        seconds.observe(0.5)
+        seconds.observe(3)
+        connections.set(4)
+        self.assertEqual(registry.render(), (
+            "# HELP connections Open connections\n"
+            "# TYPE connections gauge\n"
+            "connections 4\n"
+            "# HELP job_seconds Job duration\n"
+            "# TYPE job_seconds histogram\n"
+            'job_seconds_bucket{le="0.1"} 1\n'
+            'job_seconds_bucket{le="1.0"} 2\n'
+            'job_seconds_bucket{le="+Inf"} 3\n'
+            "job_seconds_sum 3.55\n"
+            "job_seconds_count 3\n"
+            "# HELP jobs_total Jobs by outcome\n"
+            "# TYPE jobs_total counter\n"
+            'jobs_total{outcome="say \\"hi\\"\\n"} 1\n'
+            'jobs_total{outcome="ok"} 2\n'
+        ))
+
+    def test_process_files_are_merged(self):
+        registry = self.registry(self.directory)
+        self.record(registry, "ok", 0.05, 3)
+        other = self.registry()
+        self.record(other, "ok", 0.5, 2)
+        other.metrics[0].inc(outcome="failed")
+        self.write_process_file(other, os.getppid())  # a live process
+
+        text = registry.render()
+        self.assertIn('jobs_total{outcome="ok"} 2\n', text)
+        self.assertIn('jobs_total{outcome="failed"} 1\n', text)
+        self.assertIn('job_seconds_bucket{le="0.1"} 1\njob_seconds_bucket{le="1.0"} 2\n', text)
+        self.assertIn("job_seconds_count 2\n", text)
+        self.assertIn("connections 5\n", text)
+        # This process wrote its own file while rendering
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"{os.getpid()}.json")))
+
+    def test_dead_process_keeps_its_counts_but_not_its_gauges(self):
+        registry = self.registry(self.directory)
+        self.record(registry, "ok", 0.05, 3)
+        dead = subprocess.Popen([sys.executable, "-c", ""])
+        dead.wait()
+        other = self.registry()
+        self.record(other, "ok", 0.5, 2)
+        self.write_process_file(other, dead.pid)
+
+        text = registry.render()
+        self.assertIn('jobs_total{outcome="ok"} 2\n', text)
+        self.assertIn("job_seconds_count 2\n", text)
+        self.assertIn("connections 3\n", text)
+
+    def test_metrics_view(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn("# TYPE inventory_http_requests_total counter\n", response.content.decode())
+
+
+class FastJSONRendererTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(name="Bécher 250ml", category="glassware", price="12.50", stock_quantity=5)
+        Product.objects.create(
+            name="Line\u2028and\u2029paragraph", description="Ünïcode — “quoted”", category="safety",
+            price="3.00", stock_quantity=0,
+        )
+        Product.objects.create(name="Centrifuge", category="equipment", price="1234567.89", stock_quantity=2)
+        cls.products = Product.objects.order_by("id")
+
+    def legacy_responses(self):
+        """What the serializer and the hand-built loops the row builders replaced sent, through JSONRenderer"""
+        render = JSONRenderer().render
+        return {
+            "product": render({"products": ProductSearchSerializer(self.products, many=True).data}),
+            "search": render({"message": [
+                {"id": p.id, "name": p.name, "price": float(p.price), "stock": p.stock_quantity, "category": p.category}
+                for p in self.products
+            ]}),
+            "stock": render({"inventory": [
+                {
+                    "id": p.id, "name": p.name, "description": p.description, "category": p.category,
+                    "price": float(p.price), "stock_quantity": p.stock_quantity,
+                    "low_stock_threshold": p.low_stock_threshold, "is_low_stock": p.is_low_stock,
+                    "is_out_of_stock": p.is_out_of_stock,
+                }
+                for p in self.products
+            ]}),
+        }
+
+    def fast_responses(self):
+        render = FastJSONRenderer().render
+        # Falling back to JSONRenderer would hide a difference
+        with mock.patch.object(JSONRenderer, "render", side_effect=AssertionError("fell back to JSONRenderer")):
+            return {
+                "product": render({"products": product_rows(self.products.values_list(*PRODUCT_LIST_FIELDS))}),
+                "search": render({"message": search_rows(self.products.values_list(*SEARCH_FIELDS))}),
+                "stock": render({"inventory": stock_rows(self.products.values_list(*STOCK_FIELDS))}),
+            }
+
+    def test_output_matches_json_renderer_with_orjson(self):
+        self.assertIsNotNone(renderers.orjson)
+        expected = self.legacy_responses()
+        self.assertIn(b"\\u2028", expected["product"])
+        self.assertEqual(self.fast_responses(), expected)
+
+    def test_output_matches_json_renderer_with_the_stdlib_encoder(self):
+        expected = self.legacy_responses()
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(self.fast_responses(), expected)
+
+
+class QueryTimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ("Beaker 250ml", "Nitrile Gloves"):
+            product = Product.objects.create(name=name, category="glassware")
+            order = Order.objects.create(user_id=1, username="alice")
+            OrderLine.objects.create(
+                order=order, item_id=product.id, item_name=name, item_quantity=1, product=product,
+            )
+
+    def header_queries(self, response):
+        match = re.fullmatch(r'db;dur=\d+\.\d;desc="(\d+) queries", app;dur=\d+\.\d', response["Server-Timing"])
+        self.assertIsNotNone(match, response["Server-Timing"])
+        return int(match.group(1))
+
+    def test_sync_view_reports_its_query_count(self):
+        before = view_query_stats.snapshot().get("get_all_orders_admin", {"requests": 0, "queries": 0})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("get_all_orders_admin"), **auth_headers())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.header_queries(response), len(queries))
+        after = view_query_stats.snapshot()["get_all_orders_admin"]
+        self.assertEqual(
+            (after["requests"], after["queries"]), (before["requests"] + 1, before["queries"] + len(queries))
+        )
+
+    async def test_async_view_counts_each_request_separately(self):
+        for _ in range(2):
+            response = await self.async_client.get(
+                reverse("get_all_products"), headers={"Authorization": auth_headers()["HTTP_AUTHORIZATION"]}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.header_queries(response), 1)
+        self.assertIsNone(_current_recorder.get())
+
+    def test_repeated_sql_is_logged(self):
+        def view(request):
+            Product.objects.count()
+            # The same statement once per item, as an N+1 loop runs it
+            for item_id in range(5):
+                OrderLine.objects.filter(item_id=item_id).exists()
+            return HttpResponse()
+
+        with self.assertLogs("inventory.middleware", "WARNING") as logs:
+            response = QueryTimingMiddleware(view)(RequestFactory().get("/products/"))
+        self.assertEqual(self.header_queries(response), 6)
+        [record] = logs.records
+        self.assertEqual(record.query_count, 6)
+        self.assertEqual([entry["count"] for entry in record.repeated_sql], [5])
+        self.assertIsNone(_current_recorder.get())
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    def record(self, msg="Stock sync failed", level=logging.ERROR, **fields):
+        return logging.makeLogRecord({
+            "name": "inventory.test", "msg": msg, "levelno": level, "levelname": logging.getLevelName(level),
+            **fields,
+        })
+
+    def test_bound_context_and_extra_reach_the_json_output(self):
+        stream = io.StringIO()
+        handler = QueueLogHandler(stream=stream)
+        handler.addFilter(ContextFilter())
+        logger = logging.getLogger("inventory.tests.structured")
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(setattr, logger, "propagate", True)
+        self.addCleanup(logger.removeHandler, handler)
+
+        with bind(order_id=7, started=time.perf_counter()):
+            try:
+                raise ValueError("no stock")
+            except ValueError:
+                logger.exception("Order %s failed", 7, extra={"attempt": 2})
+        logger.warning("Outside the context")
+        handler.close()  # flushes the queue
+
+        first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            (first["level"], first["logger"], first["message"], first["order_id"], first["attempt"]),
+            ("ERROR", "inventory.tests.structured", "Order 7 failed", 7, 2),
+        )
+        self.assertIsInstance(first["duration_ms"], float)
+        self.assertIn("ValueError: no stock", first["exception"])
+        self.assertNotIn("order_id", second)
+
+    def test_rate_limit_suppresses_repeats_until_the_period_ends(self):
+        clock = mock.Mock(monotonic=mock.Mock(return_value=100.0))
+        limit = RateLimitFilter(burst=2, period=60)
+        with mock.patch.object(structured_logging, "time", clock):
+            self.assertEqual([limit.filter(self.record()) for _ in range(4)], [True, True, False, False])
+            # Other messages and records below WARNING have their own budget
+            self.assertTrue(limit.filter(self.record("Other failure")))
+            self.assertTrue(limit.filter(self.record(level=logging.INFO)))
+
+            clock.monotonic.return_value = 160.0
+            record = self.record()
+            self.assertTrue(limit.filter(record))
+            self.assertEqual(record.suppressed, 2)
+
+    def test_full_queue_drops_records_without_blocking(self):
+        stream = io.StringIO()
+        handler = QueueLogHandler(queue_size=2, stream=stream)
+        dropped = log_records_dropped.values.get((), 0)
+        # Without the listener nothing drains the queue
+        with mock.patch.object(handler, "_ensure_listener"):
+            started = time.monotonic()
+            for n in range(5):
+                handler.handle(self.record(f"Record {n}"))
+            self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(log_records_dropped.values[()] - dropped, 3)
+
+        handler._ensure_listener()
+        handler.close()
+        self.assertEqual(
+            [json.loads(line)["message"] for line in stream.getvalue().splitlines()], ["Record 0", "Record 1"]
+        )
+
+
+class SamplingProfilerTests(SimpleTestCase):
+    def setUp(self):
+        self.profiles = RouteProfiles()
+        for target, value in [("route_profiles", self.profiles), ("sampler.rate", 0)]:
+            patcher = mock.patch(f"inventory.profiling.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def view(self, request):
+        sum(range(1000))
+        return HttpResponse()
+
+    def get(self, **headers):
+        return SamplingProfilerMiddleware(self.view)(RequestFactory().get("/products/", headers=headers))
+
+    @override_settings(PROFILING_HEADER_TOKEN=None)
+    def test_removed_from_the_stack_when_not_configured(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            SamplingProfilerMiddleware(self.view)
+
+    @override_settings(PROFILING_HEADER_TOKEN="s3cret")
+    def test_only_the_shared_secret_triggers_profiling(self):
+        with mock.patch("inventory.profiling.cProfile.Profile", wraps=cProfile.Profile) as profile:
+            for headers in [{}, {"X-Profile-Request": ""}, {"X-Profile-Request": "s3cre"},
+                            {"X-Profile-Request": "s3cret "}, {"X-Profile-Request": "s3cr\xe9t"}]:
+                with self.subTest(headers=headers):
+                    self.assertEqual(self.get(**headers).status_code, 200)
+            profile.assert_not_called()
+            self.assertEqual(self.profiles.summary(), {})
+
+            self.get(**{"X-Profile-Request": "s3cret"})
+            profile.assert_called_once()
+        self.assertEqual(self.profiles.summary()["unresolved"]["samples"], 1)
+
+    def test_profiles_are_aggregated_and_dumped_per_route(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiles = RouteProfiles(directory=directory.name, dump_every=2)
+        for _ in range(2):
+            profile = cProfile.Profile()
+            profile.runcall(self.view, None)
+            profiles.add("admin/orders", profile)
+
+        summary = profiles.summary(sort="tottime", limit=50)["admin/orders"]
+        self.assertEqual(summary["samples"], 2)
+        [view] = [f for f in summary["functions"] if f["function"].endswith("(view)")]
+        self.assertEqual(view["calls"], 2)
+        self.assertEqual(len(os.listdir(os.path.join(directory.name, "admin_orders"))), 1)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        beaker = Product.objects.create(name="Beaker 250ml", category="glassware", price="4.50", stock_quantity=3)
+        Product.objects.create(name="Goggles", category="safety", price="7.25", stock_quantity=40)
+        for status, quantity in [("Pending", 1), ("Processed", 2), ("Cancelled", 3)]:
+            order = Order.objects.create(user_id=1, username="alice", status=status)
+            OrderLine.objects.create(
+                order=order, item_id=beaker.id, item_name=beaker.name, item_quantity=quantity, product=beaker,
+            )
+
+    def setUp(self):
+        self.headers = {"Authorization": auth_headers()["HTTP_AUTHORIZATION"]}
+
+    async def export(self, name, **params):
+        response = await self.async_client.get(reverse(name), params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        # Streamed from an async iterator, so Daphne sends each chunk as it is produced
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        return response, body
+
+    async def test_orders_csv_is_filtered_by_status(self):
+        response, body = await self.export("export_orders_csv", status="Pending,Processed")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertRegex(response["Content-Disposition"], r'^attachment; filename="orders-\d{8}-\d{6}\.csv"$')
+        lines = body.splitlines()
+        self.assertTrue(lines[0].startswith("line_id,order_id,user_id,username,"))
+        self.assertEqual([line.split(",")[7] for line in lines[1:]], ["Pending", "Processed"])
+
+    async def test_inventory_ndjson_is_filtered_by_category(self):
+        response, body = await self.export("export_inventory_ndjson", category="safety")
+        self.assertRegex(response["Content-Disposition"], r'filename="inventory-\d{8}-\d{6}\.ndjson"$')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row["name"], row["stock_quantity"]) for row in rows], [("Goggles", 40)])
+
+    async def test_bad_filter_is_rejected(self):
+        response = await self.async_client.get(reverse("export_orders_csv"), {"start": "yesterday"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportProductsTests(TestCase):
+    def run_import(self, text, suffix, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        stderr = io.StringIO()
+        call_command("import_products", f.name, *args, stdout=io.StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_csv_rows_are_upserted_by_name(self):
+        Product.objects.create(name="Beaker 250ml", category="glassware", price="4.50", stock_quantity=3)
+        errors = self.run_import(
+            "name,category,price,stock_quantity\n"
+            "Beaker 250ml,Glassware,5.00,12\n"
+            "Goggles,safety,7.25,40\n"
+            "Pipette,glassware,1.00,3.7\n",
+            ".csv",
+        )
+        self.assertIn("Skipping line 4: stock_quantity must be an integer", errors)
+        self.assertEqual(
+            list(Product.objects.order_by("name").values_list("name", "price", "stock_quantity")),
+            [("Beaker 250ml", Decimal("5.00"), 12), ("Goggles", Decimal("7.25"), 40)],
+        )
+
+    def test_jsonl_rows_update_only_their_own_fields(self):
+        Product.objects.create(name="Goggles", category="safety", price="7.25", stock_quantity=40)
+        errors = self.run_import(
+            '{"name": "Goggles", "stock_quantity": 5}\n'
+            '{"name": 42, "price": 1}\n'
+            '{"name": "Gloves", "category": ["safety"]}\n'
+            '{"name": "Funnel", "category": "glassware", "price": 2.5, "stock_quantity": 3.0}\n',
+            ".jsonl",
+        )
+        self.assertIn("Skipping line 2: name must be a string", errors)
+        self.assertIn("Skipping line 3: category must be a string", errors)
+        goggles = Product.objects.get(name="Goggles")
+        self.assertEqual((goggles.price, goggles.stock_quantity), (Decimal("7.25"), 5))
+        funnel = Product.objects.get(name="Funnel")
+        self.assertEqual((funnel.price, funnel.stock_quantity), (Decimal("2.50"), 3))
+
+    def test_nan_or_blank_price_skips_only_that_row(self):
+        Product.objects.create(name="Beaker 250ml", category="glassware", price="4.50", stock_quantity=3)
+        errors = self.run_import(
+            "name,category,price,stock_quantity\n"
+            "Goggles,safety,NaN,40\n"
+            "Beaker 250ml,glassware,,12\n"
+            "Pipette,glassware,sNaN,3\n"
+            "Funnel,glassware,2.50,3\n",
+            ".csv",
+        )
+        self.assertIn("Skipping line 2: price must be a number", errors)
+        self.assertIn("Skipping line 3: price is required", errors)
+        self.assertIn("Skipping line 4: price must be a number", errors)
+        self.assertEqual(
+            list(Product.objects.order_by("name").values_list("name", "price", "stock_quantity")),
+            [("Beaker 250ml", Decimal("4.50"), 3), ("Funnel", Decimal("2.50"), 3)],
+        )
+
+    def test_strict_aborts_on_an_invalid_row(self):
+        with self.assertRaisesMessage(CommandError, "Line 1: stock_quantity must be an integer"):
+            self.run_import('{"name": "Funnel", "stock_quantity": 3.7}\n', ".jsonl", "--strict")
+        self.assertFalse(Product.objects.exists())
+
+
+class GenerateLoadDataTests(TestCase):
+    def generate(self, **overrides):
+        options = {"products": 20, "users": 5, "orders_per_user": 4, "days": 3, "seed": 7, **overrides}
+        call_command("generate_load_data", clear=True, stdout=io.StringIO(), **options)
+        return list(
+            Order.objects.order_by("id").values_list(
+                "user_id", "status", "created_on", "accepted_at", "processing_started_at", "processed_at"
+            )
+        )
+
+    def test_same_seed_reproduces_the_same_orders(self):
+        first = self.generate()
+        self.assertEqual(len(first), 20)
+        self.assertEqual(self.generate(), first)
+        self.assertTrue(all(row[2].date().isoformat() <= "2025-01-01" for row in first))
+
+    def test_rejects_invalid_options(self):
+        with self.assertRaisesMessage(CommandError, "--orders-per-user must be positive"):
+            self.generate(orders_per_user=0)
+        with self.assertRaisesMessage(CommandError, "--anchor must be a date in YYYY-MM-DD format"):
+            self.generate(anchor="yesterday")
+
+
+class ReportJobTests(TransactionTestCase):
+    # The job runs on the pool's thread, which only sees committed rows
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.jobs = ReportJobs(max_workers=1, result_ttl=60)
+        self.addCleanup(self.jobs.executor.shutdown)
+        self.addCleanup(self.release.set)
+        # Holds the single worker until released, so no job runs (or writes) before the test is ready
+        self.jobs.executor.submit(self.release.wait, 5)
+
+        def build(params):
+            if params:
+                raise RuntimeError("no data")
+            return {"total": 3}
+
+        patcher = mock.patch.dict(REPORTS, {"test": (lambda params: dict(params), build)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        notify = mock.patch("inventory.report_jobs.send_group_event")
+        self.notify = notify.start()
+        self.addCleanup(notify.stop)
+
+    def wait(self, jobs, job_id):
+        # Join the workers rather than polling alongside them: SQLite's shared-cache test database
+        # raises "table is locked" instead of waiting when two threads write at once
+        self.release.set()
+        self.jobs.executor.shutdown(wait=True)
+        return jobs.get(job_id)
+
+    def test_job_is_shared_while_in_flight_and_polled_from_any_process(self):
+        job, created = self.jobs.submit("test")
+        again, created_again = self.jobs.submit("test")
+        self.assertTrue(created)
+        self.assertEqual((again["job_id"], created_again), (job["job_id"], False))
+
+        # Another process's ReportJobs reads the same rows
+        other_process = ReportJobs(max_workers=1, result_ttl=60)
+        self.addCleanup(other_process.executor.shutdown)
+        self.assertEqual(other_process.get(job["job_id"])["status"], "queued")
+        done = self.wait(other_process, job["job_id"])
+        self.assertEqual((done["status"], done["result"]), ("completed", {"total": 3}))
+        self.notify.assert_called_once_with(
+            "admin_orders", "report_ready", {"job_id": job["job_id"], "report": "test", "status": "completed"}
+        )
+        self.assertTrue(other_process.submit("test")[1])
+
+    def test_failed_job_reports_its_error(self):
+        job, _ = self.jobs.submit("test", {"fail": True})
+        done = self.wait(self.jobs, job["job_id"])
+        self.assertEqual((done["status"], done["error"]), ("failed", "no data"))
+        self.assertNotIn("result", done)
+
+    def test_unknown_report_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Unknown report 'nope'"):
+            self.jobs.submit("nope")
+        self.assertIsNone(self.jobs.get("missing"))
+
+    def test_malformed_params_are_rejected(self):
+        for params, message in [
+            ({"limit": None}, "limit must be an integer"),
+            ({"limit": [1]}, "limit must be an integer"),
+            ({"limit": 2.5}, "limit must be an integer"),
+            ({"limit": 0}, "limit must be positive"),
+            ({"days": "30", "horizon": {}}, "horizon must be an integer"),
+        ]:
+            with self.subTest(params=params), self.assertRaisesMessage(ValueError, message):
+                self.jobs.submit("forecast" if "days" in params else "popular", params)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_polling_is_read_only_and_skips_expired_jobs(self):
+        now = time.time()
+        ReportJob.objects.create(
+            job_id="old", report="test", key="test:{}", status="completed", result={}, created_at=now - 120,
+            finished_at=now - 61,
+        )
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.jobs.get("old"))
+        self.assertTrue(ReportJob.objects.filter(job_id="old").exists())
+
+        self.jobs.submit("test")
+        self.assertFalse(ReportJob.objects.filter(job_id="old").exists())
+
+
+class UnixSocketChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "channels.sock")
+
+        # The router gets its own event loop, as it would in its own process
+        loop = asyncio.new_event_loop()
+        router = ChannelRouter(self.path)
+        server = loop.run_until_complete(router.start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        async def shutdown():
+            server.close()
+            router.close()
+            await server.wait_closed()
+
+        def stop():
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self.addCleanup(stop)
+
+    def layer(self, **config):
+        layer = UnixSocketChannelLayer(self.path, **config)
+        self.addCleanup(async_to_sync(layer.close))
+        return layer
+
+    def test_group_send_reaches_other_processes(self):
+        sender = self.layer()
+        receiver = self.layer()
+
+        async def run():
+            local = await sender.new_channel()
+            remote = await receiver.new_channel()
+            await sender.group_add("admin_orders", local)
+            await receiver.group_add("admin_orders", remote)
+            await sender.group_send("admin_orders", {"type": "order_update", "message": {"order_id": 7}})
+            return await asyncio.wait_for(asyncio.gather(sender.receive(local), receiver.receive(remote)), 5)
+
+        expected = {"type": "order_update", "message": {"order_id": 7}}
+        self.assertEqual(async_to_sync(run)(), [expected, expected])
+
+    def test_channels_are_bounded(self):
+        layer = self.layer(capacity=2)
+
+        async def run():
+            channel = await layer.new_channel()
+            await layer.send(channel, {"type": "a"})
+            await layer.send(channel, {"type": "b"})
+            with self.assertRaises(ChannelFull):
+                await layer.send(channel, {"type": "c"})
+            return [(await layer.receive(channel))["type"] for _ in range(2)]
+
+        self.assertEqual(async_to_sync(run)(), ["a", "b"])
+
+
+class StockUpdateTests(SimpleTestCase):
+    def test_changes_are_coalesced_per_product(self):
+        updates = StockUpdates(window=60)
+        with mock.patch('inventory.stock_updates.send_group_event') as send:
+            updates.record(Product(id=1, stock_quantity=9, low_stock_threshold=5))
+            updates.record(Product(id=2, stock_quantity=4, low_stock_threshold=5))
+            updates.record(Product(id=1, stock_quantity=8, low_stock_threshold=5))
+            updates.flush()
+            updates.flush()
+
+        send.assert_called_once()
+        group, event_type, message = send.call_args.args
+        self.assertEqual((group, event_type), ("stock_updates", "stock_update"))
+        self.assertEqual(from_columnar(message), [
+            {"id": 1, "stock_quantity": 8, "low_stock_threshold": 5},
+            {"id": 2, "stock_quantity": 4, "low_stock_threshold": 5},
+        ])
+
+    def test_sockets_subscribe_to_stock_updates(self):
+        from inventory_proj.asgi import application
+        updates = StockUpdates(window=60)
+        token = auth_headers()["HTTP_AUTHORIZATION"].split()[1]
+
+        async def run():
+            stock = WebsocketCommunicator(application, f"/ws/stream/?token={token}&topics=stock")
+            orders = WebsocketCommunicator(application, f"/ws/stream/?token={token}&topics=orders")
+            await stock.connect()
+            await orders.connect()
+            await stock.receive_json_from()  # subscribed
+            await orders.receive_json_from()
+            # Changes left pending by earlier tests would otherwise share this socket's tick
+            await sync_to_async(stock_updates.flush)()
+            await stock.receive_nothing()
+
+            updates.record(Product(id=3, stock_quantity=0, low_stock_threshold=5))
+            await sync_to_async(updates.flush)()
+            frame = await stock.receive_json_from()
+            unsubscribed_got_nothing = await orders.receive_nothing()
+            await stock.disconnect()
+            await orders.disconnect()
+            return frame, unsubscribed_got_nothing
+
+        frame, unsubscribed_got_nothing = async_to_sync(run)()
+        self.assertEqual((frame["topic"], frame["type"]), ("stock", "stock_update"))
+        self.assertEqual(from_columnar(frame["data"]), [{"id": 3, "stock_quantity": 0, "low_stock_threshold": 5}])
+        self.assertTrue(unsubscribed_got_nothing)
+
+    def test_legacy_sockets_are_gone(self):
+        from inventory_proj.asgi import application
+
+        async def run():
+            results = []
+            for path in ("/ws/admin/orders/", "/ws/orders/alice/"):
+                try:
+                    connected, _ = await WebsocketCommunicator(application, path).connect()
+                except ValueError:  # no route
+                    connected = False
+                results.append(connected)
+            return results
+
+        self.assertEqual(async_to_sync(run)(), [False, False])
+
+
+class StreamConsumerTests(SimpleTestCase):
+    def setUp(self):
+        # A fresh log per test, shared by the senders and the consumer
+        self.log = EventLog(size=3)
+        for target in ("inventory.notifications.event_log", "inventory.websocket_consumer.event_log"):
+            patcher = mock.patch(target, self.log)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def stream(self, query):
+        from inventory_proj.asgi import application
+        return WebsocketCommunicator(application, f"/ws/stream/?{query}")
+
+    def token(self):
+        return auth_headers()["HTTP_AUTHORIZATION"].split()[1]
+
+    def test_token_is_required(self):
+        async def run():
+            connected, code = await self.stream("topics=orders").connect()
+            return connected, code
+
+        self.assertEqual(async_to_sync(run)(), (False, 4401))
+
+    def test_topics_follow_subscriptions(self):
+        async def run():
+            stream = self.stream(f"token={self.token()}&topics=orders")
+            await stream.connect()
+            frames = [await stream.receive_json_from()]
+
+            # Another user's orders never reach this socket
+            await sync_to_async(send_order_status)(Order(id=5, user_id=2, username="bob"), "Processing")
+            await sync_to_async(send_order_status)(Order(id=6, user_id=1, username="alice"), "Processing")
+            frames.append(await stream.receive_json_from())
+
+            await stream.send_json_to({"action": "unsubscribe", "topic": "orders"})
+            frames.append(await stream.receive_json_from())
+            await sync_to_async(send_order_status)(Order(id=6, user_id=1, username="alice"), "Processed")
+            frames.append(await stream.receive_nothing())
+
+            await stream.send_json_to({"action": "subscribe", "topic": "everything"})
+            frames.append(await stream.receive_json_from())
+            await stream.disconnect()
+            return frames
+
+        frames = async_to_sync(run)()
+        seq = self.log.replay("orders_user_1")[0] - 1
+        self.assertEqual(frames, [
+            {"type": "subscribed", "topic": "orders", "seq": None},
+            {"topic": "orders", "type": "order_status", "data": {"order_id": 6, "status": "Processing"}, "seq": seq},
+            {"type": "unsubscribed", "topic": "orders"},
+            True,
+            {"type": "error", "error": "Unknown topic: everything"},
+        ])
+
+    def test_reconnect_replays_missed_events(self):
+        def order_status(order_id):
+            send_order_status(Order(id=order_id, user_id=1, username="alice"), "Processed")
+
+        async def reconnect(last_seq):
+            stream = self.stream(f"token={self.token()}&topics=orders&last_seq=orders:{last_seq}")
+            await stream.connect()
+            frames = [await stream.receive_json_from()]
+            while not await stream.receive_nothing():
+                frames.append(await stream.receive_json_from())
+            await stream.disconnect()
+            return frames
+
+        for order_id in (1, 2, 3):
+            order_status(order_id)
+        first = self.log.replay("orders_user_1")[0] - 2
+
+        # Only the two events after `first`
+        self.assertEqual(async_to_sync(reconnect)(first), [
+            {"type": "subscribed", "topic": "orders", "seq": first + 2},
+            {"type": "batch", "events": [
+                {"topic": "orders", "type": "order_status", "data": {"order_id": 2, "status": "Processed"}, "seq": first + 1},
+                {"topic": "orders", "type": "order_status", "data": {"order_id": 3, "status": "Processed"}, "seq": first + 2},
+            ]},
+        ])
+
+        # Once the missed events have left the ring buffer the client is told to fetch a snapshot
+        for order_id in (4, 5):
+            order_status(order_id)
+        self.assertEqual(async_to_sync(reconnect)(first), [
+            {"type": "subscribed", "topic": "orders", "seq": first + 4},
+            {"type": "snapshot_required", "topic": "orders", "seq": first + 4},
+        ])
+
+
+class OutboxTests(SimpleTestCase):
+    def flush(self, policy, high_water, frames):
+        sent, closed = [], []
+
+        async def send(text_data):
+            sent.append(json.loads(text_data))
+
+        async def close(code):
+            closed.append(code)
+
+        async def run():
+            outbox = Outbox(send, close, high_water=high_water, policy=policy, interval=0)
+            # Queued while the writer has not run yet, as behind a slow client
+            for frame in frames:
+                await outbox.put(frame)
+            await asyncio.sleep(0.01)
+            outbox.stop()
+
+        async_to_sync(run)()
+        return sent, closed
+
+    def order(self, order_id, status):
+        return {"topic": "orders", "type": "order_status", "data": {"order_id": order_id, "status": status}}
+
+    def test_coalesce_keeps_newest_event_per_order(self):
+        frames = [
+            self.order(1, "Pending"), self.order(2, "Pending"), self.order(1, "Processing"),
+            self.order(3, "Pending"), self.order(1, "Processed"),
+        ]
+        self.assertEqual(self.flush("coalesce", 3, frames), ([
+            {"type": "batch", "events": [self.order(2, "Pending"), self.order(3, "Pending"), self.order(1, "Processed")]},
+        ], []))
+
+    def test_drop_oldest_asks_for_a_snapshot(self):
+        frames = [self.order(1, "Pending"), self.order(2, "Pending"), self.order(3, "Pending")]
+        self.assertEqual(self.flush("drop_oldest", 2, frames), ([
+            {"type": "batch", "events": [
+                {"type": "snapshot_required", "topic": "orders"}, self.order(2, "Pending"), self.order(3, "Pending"),
+            ]},
+        ], []))
+
+    def test_disconnect_closes_slow_socket(self):
+        frames = [self.order(1, "Pending"), self.order(2, "Pending")]
+        self.assertEqual(self.flush("disconnect", 1, frames), ([], [1013]))
+
+    def test_unacknowledged_frames_hold_back_the_queue(self):
+        sent = []
+
+        async def send(text_data):
+            sent.append(json.loads(text_data))
+
+        async def run():
+            outbox = Outbox(send, None, high_water=2, policy="drop_oldest", interval=0, window=2)
+            # The transport takes every frame at once; only the missing acks show the client is behind
+            for order_id in range(1, 6):
+                await outbox.put(self.order(order_id, "Pending"))
+                await asyncio.sleep(0.01)
+            held = len(sent)
+            outbox.ack(2)
+            await asyncio.sleep(0.01)
+            outbox.stop()
+            return held
+
+        self.assertEqual(async_to_sync(run)(), 2)
+        self.assertEqual(sent[2], {"type": "batch", "events": [
+            {"type": "snapshot_required", "topic": "orders"}, self.order(4, "Pending"), self.order(5, "Pending"),
+        ]})
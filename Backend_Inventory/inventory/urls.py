@@ -1,24 +1,42 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
+    # Read endpoints use the async views in async_views.py, everything else the DRF views in views.py
     # User endpoints
     path('orders/', views.save_order, name='order-list'),
-    path('orders/user/', views.get_user_orders, name='get_user_orders'),
+    path('orders/user/', async_views.get_user_orders, name='get_user_orders'),
     
     # Admin endpoints
+    path('admin/dashboard/', async_views.get_admin_dashboard, name='get_admin_dashboard'),
+    path('admin/low-stock-alerts/', async_views.get_low_stock_alerts, name='get_low_stock_alerts'),
     path('admin/orders/', views.get_all_orders_admin, name='get_all_orders_admin'),
     path('admin/orders/<int:order_id>/accept/', views.accept_order, name='accept_order'),
     path('admin/orders/<int:order_id>/cancel/', views.cancel_order, name='cancel_order'),
 
     # Product endpoints
-    path('products/search/', views.searchList, name='search_products'),
-    path('products/', views.get_all_products, name='get_all_products'),
-    path('products/low-stock/', views.get_low_stock_products, name='get_low_stock_products'),
+    path('products/search/', async_views.searchList, name='search_products'),
+    path('products/', async_views.get_all_products, name='get_all_products'),
+    path('products/low-stock/', async_views.get_low_stock_products, name='get_low_stock_products'),
     path('products/<int:product_id>/stock/', views.update_stock, name='update_stock'),
 
     # Analytics endpoints (NEW)
-    path('admin/analytics/sales/', views.get_sales_analytics, name='get_sales_analytics'),
-    path('admin/analytics/popular/', views.get_popular_products, name='get_popular_products'),
-    path('admin/inventory/stock/', views.get_stock_inventory, name='get_stock_inventory'),
+    path('admin/analytics/sales/', async_views.get_sales_analytics, name='get_sales_analytics'),
+    path('admin/analytics/popular/', async_views.get_popular_products, name='get_popular_products'),
+    path('admin/analytics/latency/', async_views.get_latency_analytics, name='get_latency_analytics'),
+    path('admin/inventory/stock/', async_views.get_stock_inventory, name='get_stock_inventory'),
+
+    # Streaming exports
+    path('admin/export/orders.csv', views.export_orders, {'export_format': 'csv'}, name='export_orders_csv'),
+    path('admin/export/orders.ndjson', views.export_orders, {'export_format': 'ndjson'}, name='export_orders_ndjson'),
+    path('admin/export/inventory.csv', views.export_inventory, {'export_format': 'csv'}, name='export_inventory_csv'),
+    path('admin/export/inventory.ndjson', views.export_inventory, {'export_format': 'ndjson'}, name='export_inventory_ndjson'),
+
+    # Background report jobs
+    path('admin/reports/', views.create_report_job, name='create_report_job'),
+    path('admin/reports/<str:job_id>/', views.get_report_job, name='get_report_job'),
+
+    # Diagnostics
+    path('admin/metrics/queries/', views.get_query_metrics, name='get_query_metrics'),
+    path('admin/profiles/', views.get_profiles, name='get_profiles'),
 ]
@@ -1,91 +1,31 @@
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+import logging
+
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from rest_framework.response import Response
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import transaction
+from django.utils import timezone
 
-from inventory.authentication import JWTAuthenticationWithoutUserDB
-from .serializers import OrderSerializer, OrderItemSerializer, ProductSearchSerializer, LowStockProductSerializer
+from inventory.authentication import JWTAuthenticationWithoutUserDB, IsAdminToken
+from .serializers import OrderSerializer
+from .renderers import COLUMNAR_RENDERER_CLASSES
+from .rows import ORDER_LIST_FIELDS, ORDER_LINE_FIELDS, order_lines, group_lines, order_rows, order_columns
 from .order_queue import order_queue
+from .report_jobs import report_jobs
+from .dashboard import dashboard_snapshots
+from .stock_updates import stock_updates
+from .low_stock import check_low_stock, send_low_stock_alerts
+from .exports import aiter_body, orders_export_stream, inventory_export_stream
+from .middleware import view_query_stats
+from .metrics import registry
+from .profiling import route_profiles
 
 from .models import Order, Product
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-
-
-@api_view(["GET"])
-@authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def searchList(request):
-    """Search for products in the inventory database"""
-    value = request.GET.get('search', '').strip()
-    
-    if not value:
-        return Response(data={"message": []}, status=status.HTTP_200_OK)
-    
-    # Search products by name (case-insensitive, starts with)
-    products = Product.objects.filter(
-        name__istartswith=value,
-        stock_quantity__gt=0  # Only show in-stock items
-    )[:10]  # Limit to 10 results
-    
-    # Format response to match frontend expectations
-    matches = []
-    for product in products:
-        matches.append({
-            "id": product.id,
-            "name": product.name,
-            "price": float(product.price),
-            "stock": product.stock_quantity,
-            "category": product.category
-        })
-    
-    return Response(data={"message": matches}, status=status.HTTP_200_OK)
-
-
-@api_view(["GET"])
-@authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def get_all_products(request):
-    """Get all products in inventory"""
-    try:
-        products = Product.objects.all()
-        serializer = ProductSearchSerializer(products, many=True)
-        return Response(data={"products": serializer.data}, status=status.HTTP_200_OK)
-    except Exception as e:
-        print(f"Error fetching products: {str(e)}")
-        return Response(
-            data={"error": "Failed to fetch products"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+from .notifications import send_group_event, send_order_status
 
-
-@api_view(["GET"])
-@authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def get_low_stock_products(request):
-    """Get products that are low on stock - for admin alerts"""
-    try:
-        # Get products where stock_quantity <= low_stock_threshold
-        low_stock = []
-        products = Product.objects.all()
-        for product in products:
-            if product.is_low_stock:
-                low_stock.append({
-                    "id": product.id,
-                    "name": product.name,
-                    "category": product.category,
-                    "stock_quantity": product.stock_quantity,
-                    "low_stock_threshold": product.low_stock_threshold,
-                    "is_out_of_stock": product.is_out_of_stock
-                })
-        
-        return Response(data={"low_stock_products": low_stock}, status=status.HTTP_200_OK)
-    except Exception as e:
-        print(f"Error fetching low stock products: {str(e)}")
-        return Response(
-            data={"error": "Failed to fetch low stock products"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+logger = logging.getLogger(__name__)
 
 
 @api_view(["POST"])
@@ -93,49 +33,29 @@ def get_low_stock_products(request):
 @permission_classes([IsAuthenticated])
 def save_order(request):
     """Create a new order"""
-    username = request.headers.get("X-Username")
-    
-    # Handle list of orders
+    # Handle the list of cart items, owned by the user named in the token
     orderSerialiser = OrderSerializer(
         data=request.data,
         many=True,
-        context={'user_id': request.user.id, 'username': username}
+        context={'user_id': request.user.id, 'username': request.user.username}
     )
     
     if orderSerialiser.is_valid():
-        orders = orderSerialiser.save()
+        # The whole cart becomes one order
+        order = orderSerialiser.save()
         
         # Notify user via WebSocket that order is pending
-        channel_layer = get_channel_layer()
-        for order in orders:
-            if channel_layer:
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{username}",
-                    {
-                        "type": "order_status",
-                        "message": {
-                            "order_id": order.id,
-                            "status": "Pending",
-                            "item_name": order.item_name
-                        }
-                    }
-                )
-            
-            # Notify admin portal of new order
-            async_to_sync(channel_layer.group_send)(
-                "admin_orders",
-                {
-                    "type": "order_update",
-                    "message": {
-                        "order_id": order.id,
-                        "action": "new_order",
-                        "status": "Pending"
-                    }
-                }
-            )
+        send_order_status(order, "Pending")
+        
+        # Notify admin portal of new order
+        send_group_event("admin_orders", "order_update", {
+            "order_id": order.id,
+            "action": "new_order",
+            "status": "Pending"
+        })
 
         return Response(
-            data={"message": "Order Created"}, 
+            data={"message": "Order Created", "order_id": order.id}, 
             status=status.HTTP_201_CREATED
         )
     
@@ -145,36 +65,21 @@ def save_order(request):
     )
 
 
-@api_view(["GET"])
-@authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def get_user_orders(request):
-    """Get orders for the current user"""
-    try:
-        username = request.headers.get("X-Username")
-        orders = Order.objects.filter(username=username).order_by('-created_on')
-        orderSerialiser = OrderItemSerializer(orders, many=True)
-        return Response(data={"orders": orderSerialiser.data}, status=status.HTTP_200_OK)
-    except Exception as e:
-        print(f"Error fetching orders: {str(e)}")
-        return Response(
-            data={"error": "Failed to fetch orders"}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-
 # Admin Views
 @api_view(["GET"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdminToken])
+@renderer_classes(COLUMNAR_RENDERER_CLASSES)
 def get_all_orders_admin(request):
-    """Get all orders for admin portal"""
+    """Get all orders for admin portal, ?format=columnar for the compact form"""
     try:
         orders = Order.objects.all().order_by('-created_on')
-        orderSerialiser = OrderItemSerializer(orders, many=True)
-        return Response(data={"orders": orderSerialiser.data}, status=status.HTTP_200_OK)
-    except Exception as e:
-        print(f"Error fetching admin orders: {str(e)}")
+        lines = group_lines(order_lines(orders).values_list(*ORDER_LINE_FIELDS))
+        if request.accepted_renderer.format == 'columnar':
+            return Response(data={"orders": order_columns(orders.values_list(*ORDER_LIST_FIELDS), lines)}, status=status.HTTP_200_OK)
+        return Response(data={"orders": order_rows(orders.values_list(*ORDER_LIST_FIELDS), lines)}, status=status.HTTP_200_OK)
+    except Exception:
+        logger.exception("Error fetching admin orders")
         return Response(
             data={"error": "Failed to fetch orders"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -183,89 +88,70 @@ def get_all_orders_admin(request):
 
 @api_view(["POST"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdminToken])
 def accept_order(request, order_id):
-    """Accept an order, decrement stock, and add to processing queue"""
+    """Accept an order, reserve stock for all of its lines, and add it to the processing queue"""
     try:
-        order = Order.objects.get(id=order_id)
-        
-        if order.status != "Pending":
-            return Response(
-                data={"error": "Only pending orders can be accepted"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Decrement stock if product is linked
-        low_stock_alert = None
-        if order.product:
-            product = order.product
-            if product.stock_quantity >= order.item_quantity:
-                product.stock_quantity -= order.item_quantity
-                product.save()
-                
-                # Check if stock is now low
-                if product.is_low_stock:
-                    low_stock_alert = {
-                        "product_id": product.id,
-                        "product_name": product.name,
-                        "remaining_stock": product.stock_quantity,
-                        "threshold": product.low_stock_threshold
-                    }
-            else:
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(id=order_id)
+            
+            if order.status != "Pending":
                 return Response(
-                    data={"error": f"Insufficient stock. Only {product.stock_quantity} available."}, 
+                    data={"error": "Only pending orders can be accepted"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-        
-        # Update status to Processing
-        order.status = "Processing"
-        order.save()
+            
+            # Quantity needed per linked product, across all lines
+            needed = {}
+            for product_id, quantity in order.lines.filter(product__isnull=False).values_list('product_id', 'item_quantity'):
+                needed[product_id] = needed.get(product_id, 0) + quantity
+            
+            # Lock in id order so concurrent accepts can't deadlock; reserve all lines or none
+            products = list(Product.objects.select_for_update().filter(id__in=needed).order_by('id'))
+            for product in products:
+                if product.stock_quantity < needed[product.id]:
+                    return Response(
+                        data={"error": f"Insufficient stock for {product.name}. Only {product.stock_quantity} available."}, 
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            
+            low_stock_alerts = []
+            for product in products:
+                product.stock_quantity -= needed[product.id]
+                
+                # Alert once when stock crosses the threshold, not on every order after
+                low_stock_alert = check_low_stock(product)
+                if low_stock_alert:
+                    low_stock_alerts.append(low_stock_alert)
+                product.save()
+            
+            # Update status to Processing
+            order.status = "Processing"
+            order.accepted_at = timezone.now()
+            order.save()
+        dashboard_snapshots.invalidate()
+        for product in products:
+            stock_updates.record(product)
         
         # Add to processing queue
         order_queue.put(order.id)
         
-        # Notify via WebSocket
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            # Notify user
-            async_to_sync(channel_layer.group_send)(
-                f"user_{order.username}",
-                {
-                    "type": "order_status",
-                    "message": {
-                        "order_id": order.id,
-                        "status": "Processing",
-                        "item_name": order.item_name
-                    }
-                }
-            )
-            
-            # Notify admin portal
-            async_to_sync(channel_layer.group_send)(
-                "admin_orders",
-                {
-                    "type": "order_update",
-                    "message": {
-                        "order_id": order.id,
-                        "action": "accepted",
-                        "status": "Processing"
-                    }
-                }
-            )
-            
-            # Send low stock alert if applicable
-            if low_stock_alert:
-                async_to_sync(channel_layer.group_send)(
-                    "admin_orders",
-                    {
-                        "type": "low_stock_alert",
-                        "message": low_stock_alert
-                    }
-                )
+        # Notify user via WebSocket
+        send_order_status(order, "Processing")
+        
+        # Notify admin portal
+        send_group_event("admin_orders", "order_update", {
+            "order_id": order.id,
+            "action": "accepted",
+            "status": "Processing"
+        })
+        
+        # Send low stock alerts if applicable
+        send_low_stock_alerts(low_stock_alerts)
         
         response_data = {"message": "Order accepted and added to processing queue"}
-        if low_stock_alert:
-            response_data["low_stock_alert"] = low_stock_alert
+        if low_stock_alerts:
+            response_data["low_stock_alerts"] = low_stock_alerts
         
         return Response(data=response_data, status=status.HTTP_200_OK)
         
@@ -274,8 +160,8 @@ def accept_order(request, order_id):
             data={"error": "Order not found"}, 
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        print(f"Error accepting order: {str(e)}")
+    except Exception:
+        logger.exception("Error accepting order", extra={"order_id": order_id})
         return Response(
             data={"error": "Failed to accept order"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -284,7 +170,7 @@ def accept_order(request, order_id):
 
 @api_view(["POST"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdminToken])
 def cancel_order(request, order_id):
     """Cancel an order"""
     try:
@@ -298,35 +184,19 @@ def cancel_order(request, order_id):
         
         # Update status to Cancelled
         order.status = "Cancelled"
+        order.cancelled_at = timezone.now()
         order.save()
+        dashboard_snapshots.invalidate()
         
         # Notify user via WebSocket
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            async_to_sync(channel_layer.group_send)(
-                f"user_{order.username}",
-                {
-                    "type": "order_status",
-                    "message": {
-                        "order_id": order.id,
-                        "status": "Cancelled",
-                        "item_name": order.item_name
-                    }
-                }
-            )
-            
-            # Notify admin portal
-            async_to_sync(channel_layer.group_send)(
-                "admin_orders",
-                {
-                    "type": "order_update",
-                    "message": {
-                        "order_id": order.id,
-                        "action": "cancelled",
-                        "status": "Cancelled"
-                    }
-                }
-            )
+        send_order_status(order, "Cancelled")
+        
+        # Notify admin portal
+        send_group_event("admin_orders", "order_update", {
+            "order_id": order.id,
+            "action": "cancelled",
+            "status": "Cancelled"
+        })
         
         return Response(
             data={"message": "Order cancelled successfully"}, 
@@ -338,8 +208,8 @@ def cancel_order(request, order_id):
             data={"error": "Order not found"}, 
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        print(f"Error cancelling order: {str(e)}")
+    except Exception:
+        logger.exception("Error cancelling order", extra={"order_id": order_id})
         return Response(
             data={"error": "Failed to cancel order"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -348,11 +218,10 @@ def cancel_order(request, order_id):
 
 @api_view(["POST"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated, IsAdminToken])
 def update_stock(request, product_id):
     """Update stock quantity for a product (admin only)"""
     try:
-        product = Product.objects.get(id=product_id)
         new_quantity = request.data.get('stock_quantity')
         
         if new_quantity is None:
@@ -361,8 +230,16 @@ def update_stock(request, product_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        product.stock_quantity = int(new_quantity)
-        product.save()
+        # Locked so the alert state changes with the stock it was decided on
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(id=product_id)
+            product.stock_quantity = int(new_quantity)
+            low_stock_alert = check_low_stock(product)
+            product.save()
+        dashboard_snapshots.invalidate()
+        stock_updates.record(product)
+        if low_stock_alert:
+            send_low_stock_alerts([low_stock_alert])
         
         return Response(
             data={"message": f"Stock updated to {product.stock_quantity}"},
@@ -374,127 +251,112 @@ def update_stock(request, product_id):
             data={"error": "Product not found"},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        print(f"Error updating stock: {str(e)}")
+    except Exception:
+        logger.exception("Error updating stock", extra={"product_id": product_id})
         return Response(
             data={"error": "Failed to update stock"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+# Export Views
+def _export_response(build_stream, request, name, export_format):
+    try:
+        body, content_type = build_stream(request.GET, export_format)
+    except ValueError as e:
+        return Response(data={"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response = StreamingHttpResponse(aiter_body(body), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
 
-# Analytics Views
 @api_view(["GET"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def get_sales_analytics(request):
-    """Get sales analytics - orders by product"""
-    try:
-        from django.db.models import Sum, Count
-        
-        # Get completed orders grouped by product
-        completed_orders = Order.objects.filter(status="Processed")
-        
-        # Aggregate by item_name
-        sales_by_product = completed_orders.values('item_name').annotate(
-            total_quantity=Sum('item_quantity'),
-            order_count=Count('id')
-        ).order_by('-total_quantity')
-        
-        sales_data = []
-        for item in sales_by_product:
-            sales_data.append({
-                "product": item['item_name'],
-                "total_quantity": item['total_quantity'] or 0,
-                "order_count": item['order_count'] or 0
-            })
-        
-        return Response(data={
-            "sales_by_product": sales_data,
-            "total_orders": completed_orders.count(),
-            "total_items_sold": completed_orders.aggregate(total=Sum('item_quantity'))['total'] or 0
-        }, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        print(f"Error fetching sales analytics: {str(e)}")
+@permission_classes([IsAuthenticated, IsAdminToken])
+def export_orders(request, export_format):
+    """Stream the full order history as CSV or NDJSON, filtered by ?start=&end=&status="""
+    return _export_response(orders_export_stream, request, "orders", export_format)
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+def export_inventory(request, export_format):
+    """Stream the product inventory as CSV or NDJSON, filtered by ?category="""
+    return _export_response(inventory_export_stream, request, "inventory", export_format)
+
+
+# Report Job Views
+@api_view(["POST"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+def create_report_job(request):
+    """Queue a heavy report (sales, popular, forecast, exports) to run in the background"""
+    report = request.data.get('report')
+    params = request.data.get('params') or {}
+    
+    if not isinstance(params, dict):
         return Response(
-            data={"error": "Failed to fetch sales analytics"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            data={"error": "params must be an object"},
+            status=status.HTTP_400_BAD_REQUEST
         )
+    
+    try:
+        job, created = report_jobs.submit(report, params)
+    except ValueError as e:
+        return Response(data={"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Completion is pushed to the admin_orders WebSocket group as a report_ready event
+    return Response(
+        data={"job_id": job["job_id"], "status": job["status"], "created": created},
+        status=status.HTTP_202_ACCEPTED
+    )
 
 
 @api_view(["GET"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def get_popular_products(request):
-    """Get most popular products based on order count or quantity"""
-    try:
-        from django.db.models import Sum, Count
-        
-        limit = int(request.GET.get('limit', 10))
-        sort_by = request.GET.get('sort_by', 'orders')  # 'orders' or 'quantity'
-        
-        # Get completed orders grouped by product
-        completed_orders = Order.objects.filter(status="Processed")
-        
-        # Aggregate by item_name
-        if sort_by == 'quantity':
-            popular = completed_orders.values('item_name').annotate(
-                total_quantity=Sum('item_quantity'),
-                order_count=Count('id')
-            ).order_by('-total_quantity')[:limit]
-        else:
-            popular = completed_orders.values('item_name').annotate(
-                total_quantity=Sum('item_quantity'),
-                order_count=Count('id')
-            ).order_by('-order_count')[:limit]
-        
-        popular_products = []
-        for idx, item in enumerate(popular):
-            popular_products.append({
-                "rank": idx + 1,
-                "product": item['item_name'],
-                "total_quantity": item['total_quantity'] or 0,
-                "order_count": item['order_count'] or 0
-            })
-        
-        return Response(data={"popular_products": popular_products}, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        print(f"Error fetching popular products: {str(e)}")
+@permission_classes([IsAuthenticated, IsAdminToken])
+def get_report_job(request, job_id):
+    """Get the status of a report job, including its result once completed"""
+    job = report_jobs.get(job_id)
+    
+    if job is None:
         return Response(
-            data={"error": "Failed to fetch popular products"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            data={"error": "Report job not found or expired"},
+            status=status.HTTP_404_NOT_FOUND
         )
+    
+    return Response(data=job, status=status.HTTP_200_OK)
 
 
+# Diagnostics Views
 @api_view(["GET"])
 @authentication_classes([JWTAuthenticationWithoutUserDB])
-@permission_classes([IsAuthenticated])
-def get_stock_inventory(request):
-    """Get full stock inventory with all product details"""
+@permission_classes([IsAuthenticated, IsAdminToken])
+def get_query_metrics(request):
+    """Per-view query counts and database/app time recorded by QueryTimingMiddleware"""
+    return Response(data={"views": view_query_stats.snapshot()}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@authentication_classes([JWTAuthenticationWithoutUserDB])
+@permission_classes([IsAuthenticated, IsAdminToken])
+def get_profiles(request):
+    """Top functions per route from sampled profiles, ?route=&sort=cumtime|tottime&limit="""
     try:
-        products = Product.objects.all().order_by('category', 'name')
-        
-        inventory = []
-        for product in products:
-            inventory.append({
-                "id": product.id,
-                "name": product.name,
-                "description": product.description,
-                "category": product.category,
-                "price": float(product.price),
-                "stock_quantity": product.stock_quantity,
-                "low_stock_threshold": product.low_stock_threshold,
-                "is_low_stock": product.is_low_stock,
-                "is_out_of_stock": product.is_out_of_stock
-            })
-        
-        return Response(data={"inventory": inventory}, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        print(f"Error fetching stock inventory: {str(e)}")
-        return Response(
-            data={"error": "Failed to fetch stock inventory"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        return Response(data={"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    sort = request.GET.get('sort', 'cumtime')
+    if sort not in ('cumtime', 'tottime'):
+        return Response(data={"error": "sort must be cumtime or tottime"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    profiles = route_profiles.summary(route=request.GET.get('route'), sort=sort, limit=limit)
+    return Response(data={"profiles": profiles}, status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint covering every worker process"""
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
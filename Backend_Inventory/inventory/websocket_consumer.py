@@ -1,74 +1,207 @@
 import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from rest_framework import exceptions
 
-class OrderStatusConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer for user order status updates"""
-    async def connect(self):
-        self.username = self.scope['url_route']['kwargs'].get('username')
-        self.room_group_name = f'user_{self.username}'
+from inventory.authentication import authenticate_token
+from .event_log import event_log, event_log_replays
+from .metrics import websocket_connections
+from .notifications import LOW_STOCK_ALERTS_GROUP, is_logged_group, user_orders_group
+from .outbox import Outbox, encode_frames
+from .stock_updates import STOCK_UPDATES_GROUP
 
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+OUTBOX_OPTIONS = {
+    "high_water": getattr(settings, "WEBSOCKET_OUTBOX_HIGH_WATER", 100),
+    "policy": getattr(settings, "WEBSOCKET_OUTBOX_POLICY", "coalesce"),
+    "interval": getattr(settings, "WEBSOCKET_BATCH_INTERVAL", 0.02),
+}
+ACK_WINDOW = getattr(settings, "WEBSOCKET_ACK_WINDOW", 8)
 
-        await self.accept()
 
-    async def disconnect(self, close_code):
-        # Leave room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+class OutboxMixin:
+    """Events reach the socket through a per-connection Outbox, batched and bounded"""
+    outbox = None
+    ack_window = 0  # frames the client may leave unacknowledged, 0 for clients that don't ack
 
-    # Receive message from room group
-    async def order_status(self, event):
-        message = event['message']
+    def get_outbox(self):
+        if self.outbox is None:
+            self.outbox = Outbox(self.send, self.close, window=self.ack_window, **OUTBOX_OPTIONS)
+        return self.outbox
 
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'order_status',
-            'data': message
-        }))
+    async def send_event(self, frame):
+        await self.get_outbox().put(frame)
 
+    async def reply(self, frame):
+        """Send a reply (or a replay) now, ahead of queued events"""
+        await self.get_outbox().send_now(frame if isinstance(frame, str) else json.dumps(frame))
 
-class AdminOrderConsumer(AsyncWebsocketConsumer):
-    """WebSocket consumer for admin order updates"""
-    async def connect(self):
-        self.room_group_name = 'admin_orders'
+    def stop_outbox(self):
+        if self.outbox is not None:
+            self.outbox.stop()
+
+
+# Topics only tokens with the is_admin claim may subscribe to
+ADMIN_TOPICS = ("admin_orders", "low_stock")
+
+
+def topic_groups(user):
+    """The group behind each topic a ws/stream/ client can subscribe to"""
+    return {
+        "orders": user_orders_group(user.id),
+        "admin_orders": "admin_orders",
+        "stock": STOCK_UPDATES_GROUP,
+        "low_stock": LOW_STOCK_ALERTS_GROUP,
+    }
+
+
+class StreamConsumer(OutboxMixin, AsyncWebsocketConsumer):
+    """
+    One authenticated socket for every topic. The JWT (?token=<jwt>, since browsers cannot set
+    headers on a WebSocket, or an Authorization header) is checked once at connect. Topics are
+    subscribed with ?topics=orders,stock or later with {"action": "subscribe", "topic": "orders"}
+    (and "unsubscribe"). Events arrive as {"topic", "type", "data"}.
+
+    Events of the order and low-stock topics also carry a per-topic "seq". A client reconnecting
+    with ?last_seq=orders:41,admin_orders:7 (or "last_seq" in a subscribe request) is first sent
+    the events it missed, or {"type": "snapshot_required", "topic"} when they are no longer held.
 
-        # Join admin room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+    A client connecting with ?ack=1 sends {"action": "ack", "frames": n} with the number of
+    frames it has processed; past ACK_WINDOW unacknowledged frames its events are queued, and
+    the outbox policy applies once it falls behind (see Outbox).
+    """
+    user = None
 
+    async def connect(self):
+        self.topics = {}  # topic -> group
+        self.replayed = {}  # topic -> seq up to which events were sent at subscribe
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        token = query.get("token", [None])[0]
+        authorization = f"Bearer {token}" if token else dict(self.scope["headers"]).get(b"authorization", b"").decode()
+        try:
+            user_auth = authenticate_token(authorization)
+        except exceptions.AuthenticationFailed:
+            user_auth = None
+        if user_auth is None:
+            # Closing before accept rejects the handshake with 403
+            await self.close(code=4401)
+            return
+
+        self.user = user_auth[0]
+        if query.get("ack", [""])[0] == "1":
+            self.ack_window = ACK_WINDOW
         await self.accept()
+        websocket_connections.inc(consumer="StreamConsumer")
+        last_seqs = {}
+        for position in query.get("last_seq", [""])[0].split(","):
+            topic, _, seq = position.partition(":")
+            if seq.isdigit():
+                last_seqs[topic] = int(seq)
+        for topic in query.get("topics", [""])[0].split(","):
+            if topic:
+                await self.subscribe(topic, last_seqs.get(topic))
 
     async def disconnect(self, close_code):
-        # Leave admin room group
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        if self.user is None:
+            return
+        websocket_connections.dec(consumer="StreamConsumer")
+        self.stop_outbox()
+        for group in self.topics.values():
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            request = json.loads(text_data or "")
+        except ValueError:
+            request = None
+        if isinstance(request, dict) and request.get("action") == "ack":
+            self.get_outbox().ack(request.get("frames"))
+            return
+        if not isinstance(request, dict) or request.get("action") not in ("subscribe", "unsubscribe"):
+            await self.reply({
+                "type": "error",
+                "error": 'Expected {"action": "subscribe", "unsubscribe" or "ack", ...}'
+            })
+            return
+
+        if request["action"] == "subscribe":
+            last_seq = request.get("last_seq")
+            await self.subscribe(request.get("topic"), last_seq if isinstance(last_seq, int) else None)
+        else:
+            await self.unsubscribe(request.get("topic"))
+
+    async def subscribe(self, topic, last_seq=None):
+        group = topic_groups(self.user).get(topic)
+        if group is None:
+            await self.reply({"type": "error", "error": f"Unknown topic: {topic}"})
+            return
+        if topic in ADMIN_TOPICS and not self.user.is_admin:
+            await self.reply({"type": "error", "error": f"Admin only topic: {topic}"})
+            return
+        if topic in self.topics:
+            await self.reply({"type": "subscribed", "topic": topic})
+            return
+        # Join before reading the log, so no event falls between the two
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.topics[topic] = group
+        if not is_logged_group(group):
+            await self.reply({"type": "subscribed", "topic": topic})
+            return
+
+        latest, missed = await sync_to_async(event_log.replay)(group, last_seq)
+        await self.reply({"type": "subscribed", "topic": topic, "seq": latest})
+        if missed is None:
+            event_log_replays.inc(result="snapshot")
+            await self.reply({"type": "snapshot_required", "topic": topic, "seq": latest})
+        else:
+            if last_seq is not None:
+                event_log_replays.inc(result="replayed")
+            if missed:
+                await self.reply(encode_frames([
+                    {'topic': topic, 'type': event_type, 'data': message, 'seq': seq}
+                    for seq, event_type, message in missed
+                ]))
+        # Live events up to here were already covered by the replay (or precede the subscription)
+        self.replayed[topic] = latest
+
+    async def unsubscribe(self, topic):
+        self.replayed.pop(topic, None)
+        group = self.topics.pop(topic, None)
+        if group is not None:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.reply({"type": "unsubscribed", "topic": topic})
+
+    async def forward(self, topic, event):
+        # An event already on its way when the topic was unsubscribed is dropped here
+        if topic not in self.topics:
+            return
+        frame = {
+            'topic': topic,
+            'type': event['type'],
+            'data': event['message']
+        }
+        if 'seq' in event:
+            replayed = self.replayed.get(topic)
+            if replayed is not None and event['seq'] <= replayed:
+                return
+            frame['seq'] = event['seq']
+        await self.send_event(frame)
+
+    # Receive messages from the subscribed groups
+
+    async def order_status(self, event):
+        await self.forward("orders", event)
 
-    # Receive message from room group
     async def order_update(self, event):
-        message = event['message']
+        await self.forward("admin_orders", event)
 
-        # Send message to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'order_update',
-            'data': message
-        }))
+    async def report_ready(self, event):
+        await self.forward("admin_orders", event)
 
-    # Handle low stock alerts
-    async def low_stock_alert(self, event):
-        message = event['message']
+    async def stock_update(self, event):
+        await self.forward("stock", event)
 
-        # Send low stock alert to WebSocket
-        await self.send(text_data=json.dumps({
-            'type': 'low_stock_alert',
-            'data': message
-        }))
+    async def low_stock_alert(self, event):
+        await self.forward("low_stock", event)
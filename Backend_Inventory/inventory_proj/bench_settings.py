@@ -0,0 +1,25 @@
+"""
+Settings for running the benchmark suite offline:
+
+    python manage.py run_benchmarks --settings=inventory_proj.bench_settings
+
+Uses a throwaway SQLite database and does not start the background order consumer.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('INVENTORY_BENCH_DB', BASE_DIR / 'bench.sqlite3'),
+    }
+}
+
+# The benchmark drives the order consumer itself
+START_ORDER_CONSUMER = False
+
+# run_benchmarks flushes data, so it refuses to run unless this is set
+BENCHMARK_DATABASE = True
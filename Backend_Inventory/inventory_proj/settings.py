@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,7 +60,6 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
-    "X-Username"
 ]
 
 # Application definition
@@ -80,6 +80,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'inventory.middleware.LogContextMiddleware',
+    'inventory.middleware.RequestMetricsMiddleware',
+    'inventory.middleware.QueryTimingMiddleware',
+    'inventory.profiling.SamplingProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -110,12 +114,107 @@ WSGI_APPLICATION = 'inventory_proj.wsgi.application'
 
 ASGI_APPLICATION = 'inventory_proj.asgi.application'
 
+# Several Daphne processes on one host: start `python manage.py run_channel_router` and point
+# INVENTORY_CHANNEL_SOCKET at its socket so a group_send reaches WebSockets held by any process.
+# Without it the layer serves this process only.
+CHANNEL_SOCKET = os.environ.get('INVENTORY_CHANNEL_SOCKET')
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'inventory.channel_layer.UnixSocketChannelLayer',
+        'CONFIG': {
+            'path': CHANNEL_SOCKET,
+            'capacity': 100,  # messages buffered per channel
+            'expiry': 60,  # seconds an unread message is kept
+            'group_expiry': 86400,
+        },
     }
 }
 
+# Log a warning when one SQL statement runs this many times in a request (likely N+1)
+QUERY_REPEAT_THRESHOLD = 5
+
+# /metrics: with several worker processes, point METRICS_DIR at a directory they all share
+# (cleared before start-up) so each process's counters are merged into one scrape.
+METRICS_DIR = os.environ.get('INVENTORY_METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0  # seconds
+
+# Sampling profiler: profile 1 in N requests and consumed orders (0 = off), or requests sending
+# the header X-Profile-Request: <PROFILING_HEADER_TOKEN>. Aggregated profiles per route are
+# written to PROFILING_DIR and summarised by admin/profiles/.
+PROFILING_SAMPLE_RATE = int(os.environ.get('INVENTORY_PROFILE_SAMPLE_RATE', 0))
+PROFILING_HEADER_TOKEN = os.environ.get('INVENTORY_PROFILE_TOKEN')
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_DUMP_EVERY = 20  # write a route's aggregate after this many new samples
+PROFILING_MAX_FILES = 10  # newest profile files kept per route
+
+# Logging: inventory loggers emit JSON lines through a bounded queue drained by a background
+# thread, so log I/O never blocks a request or the order consumer. Identical warnings and
+# errors are limited to LOG_RATE_LIMIT_BURST per LOG_RATE_LIMIT_PERIOD seconds.
+LOG_LEVEL = os.environ.get('INVENTORY_LOG_LEVEL', 'INFO')
+LOG_QUEUE_SIZE = 10000
+LOG_RATE_LIMIT_BURST = 5
+LOG_RATE_LIMIT_PERIOD = 60  # seconds
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'context': {'()': 'inventory.structured_logging.ContextFilter'},
+        'rate_limit': {
+            '()': 'inventory.structured_logging.RateLimitFilter',
+            'burst': LOG_RATE_LIMIT_BURST,
+            'period': LOG_RATE_LIMIT_PERIOD,
+        },
+    },
+    'handlers': {
+        'queue': {
+            'class': 'inventory.structured_logging.QueueLogHandler',
+            'queue_size': LOG_QUEUE_SIZE,
+            'filters': ['context', 'rate_limit'],
+        },
+    },
+    'loggers': {
+        'inventory': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
+# Background report jobs (admin/reports/), run on a thread pool per process and kept in the
+# database, so any process can answer a poll
+REPORT_JOB_WORKERS = 2
+REPORT_RESULT_TTL = 600  # seconds a finished report is kept
+
+# Admin dashboard snapshot (admin/dashboard/), shared by every admin for DASHBOARD_SNAPSHOT_TTL seconds
+DASHBOARD_SNAPSHOT_TTL = 5
+DASHBOARD_PAGE_SIZE = 50  # newest orders returned per status
+
+# A product's low-stock alert fires once when stock falls to low_stock_threshold, and re-arms only
+# after a restock above low_stock_threshold + LOW_STOCK_REARM_MARGIN
+LOW_STOCK_REARM_MARGIN = 5
+
+# Stock changes are pushed to subscribed WebSockets as one stock_update batch per window
+STOCK_UPDATE_WINDOW = 0.25  # seconds
+
+# Order and low-stock events are numbered per group, and the last EVENT_LOG_SIZE of each group kept
+# so a reconnecting ws/stream/ client can be sent what it missed. In-process by default; set
+# INVENTORY_EVENT_LOG_PERSIST=1 to keep it in the database, which every process shares (needed
+# with the channel router) and which survives restarts.
+EVENT_LOG_SIZE = 1000
+EVENT_LOG_PERSIST = bool(os.environ.get('INVENTORY_EVENT_LOG_PERSIST'))
+
+# Each WebSocket's events are queued and sent as one frame per WEBSOCKET_BATCH_INTERVAL. Past
+# WEBSOCKET_OUTBOX_HIGH_WATER queued events a slow client is handled by WEBSOCKET_OUTBOX_POLICY:
+# 'coalesce' (newest event per order, then drop oldest), 'drop_oldest' or 'disconnect'.
+WEBSOCKET_BATCH_INTERVAL = 0.02  # seconds
+WEBSOCKET_OUTBOX_HIGH_WATER = 100
+WEBSOCKET_OUTBOX_POLICY = 'coalesce'
+# Daphne's send() never waits for a slow browser, so ws/stream/ clients connecting with ?ack=1
+# acknowledge the frames they process, and are sent at most this many frames ahead of their acks
+WEBSOCKET_ACK_WINDOW = 8
+
+
+# Verified access tokens are cached until their exp, so each is decoded once rather than per request
+JWT_CACHE_SIZE = 10000  # most recently used tokens kept
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
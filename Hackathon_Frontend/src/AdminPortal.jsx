@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import InventoryApi from './api';
+import InventoryApi, { fromColumnar } from './api';
 import './AdminPortal.css';
 
 // Simple Bar Chart Component (no external dependencies)
@@ -42,6 +42,7 @@ export default function AdminPortal() {
     const [pendingOrders, setPendingOrders] = useState([]);
     const [processingOrders, setProcessingOrders] = useState([]);
     const [completedOrders, setCompletedOrders] = useState([]);
+    const [statusCounts, setStatusCounts] = useState({});
     const [lowStockProducts, setLowStockProducts] = useState([]);
     const [allProducts, setAllProducts] = useState([]);
     const [salesData, setSalesData] = useState([]);
@@ -59,101 +60,129 @@ export default function AdminPortal() {
     const navigate = useNavigate();
 
     useEffect(() => {
-        // Connect to WebSocket for real-time updates
+        // Connect to WebSocket for real-time updates; stock changes are pushed in batches instead of polling products/
+        const token = encodeURIComponent(sessionStorage.getItem("accessToken"));
         const wsUrl = process.env.REACT_APP_WS_URL || 'ws://127.0.0.1:8000';
-        const websocket = new WebSocket(`${wsUrl}/ws/admin/orders/`);
-
-        websocket.onopen = () => {
-            console.log('Admin WebSocket connected');
-        };
+        // Last seq seen per topic, so a reconnect is sent only the events it missed
+        const lastSeq = {};
+        let websocket;
+        let reconnectTimer;
+        let unmounted = false;
+
+        const connect = (reconnecting) => {
+            const resume = Object.entries(lastSeq).map(([topic, seq]) => `${topic}:${seq}`).join(',');
+            websocket = new WebSocket(
+                `${wsUrl}/ws/stream/?token=${token}&topics=admin_orders,stock,low_stock&ack=1` + (resume ? `&last_seq=${resume}` : '')
+            );
 
-        websocket.onmessage = (event) => {
-            const data = JSON.parse(event.data);
-            if (data.type === 'order_update') {
-                console.log('Order update received:', data.data);
-                fetchAllOrders();
-                fetchLowStockProducts();
-                fetchAllProducts();
-            }
-            if (data.type === 'low_stock_alert') {
-                console.log('Low stock alert:', data.data);
-                fetchLowStockProducts();
-                fetchAllProducts();
-                setError(`⚠️ Low Stock Alert: ${data.data.product_name} has only ${data.data.remaining_stock} left!`);
-            }
-        };
+            websocket.onopen = () => {
+                console.log('Admin WebSocket connected');
+                // Stock changes are not replayed, only the latest levels matter
+                if (reconnecting) {
+                    fetchAllProducts();
+                }
+            };
 
-        websocket.onerror = (error) => {
-            console.error('WebSocket error:', error);
-        };
+            const handle = (data) => {
+                if (data.seq != null) {
+                    lastSeq[data.topic] = Math.max(data.seq, lastSeq[data.topic] || 0);
+                }
+                if (data.type === 'snapshot_required') {
+                    // Missed more events than the server keeps, or this socket fell too far behind
+                    if (data.topic === 'stock') {
+                        fetchAllProducts();
+                    } else {
+                        fetchDashboard();
+                    }
+                }
+                if (data.type === 'order_update') {
+                    console.log('Order update received:', data.data);
+                    fetchDashboard();
+                }
+                if (data.type === 'stock_update') {
+                    const changes = new Map(fromColumnar(data.data).map(change => [change.id, change]));
+                    setAllProducts(prev => prev.map(product =>
+                        changes.has(product.id) ? { ...product, ...changes.get(product.id) } : product
+                    ));
+                }
+                if (data.type === 'low_stock_alert') {
+                    console.log('Low stock alert:', data.data);
+                    fetchDashboard();
+                    // Products that crossed their threshold together arrive in one alert
+                    const names = data.data.alerts.map(alert => `${alert.product_name} (${alert.remaining_stock} left)`);
+                    setError(`⚠️ Low Stock Alert: ${names.join(', ')}`);
+                }
+            };
+
+            // Frames handled on this socket, acknowledged so the server holds events back
+            // (and coalesces them) when this tab falls behind
+            let handled = 0;
+            websocket.onmessage = (event) => {
+                // Events queued during one tick arrive together as a batch frame
+                const data = JSON.parse(event.data);
+                (data.type === 'batch' ? data.events : [data]).forEach(handle);
+                handled += 1;
+                websocket.send(JSON.stringify({ action: 'ack', frames: handled }));
+            };
+
+            websocket.onerror = (error) => {
+                console.error('WebSocket error:', error);
+            };
+
+            websocket.onclose = () => {
+                console.log('Admin WebSocket disconnected');
+                if (!unmounted) {
+                    reconnectTimer = setTimeout(() => connect(true), 2000);
+                }
+            };
 
-        websocket.onclose = () => {
-            console.log('Admin WebSocket disconnected');
+            setWs(websocket);
         };
-
-        setWs(websocket);
+        connect(false);
 
         return () => {
+            unmounted = true;
+            clearTimeout(reconnectTimer);
             websocket.close();
         };
     }, []);
 
     useEffect(() => {
-        fetchAllOrders();
-        fetchLowStockProducts();
+        fetchDashboard();
         fetchAllProducts();
-        // Poll for updates every 10 seconds
-        const interval = setInterval(() => {
-            fetchAllOrders();
-            fetchLowStockProducts();
-            fetchAllProducts();
-        }, 10000);
+        // Poll the dashboard snapshot every 10 seconds; product stock arrives as stock_update events
+        const interval = setInterval(fetchDashboard, 10000);
         return () => clearInterval(interval);
     }, []);
 
-    const fetchAllOrders = async () => {
+    const fetchDashboard = async () => {
         try {
-            const orders = await inventoryClass.getAllOrdersAdmin();
-            if (orders) {
-                setPendingOrders(orders.filter(o => o.status === 'Pending'));
-                setProcessingOrders(orders.filter(o => o.status === 'Processing'));
-                setCompletedOrders(orders.filter(o => o.status === 'Processed' || o.status === 'Cancelled'));
-                
-                // Calculate sales data from completed orders
-                const completedOnly = orders.filter(o => o.status === 'Processed');
-                const salesByProduct = {};
-                completedOnly.forEach(order => {
-                    const name = order.item_name;
-                    if (!salesByProduct[name]) {
-                        salesByProduct[name] = 0;
-                    }
-                    salesByProduct[name] += order.item_quantity;
-                });
-                
-                const salesArray = Object.entries(salesByProduct)
-                    .map(([label, value]) => ({ label, value }))
-                    .sort((a, b) => b.value - a.value);
-                
+            const dashboard = await inventoryClass.getAdminDashboard();
+            if (dashboard) {
+                const { orders, status_counts, sales } = dashboard;
+                setPendingOrders(orders.Pending);
+                setProcessingOrders(orders.Processing);
+                setCompletedOrders(
+                    [...orders.Processed, ...orders.Cancelled]
+                        .sort((a, b) => new Date(b.created_on) - new Date(a.created_on))
+                );
+                setStatusCounts(status_counts);
+                setLowStockProducts(dashboard.low_stock_products);
+
+                // Top selling products, already aggregated by the server
+                const salesArray = sales.sales_by_product.map(item => ({
+                    label: item.product,
+                    value: item.total_quantity
+                }));
                 setSalesData(salesArray);
                 setPopularProducts(salesArray);
             }
         } catch (err) {
-            console.error('Error fetching orders:', err);
+            console.error('Error fetching dashboard:', err);
             setError('Failed to fetch orders');
         }
     };
 
-    const fetchLowStockProducts = async () => {
-        try {
-            const products = await inventoryClass.getLowStockProducts();
-            if (products) {
-                setLowStockProducts(products);
-            }
-        } catch (err) {
-            console.error('Error fetching low stock products:', err);
-        }
-    };
-
     const fetchAllProducts = async () => {
         try {
             const products = await inventoryClass.getAllProducts();
@@ -172,15 +201,15 @@ export default function AdminPortal() {
                 setSuccessMessage(`Order #${orderId} accepted successfully`);
                 setTimeout(() => setSuccessMessage(''), 3000);
                 
-                // Check for low stock alert in response
-                if (result.low_stock_alert) {
-                    const alert = result.low_stock_alert;
-                    setError(`⚠️ Low Stock Alert: ${alert.product_name} has only ${alert.remaining_stock} left!`);
+                // Check for low stock alerts in response, one per product the order took below its threshold
+                if (result.low_stock_alerts) {
+                    const alerts = result.low_stock_alerts
+                        .map(alert => `${alert.product_name} has only ${alert.remaining_stock} left`)
+                        .join(', ');
+                    setError(`⚠️ Low Stock Alert: ${alerts}!`);
                 }
                 
-                await fetchAllOrders();
-                await fetchLowStockProducts();
-                await fetchAllProducts();
+                await fetchDashboard();
             } else {
                 setError('Failed to accept order');
             }
@@ -197,7 +226,7 @@ export default function AdminPortal() {
                 if (result) {
                     setSuccessMessage(`Order #${orderId} cancelled successfully`);
                     setTimeout(() => setSuccessMessage(''), 3000);
-                    await fetchAllOrders();
+                    await fetchDashboard();
                 } else {
                     setError('Failed to cancel order');
                 }
@@ -208,6 +237,11 @@ export default function AdminPortal() {
         }
     };
 
+    // Totals per bucket; the order tables only hold the newest page of each status
+    const pendingCount = statusCounts.Pending || 0;
+    const processingCount = statusCounts.Processing || 0;
+    const completedCount = (statusCounts.Processed || 0) + (statusCounts.Cancelled || 0);
+
     const handleLogout = () => {
         if (ws) {
             ws.close();
@@ -316,8 +350,12 @@ export default function AdminPortal() {
                             <tr key={order.id} className="admin-table-row">
                                 <td className="order-id">#{order.id}</td>
                                 <td className="username">{order.username}</td>
-                                <td className="item-name">{order.item_name}</td>
-                                <td className="quantity">{order.item_quantity}</td>
+                                <td className="item-name">
+                                    {order.lines.map((line, index) => <div key={index}>{line.item_name}</div>)}
+                                </td>
+                                <td className="quantity">
+                                    {order.lines.map((line, index) => <div key={index}>{line.item_quantity}</div>)}
+                                </td>
                                 <td>
                                     <span 
                                         className="status-badge"
@@ -455,15 +493,15 @@ export default function AdminPortal() {
                 {/* Stats Grid */}
                 <div className="stats-grid">
                     <div className="stat-card pending-card">
-                        <div className="stat-number">{pendingOrders.length}</div>
+                        <div className="stat-number">{pendingCount}</div>
                         <div className="stat-label">Pending Orders</div>
                     </div>
                     <div className="stat-card processing-card">
-                        <div className="stat-number">{processingOrders.length}</div>
+                        <div className="stat-number">{processingCount}</div>
                         <div className="stat-label">Processing</div>
                     </div>
                     <div className="stat-card completed-card">
-                        <div className="stat-number">{completedOrders.length}</div>
+                        <div className="stat-number">{completedCount}</div>
                         <div className="stat-label">Completed</div>
                     </div>
                     <div className={`stat-card ${lowStockProducts.length > 0 ? 'alert-card' : 'completed-card'}`}>
@@ -608,19 +646,19 @@ export default function AdminPortal() {
                             className={`tab ${activeTab === 'pending' ? 'active' : ''}`}
                             onClick={() => setActiveTab('pending')}
                         >
-                            Pending ({pendingOrders.length})
+                            Pending ({pendingCount})
                         </button>
                         <button
                             className={`tab ${activeTab === 'processing' ? 'active' : ''}`}
                             onClick={() => setActiveTab('processing')}
                         >
-                            Processing ({processingOrders.length})
+                            Processing ({processingCount})
                         </button>
                         <button
                             className={`tab ${activeTab === 'completed' ? 'active' : ''}`}
                             onClick={() => setActiveTab('completed')}
                         >
-                            Completed ({completedOrders.length})
+                            Completed ({completedCount})
                         </button>
                     </div>
 
@@ -103,9 +103,17 @@ export default function Auth() {
         });
       }
     }catch(error) {
-      setErrors({
+      if (error.response && error.response.status === 429) {
+        // Auth service is shedding a login burst
+        const retryAfter = error.response.headers["retry-after"] || "a few";
+        setErrors({
+          general: `Too many logins right now, try again in ${retryAfter} seconds`,
+        });
+      } else {
+        setErrors({
           general: "Invalid username or password",
         });
+      }
       } finally {
         setLoading(false);
     }
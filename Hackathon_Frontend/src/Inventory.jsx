@@ -1,6 +1,6 @@
 import React from 'react'
 import { useState, useEffect, useRef, useCallback } from 'react';
-import InventoryApi from  './api';
+import InventoryApi, { fromColumnar } from  './api';
 import './Inventory.css';
 
 export default function Inventory() {
@@ -15,49 +15,92 @@ export default function Inventory() {
     const [error, setError] = useState('');
     const [success, setSuccess] = useState('');
     const [ws, setWs] = useState(null);
+    const [stockLevels, setStockLevels] = useState({});
 
     useEffect(() => {
-        // Connect to WebSocket
-        const username = sessionStorage.getItem("user");
+        // Connect to WebSocket: this user's orders (from the token) and live stock on one socket
+        const token = encodeURIComponent(sessionStorage.getItem("accessToken"));
         const wsUrl = process.env.REACT_APP_WS_URL || 'ws://127.0.0.1:8000';
-        const websocket = new WebSocket(`${wsUrl}/ws/orders/${username}/`);
-
-        websocket.onopen = () => {
-            console.log('WebSocket connected');
-        };
-
-        websocket.onmessage = (event) => {
-            const data = JSON.parse(event.data);
-            if (data.type === 'order_status') {
-                console.log('Order status update:', data.data);
-                
-                // Update order status in the UI
-                setOrderHistory(prev => 
-                    prev.map(order => 
-                        order.id === data.data.order_id 
-                            ? { ...order, status: data.data.status }
-                            : order
-                    )
-                );
-
-                // Show success message for status updates
-                setSuccess(`Order #${data.data.order_id} status updated to: ${data.data.status}`);
-                setTimeout(() => setSuccess(''), 5000);
-            }
-        };
-
-        websocket.onerror = (error) => {
-            console.error('WebSocket error:', error);
-        };
+        // Last seq seen per topic, so a reconnect is sent only the order updates it missed
+        const lastSeq = {};
+        let websocket;
+        let reconnectTimer;
+        let unmounted = false;
+
+        const connect = () => {
+            const resume = Object.entries(lastSeq).map(([topic, seq]) => `${topic}:${seq}`).join(',');
+            websocket = new WebSocket(
+                `${wsUrl}/ws/stream/?token=${token}&topics=orders,stock&ack=1` + (resume ? `&last_seq=${resume}` : '')
+            );
+
+            websocket.onopen = () => {
+                console.log('WebSocket connected');
+            };
+
+            const handle = (data) => {
+                if (data.seq != null) {
+                    lastSeq[data.topic] = Math.max(data.seq, lastSeq[data.topic] || 0);
+                }
+                if (data.type === 'snapshot_required' && data.topic === 'orders') {
+                    // Missed more updates than the server keeps, or this socket fell too far behind
+                    fetchOrderHistory();
+                }
+                if (data.type === 'order_status') {
+                    console.log('Order status update:', data.data);
+                    
+                    // Update order status in the UI
+                    setOrderHistory(prev => 
+                        prev.map(order => 
+                            order.id === data.data.order_id 
+                                ? { ...order, status: data.data.status }
+                                : order
+                        )
+                    );
+
+                    // Show success message for status updates
+                    setSuccess(`Order #${data.data.order_id} status updated to: ${data.data.status}`);
+                    setTimeout(() => setSuccess(''), 5000);
+                }
+                if (data.type === 'stock_update') {
+                    // Latest stock per product, shown in the search results
+                    setStockLevels(prev => {
+                        const next = { ...prev };
+                        fromColumnar(data.data).forEach(change => { next[change.id] = change.stock_quantity; });
+                        return next;
+                    });
+                }
+            };
+
+            // Frames handled on this socket, acknowledged so the server holds events back
+            // (and coalesces them) when this tab falls behind
+            let handled = 0;
+            websocket.onmessage = (event) => {
+                // Events queued during one tick arrive together as a batch frame
+                const data = JSON.parse(event.data);
+                (data.type === 'batch' ? data.events : [data]).forEach(handle);
+                handled += 1;
+                websocket.send(JSON.stringify({ action: 'ack', frames: handled }));
+            };
+
+            websocket.onerror = (error) => {
+                console.error('WebSocket error:', error);
+            };
+
+            websocket.onclose = () => {
+                console.log('WebSocket disconnected');
+                if (!unmounted) {
+                    reconnectTimer = setTimeout(connect, 2000);
+                }
+            };
 
-        websocket.onclose = () => {
-            console.log('WebSocket disconnected');
+            setWs(websocket);
         };
-
-        setWs(websocket);
+        connect();
 
         // Cleanup on unmount
         return () => {
+            unmounted = true;
+            clearTimeout(reconnectTimer);
             websocket.close();
         };
     }, []);
@@ -264,6 +307,7 @@ export default function Inventory() {
                                             <InlineProductSearch
                                                 rowId={row.item_id}
                                                 value={row.item_name}
+                                                stockLevels={stockLevels}
                                                 onProductSelect={(product) => {
                                                     updateRow(row.item_id, 'item_name', product.name);
                                                     updateRow(row.item_id, 'product_id', product.id);
@@ -326,8 +370,12 @@ export default function Inventory() {
                                     {orderHistory.map((order) => (
                                         <tr key={order.id}>
                                             <td className="order-id">#{order.id}</td>
-                                            <td className="item-name">{order.item_name}</td>
-                                            <td className="quantity">{order.item_quantity}</td>
+                                            <td className="item-name">
+                                                {order.lines.map((line, index) => <div key={index}>{line.item_name}</div>)}
+                                            </td>
+                                            <td className="quantity">
+                                                {order.lines.map((line, index) => <div key={index}>{line.item_quantity}</div>)}
+                                            </td>
                                             <td>
                                                 <span className={`status-badge ${getStatusColor(order.status)}`}>
                                                     {order.status || 'Pending'}
@@ -355,7 +403,7 @@ export default function Inventory() {
 }
 
 // Inline Product Search Component (embedded in the same file)
-function InlineProductSearch({ rowId, value, onProductSelect }) {
+function InlineProductSearch({ rowId, value, stockLevels, onProductSelect }) {
     const [searchTerm, setSearchTerm] = useState(value || '');
     const [searchResults, setSearchResults] = useState([]);
     const [isSearching, setIsSearching] = useState(false);
@@ -477,6 +525,11 @@ function InlineProductSearch({ rowId, value, onProductSelect }) {
         );
     };
 
+    // Stock pushed over the WebSocket since the search ran
+    const results = searchResults.map(product =>
+        product.id in stockLevels ? { ...product, stock: stockLevels[product.id] } : product
+    );
+
     return (
         <div className="inline-product-search" ref={dropdownRef}>
             <div className="search-input-wrapper">
@@ -516,7 +569,7 @@ function InlineProductSearch({ rowId, value, onProductSelect }) {
                         {searchResults.length} {searchResults.length === 1 ? 'result' : 'results'} found
                     </div>
                     <ul className="search-results">
-                        {searchResults.map((product, index) => (
+                        {results.map((product, index) => (
                             <li
                                 key={product.id}
                                 className={`search-result-item ${index === selectedIndex ? 'selected' : ''}`}
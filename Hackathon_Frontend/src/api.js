@@ -1,10 +1,24 @@
 import axios from "axios";
 
+// Decode a ?format=columnar table ({columns, dictionaries, data}) back into row objects
+export function fromColumnar({ columns, dictionaries, data }) {
+    const values = columns.map((column, i) =>
+        dictionaries[column] ? data[i].map((code) => dictionaries[column][code]) : data[i]
+    );
+    const count = columns.length ? values[0].length : 0;
+    const rows = new Array(count);
+    for (let r = 0; r < count; r++) {
+        const row = {};
+        columns.forEach((column, i) => { row[column] = values[i][r]; });
+        rows[r] = row;
+    }
+    return rows;
+}
+
 export default class InventoryApi {
     constructor() {
         // Use environment variable or fallback to localhost for development
         this.BASE = process.env.REACT_APP_INVENTORY_URL || "http://127.0.0.1:8000/api/";
-        this.username = sessionStorage.getItem("user");
         this.accessToken = sessionStorage.getItem("accessToken");
     }
 
@@ -14,8 +28,7 @@ export default class InventoryApi {
             JSON.stringify(data), {
                 headers: {
                     'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${this.accessToken}`,
-                    "X-Username": this.username
+                    'Authorization': `Bearer ${this.accessToken}`
                 }
             }
         );
@@ -34,8 +47,7 @@ export default class InventoryApi {
             const response = await axios.get(
                 this.BASE + "orders/user/", {
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -56,16 +68,15 @@ export default class InventoryApi {
         try {
             const response = await axios.get(
                 this.BASE + "admin/orders/", {
+                    params: { format: "columnar" },
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
 
             if(response.status === 200){
-                console.log(response.data.orders);
-                return response.data.orders;
+                return fromColumnar(response.data.orders);
             }
             return null;
         } catch (error) {
@@ -74,6 +85,27 @@ export default class InventoryApi {
         }
     }
 
+    // Status counts, newest orders per status, low stock and sales totals in one cached snapshot
+    async getAdminDashboard() {
+        try {
+            const response = await axios.get(
+                this.BASE + "admin/dashboard/", {
+                    headers: {
+                        'Authorization': `Bearer ${this.accessToken}`
+                    }
+                }
+            );
+
+            if(response.status === 200){
+                return response.data;
+            }
+            return null;
+        } catch (error) {
+            console.error("Error fetching admin dashboard:", error.response?.data || error.message);
+            return null;
+        }
+    }
+
     async acceptOrder(orderId) {
         try {
             const response = await axios.post(
@@ -81,8 +113,7 @@ export default class InventoryApi {
                 {},
                 {
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -106,8 +137,7 @@ export default class InventoryApi {
                 {},
                 {
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -133,7 +163,6 @@ export default class InventoryApi {
                     
                     headers: {
                         'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username,
                     }
                 }
             );
@@ -155,8 +184,7 @@ export default class InventoryApi {
             const response = await axios.get(
                 this.BASE + "products/", {
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -176,8 +204,7 @@ export default class InventoryApi {
             const response = await axios.get(
                 this.BASE + "products/low-stock/", {
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -200,8 +227,7 @@ export default class InventoryApi {
                 {
                     headers: {
                         'Content-Type': 'application/json',
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -223,8 +249,7 @@ export default class InventoryApi {
             const response = await axios.get(
                 this.BASE + "admin/analytics/sales/", {
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -249,8 +274,7 @@ export default class InventoryApi {
                         sort_by: sortBy
                     },
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
@@ -270,15 +294,15 @@ export default class InventoryApi {
         try {
             const response = await axios.get(
                 this.BASE + "admin/inventory/stock/", {
+                    params: { format: "columnar" },
                     headers: {
-                        'Authorization': `Bearer ${this.accessToken}`,
-                        "X-Username": this.username
+                        'Authorization': `Bearer ${this.accessToken}`
                     }
                 }
             );
 
             if(response.status === 200){
-                return response.data.inventory;
+                return fromColumnar(response.data.inventory);
             }
             return [];
         } catch (error) {